@@ -0,0 +1,105 @@
+import asyncio
+import heapq
+from datetime import date, timedelta
+from itertools import groupby
+from typing import AsyncIterator, Dict, List, Optional
+from models import StatusEnum
+
+# Rollups are keyed "<user id>:<YYYY-MM-DD>" (UTC days), so one user's days
+# are a contiguous, date-ordered range of the _id index.
+
+
+def activity_id(user_id: str, day: date) -> str:
+    return f"{user_id}:{day.isoformat()}"
+
+
+def activity_range(user_id: str, start: date, end: date) -> Dict:
+    """_id filter for a user's rollups from start through end"""
+    return {"_id": {"$gte": activity_id(user_id, start), "$lte": activity_id(user_id, end)}}
+
+
+def current_streak(days: List[Dict], today: date) -> int:
+    """Streak of the latest rollup, if it is still alive (active today or yesterday)"""
+    if not days:
+        return 0
+    latest = days[-1]
+    if date.fromisoformat(latest["day"]) < today - timedelta(days=1):
+        return 0
+    return latest.get("streak", 0)
+
+
+def rollup_day(day: date, submissions: List[Dict], previous: Optional[Dict]) -> Dict:
+    """Rollup document for one user's submissions on one day"""
+    user_id = submissions[0]["user_id"]
+    continues = previous is not None and previous["day"] == (day - timedelta(days=1)).isoformat()
+    return {
+        "_id": activity_id(user_id, day),
+        "user_id": user_id,
+        "day": day.isoformat(),
+        "submissions": len(submissions),
+        "accepts": sum(1 for doc in submissions if doc["status"] == StatusEnum.ACCEPTED),
+        "problems": sorted({doc["problem_id"] for doc in submissions}),
+        "solved": sorted({doc["problem_id"] for doc in submissions if doc["status"] == StatusEnum.ACCEPTED}),
+        "streak": previous["streak"] + 1 if continues else 1
+    }
+
+
+# The archive's (user_id, submitted_at desc) index serves this order in every tier
+HISTORY_SORT = [("user_id", 1), ("submitted_at", -1)]
+HISTORY_PROJECTION = {"_id": 0, "id": 1, "user_id": 1, "problem_id": 1, "status": 1, "submitted_at": 1}
+
+
+async def _user_histories(cursors: List) -> AsyncIterator[List[Dict]]:
+    """Each user's submissions, oldest first, merged from cursors sorted by HISTORY_SORT"""
+    heap = []
+
+    async def push(index: int, stream):
+        doc = await anext(stream, None)
+        if doc is not None:
+            heapq.heappush(heap, (doc["user_id"], -doc["submitted_at"].timestamp(), index, doc, stream))
+
+    for index, cursor in enumerate(cursors):
+        await push(index, aiter(cursor))
+    user_id, history = None, {}
+    while heap:
+        doc_user, _, index, doc, stream = heapq.heappop(heap)
+        await push(index, stream)
+        if doc_user != user_id:
+            if history:
+                yield list(reversed(history.values()))
+            user_id, history = doc_user, {}
+        # A batch the archiver copied but hasn't deleted yet is in both tiers
+        history.setdefault(doc["id"], doc)
+    if history:
+        yield list(reversed(history.values()))
+
+
+async def backfill_activity(submissions_collection, activity_collection, archive) -> int:
+    """Rebuild every rollup, and so every streak, from the hot and archived submission history"""
+    from pymongo import ReplaceOne
+
+    rollups: List = []
+    written = 0
+    cursors = [submissions_collection.find({}, HISTORY_PROJECTION).sort(HISTORY_SORT)]
+    for month in await archive.months(refresh=True):
+        cursors.append(archive.collection(month).find({}, HISTORY_PROJECTION).sort(HISTORY_SORT))
+
+    async for history in _user_histories(cursors):
+        user_days: List[Dict] = []
+        for day, submissions in groupby(history, key=lambda doc: doc["submitted_at"].date()):
+            user_days.append(rollup_day(day, list(submissions), user_days[-1] if user_days else None))
+        rollups.extend(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in user_days)
+        written += len(user_days)
+        if len(rollups) >= 1000:
+            await activity_collection.bulk_write(rollups, ordered=False)
+            rollups = []
+    if rollups:
+        await activity_collection.bulk_write(rollups, ordered=False)
+    return written
+
+
+if __name__ == "__main__":
+    from database import activity_collection, submission_archive, submissions_collection
+
+    count = asyncio.run(backfill_activity(submissions_collection, activity_collection, submission_archive))
+    print(f"Wrote {count} daily activity rollups")
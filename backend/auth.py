@@ -1,9 +1,9 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from models import TokenData
 import os
 
@@ -11,15 +11,24 @@ import os
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Usernames allowed to call /api/admin endpoints
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+# Lets anonymous requests through to endpoints that only personalize for signed-in users
+optional_security = HTTPBearer(auto_error=False)
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Built on first use; passlib and the bcrypt backend are slow to import"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -50,7 +59,7 @@ async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depend
         raise credentials_exception
     return user_id
 
-async def get_current_user_id_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> Optional[str]:
+async def get_current_user_id_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[str]:
     if not credentials:
         return None
     try:
@@ -59,4 +68,14 @@ async def get_current_user_id_optional(credentials: Optional[HTTPAuthorizationCr
         user_id: str = payload.get("user_id")
         return user_id
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+async def get_current_admin_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    user_id = await get_current_user_id(credentials)
+    payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    if payload.get("sub") not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return user_id
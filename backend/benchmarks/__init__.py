@@ -0,0 +1,7 @@
+"""Benchmark suite for the judge and API hot paths, and server cold start.
+
+Run from the backend directory:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --baseline results.json --threshold 0.15
+"""
@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Backend modules are imported as top-level modules, as the API server does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from . import bench_api, bench_executor, bench_startup  # noqa: E402
+from .fixtures import use_database  # noqa: E402
+from .harness import compare_to_baseline, write_results  # noqa: E402
+
+SUITES = {
+    "executor": bench_executor.run,
+    "api": bench_api.run,
+    "startup": bench_startup.run,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the judge and API hot paths and cold start")
+    parser.add_argument("--suite", choices=[*SUITES, "all"], default="all")
+    parser.add_argument("--repeat", type=int, default=20, help="timed iterations per benchmark")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel callers for throughput runs")
+    parser.add_argument("--mongo-url", help="benchmark against this MongoDB instead of an in-process mock")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging, e.g. 0.1 = 10%%")
+    return parser.parse_args()
+
+
+async def main(args) -> int:
+    # Per-request client logging would dominate the output
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    use_database(args.mongo_url)
+    suites = SUITES if args.suite == "all" else {args.suite: SUITES[args.suite]}
+    results = {}
+    for run in suites.values():
+        results.update(await run(args.repeat, args.concurrency))
+    write_results(results, args.output)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
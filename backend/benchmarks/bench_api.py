@@ -0,0 +1,70 @@
+import time
+from typing import Dict
+import httpx
+from .fixtures import auth_headers, reset_database, seed_problems, seed_submissions
+from .harness import measure_latency, measure_throughput
+
+CATALOG_SIZES = (100, 1000, 5000)
+HISTORY_LENGTHS = (10, 100, 1000)
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def _get(client, url, **kwargs):
+    response = await client.get(url, **kwargs)
+    response.raise_for_status()
+
+
+async def bench_problem_list(app, repeat: int) -> Dict[str, Dict]:
+    results = {}
+    headers = auth_headers("bench-user")
+    async with _client(app) as client:
+        for size in CATALOG_SIZES:
+            await reset_database()
+            await seed_problems(size)
+            results[f"api.problems.catalog_{size}"] = await measure_latency(
+                lambda: _get(client, "/api/problems", headers=headers), repeat
+            )
+    return results
+
+
+async def bench_submission_history(app, repeat: int) -> Dict[str, Dict]:
+    results = {}
+    headers = auth_headers("bench-user")
+    async with _client(app) as client:
+        for length in HISTORY_LENGTHS:
+            await reset_database()
+            problem_ids = await seed_problems(50)
+            await seed_submissions("bench-user", problem_ids, length)
+            results[f"api.submissions.history_{length}"] = await measure_latency(
+                lambda: _get(client, "/api/submissions", headers=headers, params={"limit": 50}), repeat
+            )
+    return results
+
+
+async def bench_login(app, repeat: int, concurrency: int) -> Dict[str, Dict]:
+    await reset_database()
+    credentials = {"username": "bench", "password": "bench-password"}
+    async with _client(app) as client:
+        response = await client.post("/api/auth/register", json={**credentials, "email": "bench@example.com"})
+        response.raise_for_status()
+
+        async def login():
+            response = await client.post("/api/auth/login", json=credentials)
+            response.raise_for_status()
+
+        result = await measure_latency(login, repeat)
+        result.update(await measure_throughput(login, repeat * concurrency, concurrency))
+    return {"api.auth.login": result}
+
+
+async def run(repeat: int, concurrency: int) -> Dict[str, Dict]:
+    from server import app
+
+    results = {}
+    results.update(await bench_problem_list(app, repeat))
+    results.update(await bench_submission_history(app, repeat))
+    results.update(await bench_login(app, repeat, concurrency))
+    return results
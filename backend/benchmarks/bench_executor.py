@@ -0,0 +1,25 @@
+from typing import Dict
+from code_executor import CodeExecutor
+from models import LanguageEnum
+from .fixtures import TWO_SUM, two_sum_cases
+from .harness import measure_latency, measure_throughput
+
+CASE_COUNTS = (1, 5, 20)
+
+
+async def run(repeat: int, concurrency: int) -> Dict[str, Dict]:
+    executor = CodeExecutor()
+    results = {}
+    for language in LanguageEnum:
+        for count in CASE_COUNTS:
+            cases = two_sum_cases(count)
+
+            async def execute():
+                response = await executor.execute_code(TWO_SUM[language], language, cases)
+                if not response.success:
+                    raise RuntimeError(f"{language.value} reference solution failed: {response.console_output}")
+
+            name = f"executor.{language.value}.cases_{count}"
+            results[name] = await measure_latency(execute, repeat)
+            results[name].update(await measure_throughput(execute, repeat * concurrency, concurrency))
+    return results
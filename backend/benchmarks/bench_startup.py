@@ -0,0 +1,61 @@
+"""Cold start: importing the app, and a fresh server process answering its health check"""
+import asyncio
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+import httpx
+from .harness import summarize
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Cold starts are slow enough that a handful of samples is plenty
+MAX_STARTS = 5
+HEALTH_TIMEOUT = 30.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _time_import() -> float:
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(sys.executable, "-c", "import server", cwd=BACKEND_DIR)
+    if await process.wait() != 0:
+        raise RuntimeError("Importing server failed")
+    return time.perf_counter() - start
+
+
+async def _time_first_health() -> float:
+    """Process spawn to the first 200 from /api/; needs no reachable MongoDB"""
+    port = _free_port()
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning",
+        cwd=BACKEND_DIR
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            while time.perf_counter() - start < HEALTH_TIMEOUT:
+                try:
+                    if (await client.get("/api/")).status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                if process.returncode is not None:
+                    raise RuntimeError("Server exited before becoming healthy")
+                await asyncio.sleep(0.01)
+        raise RuntimeError("Server did not become healthy in time")
+    finally:
+        process.terminate()
+        await process.wait()
+
+
+async def run(repeat: int, concurrency: int) -> Dict[str, Dict]:
+    starts = max(1, min(repeat, MAX_STARTS))
+    return {
+        "startup.import_server": summarize([await _time_import() for _ in range(starts)]),
+        "startup.first_health": summarize([await _time_first_health() for _ in range(starts)]),
+    }
@@ -0,0 +1,97 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+import database
+from auth import create_access_token
+from models import Problem, Submission, TestCase, DifficultyEnum, LanguageEnum, StatusEnum
+
+TWO_SUM = {
+    LanguageEnum.PYTHON: (
+        "def twoSum(nums, target):\n"
+        "    seen = {}\n"
+        "    for i, n in enumerate(nums):\n"
+        "        if target - n in seen:\n"
+        "            return [seen[target - n], i]\n"
+        "        seen[n] = i\n"
+    ),
+    LanguageEnum.JAVASCRIPT: (
+        "function twoSum(nums, target) {\n"
+        "  const seen = new Map();\n"
+        "  for (let i = 0; i < nums.length; i++) {\n"
+        "    if (seen.has(target - nums[i])) return [seen.get(target - nums[i]), i];\n"
+        "    seen.set(nums[i], i);\n"
+        "  }\n"
+        "}\n"
+    ),
+    LanguageEnum.JAVA: "class Solution {}",
+    LanguageEnum.CPP: "class Solution {};",
+}
+
+
+def two_sum_cases(count: int):
+    """Deterministic Two Sum cases as executor (input, expected) pairs"""
+    cases = []
+    for i in range(count):
+        nums = list(range(10, 10 + 20 * (i + 1), 2))
+        cases.append((f"[{','.join(map(str, nums))}]\n{nums[-1] + nums[-2]}", f"[{len(nums) - 2},{len(nums) - 1}]"))
+    return cases
+
+
+def use_database(mongo_url: Optional[str]):
+    """Point the database module at a throwaway database"""
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        database.use_client(AsyncIOMotorClient(mongo_url), f"benchmarks_{uuid.uuid4().hex[:8]}")
+        return
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("Install mongomock-motor or pass --mongo-url to benchmark against a local MongoDB")
+    database.use_client(AsyncMongoMockClient(), "benchmarks", read_preferences=False)
+
+
+async def reset_database():
+    db = database.get_db()
+    for name in await db.list_collection_names():
+        await db.drop_collection(name)
+
+
+async def seed_problems(count: int):
+    docs = []
+    difficulties = list(DifficultyEnum)
+    for i in range(count):
+        docs.append(Problem(
+            title=f"Problem {i}",
+            difficulty=difficulties[i % len(difficulties)],
+            category="Array",
+            tags=["Array", f"tag-{i % 20}"],
+            description="Benchmark problem " * 20,
+            examples=[],
+            constraints=[],
+            test_cases=[TestCase(input=inp, expected=exp) for inp, exp in two_sum_cases(3)],
+        ).dict())
+    if docs:
+        await database.problems_collection.insert_many(docs)
+    return [doc["id"] for doc in docs]
+
+
+async def seed_submissions(user_id: str, problem_ids, count: int):
+    code_hash = await database.code_store.put(TWO_SUM[LanguageEnum.PYTHON])
+    start = datetime.utcnow() - timedelta(days=30)
+    docs = []
+    for i in range(count):
+        docs.append(Submission(
+            user_id=user_id,
+            problem_id=problem_ids[i % len(problem_ids)],
+            code_hash=code_hash,
+            language=LanguageEnum.PYTHON,
+            status=StatusEnum.ACCEPTED if i % 3 else StatusEnum.WRONG_ANSWER,
+            submitted_at=start + timedelta(minutes=i),
+        ).dict(exclude={"code"}))
+    if docs:
+        await database.submissions_collection.insert_many(docs)
+
+
+def auth_headers(user_id: str, username: str = "bench"):
+    token = create_access_token({"sub": username, "user_id": user_id})
+    return {"Authorization": f"Bearer {token}"}
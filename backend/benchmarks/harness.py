@@ -0,0 +1,90 @@
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Metrics where a larger value is worse; everything else (throughput) is better when larger
+LOWER_IS_BETTER = ("mean_ms", "p50_ms", "p95_ms", "seconds")
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds from per-call durations in seconds"""
+    ordered = sorted(samples)
+    return {
+        "samples": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+async def measure_latency(fn: Callable[[], Awaitable], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def measure_throughput(fn: Callable[[], Awaitable], total: int, concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await fn()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return {"ops_per_sec": total / elapsed, "concurrency": concurrency}
+
+
+def environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+def write_results(results: Dict[str, Dict], path: Optional[str]):
+    payload = json.dumps({"environment": environment(), "results": results}, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+def compare_to_baseline(results: Dict[str, Dict], baseline_path: str, threshold: float) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than `threshold`"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not old or metric in ("samples", "concurrency"):
+                continue
+            change = (value - old) / old
+            if metric not in LOWER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append(f"{name} {metric}: {old:.2f} -> {value:.2f} ({change:+.0%} worse)")
+    return regressions
@@ -0,0 +1,239 @@
+"""Contest-shaped load against the whole API.
+
+Registers users, logs them in, then issues a weighted mix of problem browsing,
+/run and /submit (correct, wrong and time-limit-exceeding code) at a target
+request rate. Runs the app in-process by default, or against --base-url.
+
+    python -m benchmarks.loadgen --users 50 --rate 20 --duration 60
+    python -m benchmarks.loadgen --base-url http://localhost:8001 --mix browse_list=70,submit_ok=30
+
+/run and /submit are rate limited per user and per client address; against a
+running server, raise RUN_RATE_LIMIT / SUBMIT_RATE_LIMIT there or expect 429s.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from models import LanguageEnum  # noqa: E402
+from .fixtures import TWO_SUM, two_sum_cases, use_database  # noqa: E402
+
+WRONG_CODE = "def twoSum(nums, target):\n    return [0, 0]\n"
+TLE_CODE = "def twoSum(nums, target):\n    while True:\n        pass\n"
+
+DEFAULT_MIX = "browse_list=35,browse_problem=25,run=15,submit_ok=15,submit_wrong=7,submit_tle=3"
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+HISTOGRAM_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, elapsed_ms: float, error: Optional[str]):
+        self.latencies_ms.append(elapsed_ms)
+        if error:
+            self.errors[error] += 1
+
+    def report(self) -> Dict:
+        ordered = sorted(self.latencies_ms)
+        total = len(ordered)
+        buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for value in ordered:
+            index = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if value <= bound), len(HISTOGRAM_BOUNDS_MS))
+            buckets[index] += 1
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+
+        def percentile(p):
+            return round(ordered[min(total - 1, int(total * p))], 2) if total else None
+
+        error_count = sum(self.errors.values())
+        return {
+            "requests": total,
+            "error_rate": error_count / total if total else 0.0,
+            "errors": dict(self.errors),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "histogram": dict(zip(labels, buckets)),
+        }
+
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float]):
+        self.client = client
+        self.mix = mix
+        self.stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.queue_samples: List[Dict] = []
+        self.tokens: List[str] = []
+        self.problem_ids: List[str] = []
+
+    async def _request(self, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        error = None
+        response = None
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            if response.status_code >= 400:
+                error = str(response.status_code)
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        self.stats[label].record((time.perf_counter() - start) * 1000, error)
+        return response
+
+    async def setup_users(self, count: int):
+        run_id = uuid.uuid4().hex[:6]
+
+        async def create(i):
+            credentials = {"username": f"load-{run_id}-{i}", "password": "load-password"}
+            await self._request("POST /auth/register", "POST", "/api/auth/register",
+                                json={**credentials, "email": f"load-{run_id}-{i}@example.com"})
+            response = await self._request("POST /auth/login", "POST", "/api/auth/login", json=credentials)
+            if response is not None and response.status_code == 200:
+                self.tokens.append(response.json()["access_token"])
+
+        await asyncio.gather(*(create(i) for i in range(count)))
+        if not self.tokens:
+            raise SystemExit("No load users could log in")
+
+    async def setup_problems(self):
+        response = await self.client.get("/api/problems", headers=self._auth())
+        response.raise_for_status()
+        self.problem_ids = [p["id"] for p in response.json() if p["title"] == "Two Sum"]
+        if self.problem_ids:
+            return
+        problem = {
+            "title": "Two Sum",
+            "difficulty": "Easy",
+            "category": "Array",
+            "tags": ["Array"],
+            "description": "Load generator problem",
+            "examples": [],
+            "constraints": [],
+            "test_cases": [{"input": i, "expected": e} for i, e in two_sum_cases(3)],
+        }
+        response = await self.client.post("/api/problems", json=problem, headers=self._auth())
+        response.raise_for_status()
+        self.problem_ids = [response.json()["id"]]
+
+    def _auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {random.choice(self.tokens)}"}
+
+    async def operation(self, kind: str):
+        problem_id = random.choice(self.problem_ids)
+        if kind == "browse_list":
+            await self._request("GET /problems", "GET", "/api/problems", headers=self._auth())
+        elif kind == "browse_problem":
+            await self._request("GET /problems/{id}", "GET", f"/api/problems/{problem_id}")
+        elif kind == "run":
+            body = {"problem_id": problem_id, "code": TWO_SUM[LanguageEnum.PYTHON], "language": "python"}
+            await self._request("POST /run", "POST", f"/api/problems/{problem_id}/run", json=body, headers=self._auth())
+        else:
+            code = {"submit_ok": TWO_SUM[LanguageEnum.PYTHON], "submit_wrong": WRONG_CODE, "submit_tle": TLE_CODE}[kind]
+            body = {"problem_id": problem_id, "code": code, "language": "python"}
+            await self._request(f"POST /submit ({kind[7:]})", "POST", f"/api/problems/{problem_id}/submit",
+                                json=body, headers=self._auth())
+
+    async def sample_queue(self, started: float, interval: float):
+        while True:
+            try:
+                response = await self.client.get("/api/judge/status")
+                if response.status_code == 200:
+                    self.queue_samples.append({"t": round(time.perf_counter() - started, 2), **response.json()})
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(interval)
+
+    async def run(self, rate: float, duration: float, sample_interval: float = 1.0):
+        """Open-loop arrivals: requests start on schedule whether or not earlier ones finished"""
+        kinds, weights = zip(*self.mix.items())
+        started = time.perf_counter()
+        sampler = asyncio.create_task(self.sample_queue(started, sample_interval))
+        in_flight = set()
+        next_at = started
+        while next_at - started < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self.operation(random.choices(kinds, weights)[0]))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            next_at += random.expovariate(rate)
+        if in_flight:
+            await asyncio.wait(in_flight)
+        sampler.cancel()
+        elapsed = time.perf_counter() - started
+        return {
+            "duration_s": round(elapsed, 2),
+            "target_rate": rate,
+            "achieved_rate": round(sum(len(s.latencies_ms) for s in self.stats.values()) / elapsed, 2),
+            "endpoints": {label: stats.report() for label, stats in sorted(self.stats.items())},
+            "judge_queue": self.queue_samples,
+        }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("browse_list", "browse_problem", "run", "submit_ok", "submit_wrong", "submit_tle"):
+            raise argparse.ArgumentTypeError(f"Unknown operation: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay a contest-shaped traffic mix against the API")
+    parser.add_argument("--base-url", help="target a running server instead of the in-process app")
+    parser.add_argument("--mongo-url", help="in-process mode: use this MongoDB instead of an in-process mock")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=10.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+async def main(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        use_database(args.mongo_url)
+        # Every simulated user shares the in-process client address
+        os.environ.setdefault('IP_RATE_LIMIT_FACTOR', str(max(args.users, 1)))
+        from server import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadgen", timeout=60)
+
+    async with client:
+        generator = LoadGenerator(client, args.mix)
+        await generator.setup_users(args.users)
+        await generator.setup_problems()
+        setup = {label: stats.report() for label, stats in generator.stats.items()}
+        generator.stats.clear()
+        report = await generator.run(args.rate, args.duration)
+        report["setup"] = setup
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Callable, List, Tuple, Union
+from models import TestCase
+
+# Test case payloads larger than this (in bytes) are moved out of the problem document
+INLINE_TEST_CASE_LIMIT = int(os.environ.get('INLINE_TEST_CASE_LIMIT', 4096))
+CHUNK_SIZE = 256 * 1024
+
+# A test case value handed to the executor: inline text or a path in the local blob cache
+TestCaseValue = Union[str, Path]
+
+
+def blob_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """Content-addressed storage for large test case payloads"""
+
+    async def put(self, data: bytes) -> str:
+        raise NotImplementedError
+
+    def stream(self, digest: str) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    async def get(self, digest: str) -> bytes:
+        return b"".join([chunk async for chunk in self.stream(digest)])
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under a directory, sharded by digest prefix"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    async def put(self, data: bytes) -> str:
+        digest = blob_digest(data)
+        path = self.path_for(digest)
+        if not path.exists():
+            await asyncio.to_thread(_write_atomic, path, data)
+        return digest
+
+    async def stream(self, digest: str) -> AsyncIterator[bytes]:
+        with open(self.path_for(digest), 'rb') as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+
+class GridFSBlobStore(BlobStore):
+    """Blobs in a GridFS bucket, using the digest as the file name"""
+
+    def __init__(self, get_db: Callable, bucket_name: str = "test_blobs"):
+        self.get_db = get_db
+        self.bucket_name = bucket_name
+        self._bucket = None
+        self._db = None
+
+    @property
+    def bucket(self):
+        # Rebuilt if the database module switched clients
+        db = self.get_db()
+        if self._bucket is None or db is not self._db:
+            from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+            self._bucket = AsyncIOMotorGridFSBucket(db, bucket_name=self.bucket_name, chunk_size_bytes=CHUNK_SIZE)
+            self._db = db
+        return self._bucket
+
+    async def put(self, data: bytes) -> str:
+        digest = blob_digest(data)
+        async for _ in self.bucket.find({"filename": digest}, limit=1):
+            return digest
+        await self.bucket.upload_from_stream(digest, data)
+        return digest
+
+    async def stream(self, digest: str) -> AsyncIterator[bytes]:
+        grid_out = await self.bucket.open_download_stream_by_name(digest)
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+
+class BlobCache:
+    """Judge-side on-disk cache so blobs are fetched from the store once per host"""
+
+    def __init__(self, root: Union[str, Path], store: BlobStore):
+        self.root = Path(root)
+        self.store = store
+        self._locks = {}
+
+    async def path(self, digest: str) -> Path:
+        path = self.root / digest[:2] / digest
+        if path.exists():
+            return path
+        lock = self._locks.setdefault(digest, asyncio.Lock())
+        async with lock:
+            if not path.exists():
+                await self._download(digest, path)
+        self._locks.pop(digest, None)
+        return path
+
+    async def _download(self, digest: str, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                async for chunk in self.store.stream(digest):
+                    hasher.update(chunk)
+                    f.write(chunk)
+            if hasher.hexdigest() != digest:
+                raise ValueError(f"Blob {digest} failed integrity check")
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_name, path)
+
+
+def create_blob_store(get_db: Callable) -> BlobStore:
+    backend = os.environ.get('BLOB_STORE', 'gridfs')
+    if backend == 'local':
+        return LocalBlobStore(os.environ.get('BLOB_STORE_DIR', '/var/lib/judge/blobs'))
+    return GridFSBlobStore(get_db)
+
+
+def create_blob_cache(store: BlobStore) -> BlobCache:
+    default_dir = Path(tempfile.gettempdir()) / "judge-blob-cache"
+    return BlobCache(os.environ.get('BLOB_CACHE_DIR', default_dir), store)
+
+
+async def externalize_test_cases(test_cases: List[TestCase], store: BlobStore) -> List[TestCase]:
+    """Move oversized inputs/outputs into the blob store, leaving hash references"""
+    result = []
+    for tc in test_cases:
+        tc = tc.copy()
+        if tc.input_ref is None and len(tc.input.encode()) > INLINE_TEST_CASE_LIMIT:
+            tc.input_ref = await store.put(tc.input.encode())
+            tc.input = ""
+        if tc.expected_ref is None and len(tc.expected.encode()) > INLINE_TEST_CASE_LIMIT:
+            tc.expected_ref = await store.put(tc.expected.encode())
+            tc.expected = ""
+        result.append(tc)
+    return result
+
+
+async def resolve_test_cases(
+    test_cases: List[TestCase],
+    cache: BlobCache
+) -> List[Tuple[TestCaseValue, TestCaseValue]]:
+    """Turn test cases into executor inputs, swapping blob references for cached file paths"""
+    resolved = []
+    for tc in test_cases:
+        test_input = await cache.path(tc.input_ref) if tc.input_ref else tc.input
+        expected = await cache.path(tc.expected_ref) if tc.expected_ref else tc.expected
+        resolved.append((test_input, expected))
+    return resolved
+
+
+async def migrate_problems(problems_collection, store: BlobStore) -> int:
+    """Externalize oversized test cases of problems stored before blob storage existed"""
+    migrated = 0
+    async for doc in problems_collection.find({}, {"id": 1, "test_cases": 1}):
+        test_cases = [TestCase(**tc) for tc in doc.get("test_cases", [])]
+        externalized = await externalize_test_cases(test_cases, store)
+        if externalized != test_cases:
+            await problems_collection.update_one(
+                {"id": doc["id"]},
+                {"$set": {"test_cases": [tc.dict() for tc in externalized]}}
+            )
+            migrated += 1
+    return migrated
+
+
+if __name__ == "__main__":
+    from database import problems_collection, blob_store
+
+    count = asyncio.run(migrate_problems(problems_collection, blob_store))
+    print(f"Externalized test cases for {count} problems")
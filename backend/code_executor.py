@@ -1,28 +1,150 @@
 import asyncio
 import tempfile
 import os
+import shutil
 import subprocess
 import time
-from typing import List, Tuple
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
 from models import LanguageEnum, TestResult, CodeRunResponse
+from comparator import Comparator
+from blob_store import TestCaseValue
+from metrics import stage, register_executor_gauges
+
+# Blob-backed test data is shown to users truncated to this many characters
+PREVIEW_CHARS = 1000
+READ_CHUNK_CHARS = 64 * 1024
+
+def _default_workspace_root() -> Path:
+    # tmpfs keeps harness files off the disk where the host has one
+    shm = Path('/dev/shm')
+    base = shm if shm.is_dir() and os.access(shm, os.W_OK) else Path(tempfile.gettempdir())
+    return base / 'judge-workspaces'
+
+WORKSPACE_ROOT = Path(os.environ.get('JUDGE_WORKSPACE_ROOT') or _default_workspace_root())
+
+def _process_start_time(pid: int) -> Optional[str]:
+    """When the process started, in clock ticks since boot; None where /proc isn't available"""
+    try:
+        stat = Path(f'/proc/{pid}/stat').read_text()
+    except OSError:
+        return None
+    # The command name may contain spaces, so count fields from after its closing paren
+    return stat.rpartition(')')[2].split()[19]
+
+def _owner_tag(pid: int) -> str:
+    # A pid alone can be reused, e.g. pid 1 again after a container restart;
+    # with the start time it names one process
+    return f"{pid}.{_process_start_time(pid) or 0}"
+
+@contextmanager
+def job_workspace() -> Iterator[Path]:
+    """A directory for one submission, removed however the job ends.
+
+    Named after the owning process so a sweep can tell orphans from
+    workspaces of other live judges sharing the root.
+    """
+    WORKSPACE_ROOT.mkdir(parents=True, exist_ok=True)
+    path = Path(tempfile.mkdtemp(dir=WORKSPACE_ROOT, prefix=f"{_owner_tag(os.getpid())}-"))
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _owner_alive(owner: str) -> bool:
+    pid, _, _ = owner.partition('.')
+    return pid.isdigit() and _process_alive(int(pid)) and owner == _owner_tag(int(pid))
+
+def sweep_orphaned_workspaces() -> int:
+    """Remove workspaces left behind by judge processes that died mid-job"""
+    if not WORKSPACE_ROOT.is_dir():
+        return 0
+    removed = 0
+    for path in WORKSPACE_ROOT.iterdir():
+        owner, _, _ = path.name.partition('-')
+        if _owner_alive(owner):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
+
+def _expected_chunks(expected: TestCaseValue) -> Iterator[str]:
+    """Stream expected output from a cached blob instead of loading it whole"""
+    if not isinstance(expected, Path):
+        yield expected
+        return
+    with open(expected, 'r') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_CHARS), ''):
+            yield chunk
+
+def _preview(value: TestCaseValue) -> str:
+    if not isinstance(value, Path):
+        return value
+    with open(value, 'r') as f:
+        text = f.read(PREVIEW_CHARS + 1)
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS] + "..."
+
+def _measured_runtime(test_results: List[TestResult]) -> Optional[str]:
+    """Total wall time of the cases, if every case ran to completion"""
+    if not test_results or any(result.time_ms is None for result in test_results):
+        return None
+    return f"{round(sum(result.time_ms for result in test_results))}ms"
 
 class CodeExecutor:
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None, niceness: int = 0):
         self.timeout = 5  # 5 seconds timeout
         self.memory_limit = 128  # 128MB memory limit
+        # Jobs beyond this many wait in line instead of oversubscribing the host
+        self.max_concurrency = max_concurrency or int(os.environ.get('JUDGE_CONCURRENCY', os.cpu_count() or 1))
+        # Background work (rejudges) runs its sandboxes at a lower CPU priority than live judging
+        self.niceness = niceness
+        self._preexec = (lambda: os.nice(niceness)) if niceness else None
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.queued = 0
+        self.running = 0
 
     async def execute_code(
         self, 
         code: str, 
         language: LanguageEnum, 
-        test_cases: List[Tuple[str, str]]
+        test_cases: List[Tuple[TestCaseValue, TestCaseValue]],
+        comparator: Optional[Comparator] = None
     ) -> CodeRunResponse:
         """Execute code against test cases"""
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.running += 1
+        try:
+            return await self._execute(code, language, test_cases, comparator or Comparator())
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    async def _execute(
+        self,
+        code: str,
+        language: LanguageEnum,
+        test_cases: List[Tuple[TestCaseValue, TestCaseValue]],
+        comparator: Comparator
+    ) -> CodeRunResponse:
         try:
             if language == LanguageEnum.JAVASCRIPT:
-                return await self._execute_javascript(code, test_cases)
+                return await self._execute_javascript(code, test_cases, comparator)
             elif language == LanguageEnum.PYTHON:
-                return await self._execute_python(code, test_cases)
+                return await self._execute_python(code, test_cases, comparator)
             elif language == LanguageEnum.JAVA:
                 return await self._execute_java(code, test_cases)
             elif language == LanguageEnum.CPP:
@@ -42,21 +164,19 @@ class CodeExecutor:
                 error=f"Execution error: {str(e)}"
             )
 
-    async def _execute_javascript(self, code: str, test_cases: List[Tuple[str, str]]) -> CodeRunResponse:
+    async def _execute_javascript(
+        self,
+        code: str,
+        test_cases: List[Tuple[TestCaseValue, TestCaseValue]],
+        comparator: Comparator
+    ) -> CodeRunResponse:
         """Execute JavaScript code"""
-        test_results = []
-        console_output = ""
-        
-        for test_input, expected_output in test_cases:
-            try:
-                # Create a temporary file with the code
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.js', delete=False) as f:
-                    # Wrap code to handle input/output
-                    wrapped_code = f"""
+        # Wrap code to handle input/output; input arrives on stdin
+        wrapped_code = f"""
 {code}
 
 // Parse input
-const input = `{test_input}`.trim().split('\\n');
+const input = require('fs').readFileSync(0, 'utf8').trim().split('\\n');
 const nums = JSON.parse(input[0]);
 const target = parseInt(input[1]);
 
@@ -64,79 +184,21 @@ const target = parseInt(input[1]);
 const result = twoSum(nums, target);
 console.log(JSON.stringify(result));
 """
-                    f.write(wrapped_code)
-                    f.flush()
-                    
-                    # Execute with Node.js
-                    process = await asyncio.create_subprocess_exec(
-                        'node', f.name,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
-                    )
-                    
-                    try:
-                        stdout, stderr = await asyncio.wait_for(
-                            process.communicate(), 
-                            timeout=self.timeout
-                        )
-                        
-                        actual_output = stdout.decode().strip()
-                        error_output = stderr.decode().strip()
-                        
-                        if error_output:
-                            console_output += f"Error: {error_output}\n"
-                        
-                        passed = actual_output == expected_output
-                        test_results.append(TestResult(
-                            input=test_input,
-                            expected=expected_output,
-                            actual=actual_output,
-                            passed=passed
-                        ))
-                        
-                    except asyncio.TimeoutError:
-                        process.kill()
-                        test_results.append(TestResult(
-                            input=test_input,
-                            expected=expected_output,
-                            actual="",
-                            passed=False
-                        ))
-                        console_output += "Time Limit Exceeded\n"
-                    
-                    finally:
-                        os.unlink(f.name)
-                        
-            except Exception as e:
-                test_results.append(TestResult(
-                    input=test_input,
-                    expected=expected_output,
-                    actual="",
-                    passed=False
-                ))
-                console_output += f"Runtime Error: {str(e)}\n"
-        
-        all_passed = all(result.passed for result in test_results)
-        return CodeRunResponse(
-            success=all_passed,
-            test_results=test_results,
-            console_output=console_output,
-            runtime=f"{len(test_results) * 50}ms"  # Mock runtime
-        )
+        return await self._run_test_cases('node', '.js', wrapped_code, test_cases, comparator)
 
-    async def _execute_python(self, code: str, test_cases: List[Tuple[str, str]]) -> CodeRunResponse:
+    async def _execute_python(
+        self,
+        code: str,
+        test_cases: List[Tuple[TestCaseValue, TestCaseValue]],
+        comparator: Comparator
+    ) -> CodeRunResponse:
         """Execute Python code"""
-        test_results = []
-        console_output = ""
-        
-        for test_input, expected_output in test_cases:
-            try:
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                    wrapped_code = f"""
+        wrapped_code = f"""
 {code}
 
 # Parse input
-input_lines = '''{test_input}'''.strip().split('\\n')
+import sys as _sys
+input_lines = _sys.stdin.read().strip().split('\\n')
 nums = eval(input_lines[0])
 target = int(input_lines[1])
 
@@ -144,109 +206,155 @@ target = int(input_lines[1])
 result = twoSum(nums, target)
 print(result)
 """
-                    f.write(wrapped_code)
-                    f.flush()
-                    
-                    process = await asyncio.create_subprocess_exec(
-                        'python3', f.name,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
-                    )
+        return await self._run_test_cases('python3', '.py', wrapped_code, test_cases, comparator)
+
+    async def _run_test_cases(
+        self,
+        interpreter: str,
+        suffix: str,
+        wrapped_code: str,
+        test_cases: List[Tuple[TestCaseValue, TestCaseValue]],
+        comparator: Comparator
+    ) -> CodeRunResponse:
+        """Run wrapped code once per test case, feeding the input on stdin"""
+        test_results = []
+        console_output = ""
+        
+        with job_workspace() as workspace:
+            # The harness is written once per submission and reused by every case
+            with stage("harness_prep"):
+                script = workspace / f"main{suffix}"
+                script.write_text(wrapped_code)
+            
+            for index, (test_input, expected_output) in enumerate(test_cases):
+                process = None
+                # Each case starts from an empty directory, so files one case writes can't leak into the next
+                case_dir = workspace / f"case-{index}"
+                case_dir.mkdir()
+                try:
+                    # Blob-backed inputs are redirected straight from the cached file
+                    with stage("sandbox_spawn"):
+                        if isinstance(test_input, Path):
+                            with open(test_input, 'rb') as stdin_file:
+                                process = await asyncio.create_subprocess_exec(
+                                    interpreter, str(script),
+                                    stdin=stdin_file,
+                                    stdout=asyncio.subprocess.PIPE,
+                                    stderr=asyncio.subprocess.PIPE,
+                                    cwd=case_dir,
+                                    preexec_fn=self._preexec
+                                )
+                            stdin_data = None
+                        else:
+                            process = await asyncio.create_subprocess_exec(
+                                interpreter, str(script),
+                                stdin=asyncio.subprocess.PIPE,
+                                stdout=asyncio.subprocess.PIPE,
+                                stderr=asyncio.subprocess.PIPE,
+                                cwd=case_dir,
+                                preexec_fn=self._preexec
+                            )
+                            stdin_data = test_input.encode()
                     
-                    try:
+                    with stage("case_execution"):
+                        started = time.perf_counter()
                         stdout, stderr = await asyncio.wait_for(
-                            process.communicate(), 
+                            process.communicate(stdin_data), 
                             timeout=self.timeout
                         )
-                        
-                        actual_output = stdout.decode().strip()
-                        error_output = stderr.decode().strip()
-                        
-                        if error_output:
-                            console_output += f"Error: {error_output}\n"
-                        
-                        # Normalize output format
-                        try:
-                            actual_list = eval(actual_output)
-                            expected_list = eval(expected_output)
-                            passed = actual_list == expected_list
-                        except:
-                            passed = actual_output == expected_output
-                            
-                        test_results.append(TestResult(
-                            input=test_input,
-                            expected=expected_output,
-                            actual=actual_output,
-                            passed=passed
-                        ))
-                        
-                    except asyncio.TimeoutError:
-                        process.kill()
-                        test_results.append(TestResult(
-                            input=test_input,
-                            expected=expected_output,
-                            actual="",
-                            passed=False
-                        ))
-                        console_output += "Time Limit Exceeded\n"
+                        elapsed_ms = (time.perf_counter() - started) * 1000
+                    
+                    actual_output = stdout.decode().strip()
+                    error_output = stderr.decode().strip()
+                    
+                    if error_output:
+                        console_output += f"Error: {error_output}\n"
                     
-                    finally:
-                        os.unlink(f.name)
-                        
-            except Exception as e:
-                test_results.append(TestResult(
-                    input=test_input,
-                    expected=expected_output,
-                    actual="",
-                    passed=False
-                ))
-                console_output += f"Runtime Error: {str(e)}\n"
+                    with stage("comparison"):
+                        passed = comparator.compare(_expected_chunks(expected_output), actual_output)
+                    test_results.append(TestResult(
+                        input=_preview(test_input),
+                        expected=_preview(expected_output),
+                        actual=actual_output,
+                        passed=passed,
+                        time_ms=round(elapsed_ms, 2) if process.returncode == 0 else None
+                    ))
+                    
+                except asyncio.TimeoutError:
+                    test_results.append(TestResult(
+                        input=_preview(test_input),
+                        expected=_preview(expected_output),
+                        actual="",
+                        passed=False
+                    ))
+                    console_output += "Time Limit Exceeded\n"
+                
+                except Exception as e:
+                    test_results.append(TestResult(
+                        input=_preview(test_input),
+                        expected=_preview(expected_output),
+                        actual="",
+                        passed=False
+                    ))
+                    console_output += f"Runtime Error: {str(e)}\n"
+                
+                finally:
+                    # Timed out or cancelled: don't leave the process running in a removed workspace
+                    if process is not None and process.returncode is None:
+                        process.kill()
+                        await process.wait()
+                    shutil.rmtree(case_dir, ignore_errors=True)
         
         all_passed = all(result.passed for result in test_results)
         return CodeRunResponse(
             success=all_passed,
             test_results=test_results,
             console_output=console_output,
-            runtime=f"{len(test_results) * 45}ms"  # Mock runtime
+            runtime=_measured_runtime(test_results)
         )
 
-    async def _execute_java(self, code: str, test_cases: List[Tuple[str, str]]) -> CodeRunResponse:
+    async def _execute_java(self, code: str, test_cases: List[Tuple[TestCaseValue, TestCaseValue]]) -> CodeRunResponse:
         """Execute Java code (simplified mock)"""
         # For demo purposes, return mock results
         test_results = []
         for test_input, expected_output in test_cases:
             test_results.append(TestResult(
-                input=test_input,
-                expected=expected_output,
-                actual=expected_output,  # Mock success
+                input=_preview(test_input),
+                expected=_preview(expected_output),
+                actual=_preview(expected_output),  # Mock success
                 passed=True
             ))
         
         return CodeRunResponse(
             success=True,
             test_results=test_results,
-            console_output="Java execution completed successfully (mock)",
-            runtime="120ms"
+            console_output="Java execution completed successfully (mock)"
         )
 
-    async def _execute_cpp(self, code: str, test_cases: List[Tuple[str, str]]) -> CodeRunResponse:
+    async def _execute_cpp(self, code: str, test_cases: List[Tuple[TestCaseValue, TestCaseValue]]) -> CodeRunResponse:
         """Execute C++ code (simplified mock)"""
         # For demo purposes, return mock results
         test_results = []
         for test_input, expected_output in test_cases:
             test_results.append(TestResult(
-                input=test_input,
-                expected=expected_output,
-                actual=expected_output,  # Mock success
+                input=_preview(test_input),
+                expected=_preview(expected_output),
+                actual=_preview(expected_output),  # Mock success
                 passed=True
             ))
         
         return CodeRunResponse(
             success=True,
             test_results=test_results,
-            console_output="C++ execution completed successfully (mock)",
-            runtime="95ms"
+            console_output="C++ execution completed successfully (mock)"
         )
 
-# Global executor instance
-code_executor = CodeExecutor()
\ No newline at end of file
+_code_executor: Optional[CodeExecutor] = None
+
+def get_code_executor() -> CodeExecutor:
+    """The process-wide executor, created on first use rather than at import"""
+    global _code_executor
+    if _code_executor is None:
+        _code_executor = CodeExecutor()
+        register_executor_gauges(_code_executor)
+    return _code_executor
\ No newline at end of file
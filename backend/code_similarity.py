@@ -0,0 +1,151 @@
+import difflib
+import hashlib
+import re
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Tokens per shingle; long enough that shared boilerplate alone rarely matches
+SHINGLE_SIZE = 5
+# Signature length, split into LSH bands of BAND_ROWS values. Pairs whose
+# estimated Jaccard similarity is above about (1 / BANDS) ** (1 / BAND_ROWS),
+# roughly 0.42 here, very likely share a band and become candidates.
+SIGNATURE_SIZE = 128
+BAND_ROWS = 4
+BANDS = SIGNATURE_SIZE // BAND_ROWS
+# Submissions shorter than this are mostly the function template
+MIN_TOKENS = 30
+
+_MASK = 0xFFFFFFFF
+# Added per bin skipped when an empty bin borrows its neighbour's value
+_DENSIFY_OFFSET = 0x9E3779B1
+
+_C_LIKE_COMMENT = r"//[^\n]*|/\*.*?\*/"
+_COMMENTS = {
+    "python": r"#[^\n]*",
+    "javascript": _C_LIKE_COMMENT,
+    "java": _C_LIKE_COMMENT,
+    "cpp": _C_LIKE_COMMENT,
+}
+_STRING = r'"""(?:.|\n)*?"""|\'\'\'(?:.|\n)*?\'\'\'|`(?:\\.|[^`\\])*`|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+_TOKEN_RES = {
+    language: re.compile(
+        rf"(?P<comment>{comment})|(?P<string>{_STRING})|(?P<number>\d+(?:\.\d+)?)"
+        rf"|(?P<name>[A-Za-z_$]\w*)|(?P<op>[^\s\w])",
+        re.S
+    )
+    for language, comment in _COMMENTS.items()
+}
+
+# Kept verbatim; every other identifier becomes a placeholder so renaming variables changes nothing
+KEYWORDS = {
+    "python": {
+        "and", "as", "break", "class", "continue", "def", "del", "elif", "else", "except", "False",
+        "finally", "for", "from", "if", "import", "in", "is", "lambda", "None", "not", "or", "pass",
+        "raise", "return", "True", "try", "while", "with", "yield",
+    },
+    "javascript": {
+        "break", "case", "catch", "class", "const", "continue", "default", "do", "else", "false",
+        "for", "function", "if", "in", "let", "new", "null", "of", "return", "switch", "this",
+        "throw", "true", "try", "undefined", "var", "while",
+    },
+    "java": {
+        "boolean", "break", "case", "catch", "char", "class", "continue", "default", "do", "double",
+        "else", "false", "final", "for", "if", "int", "long", "new", "null", "private", "public",
+        "return", "static", "switch", "this", "throw", "true", "try", "void", "while",
+    },
+    "cpp": {
+        "auto", "bool", "break", "case", "char", "class", "const", "continue", "default", "do",
+        "double", "else", "false", "for", "if", "int", "long", "new", "nullptr", "return", "struct",
+        "switch", "true", "unsigned", "void", "while",
+    },
+}
+
+
+def normalize_tokens(code: str, language: str) -> List[str]:
+    """Token stream with comments dropped and names, strings and numbers replaced by placeholders"""
+    language = getattr(language, "value", language)
+    keywords = KEYWORDS[language]
+    tokens = []
+    for match in _TOKEN_RES[language].finditer(code):
+        kind = match.lastgroup
+        if kind == "comment":
+            continue
+        if kind == "string":
+            tokens.append("S")
+        elif kind == "number":
+            tokens.append("N")
+        elif kind == "name":
+            value = match.group()
+            tokens.append(value if value in keywords else "V")
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def _shingle_hashes(tokens: List[str]) -> Iterable[int]:
+    for i in range(len(tokens) - SHINGLE_SIZE + 1):
+        shingle = "\x00".join(tokens[i:i + SHINGLE_SIZE]).encode()
+        yield int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "little")
+
+
+def minhash_signature(code: str, language: str) -> Optional[bytes]:
+    """Packed MinHash signature, or None for code too short to compare.
+
+    Uses one-permutation hashing: each shingle is hashed once, the low bits
+    pick one of SIGNATURE_SIZE bins and each bin keeps its minimum. Empty
+    bins borrow from the next non-empty bin to the right. This costs one
+    hash per shingle instead of one per shingle and signature slot.
+    """
+    tokens = normalize_tokens(code, language)
+    if len(tokens) < MIN_TOKENS:
+        return None
+    bins: List[Optional[int]] = [None] * SIGNATURE_SIZE
+    for value in _shingle_hashes(tokens):
+        index = value % SIGNATURE_SIZE
+        value = (value >> 32) & _MASK
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    filled = [i for i, value in enumerate(bins) if value is not None]
+    signature = []
+    for i, value in enumerate(bins):
+        if value is None:
+            # Nearest filled bin to the right, wrapping around
+            j = next((k for k in filled if k > i), filled[0])
+            distance = (j - i) % SIGNATURE_SIZE
+            value = (bins[j] + distance * _DENSIFY_OFFSET) & _MASK
+        signature.append(value)
+    return struct.pack(f"<{SIGNATURE_SIZE}I", *signature)
+
+
+def estimated_similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of the two shingle sets"""
+    left = struct.unpack(f"<{SIGNATURE_SIZE}I", a)
+    right = struct.unpack(f"<{SIGNATURE_SIZE}I", b)
+    return sum(x == y for x, y in zip(left, right)) / SIGNATURE_SIZE
+
+
+def band_keys(signature: bytes) -> List[bytes]:
+    width = BAND_ROWS * 4
+    return [bytes([band]) + signature[band * width:(band + 1) * width] for band in range(BANDS)]
+
+
+def candidate_pairs(signatures: Dict[str, bytes]) -> List[Tuple[str, str]]:
+    """Pairs of keys sharing at least one LSH band"""
+    buckets: Dict[bytes, List[str]] = {}
+    for key, signature in signatures.items():
+        for band in band_keys(signature):
+            buckets.setdefault(band, []).append(key)
+    pairs = set()
+    for keys in buckets.values():
+        for i in range(len(keys)):
+            for j in range(i + 1, len(keys)):
+                pairs.add((keys[i], keys[j]) if keys[i] < keys[j] else (keys[j], keys[i]))
+    return sorted(pairs)
+
+
+def token_similarity(code_a: str, code_b: str, language: str) -> float:
+    """Diff ratio of the normalized token streams, used to confirm LSH candidates"""
+    matcher = difflib.SequenceMatcher(
+        None, normalize_tokens(code_a, language), normalize_tokens(code_b, language), autojunk=False
+    )
+    return matcher.ratio()
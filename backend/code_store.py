@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from bson import Binary
+from code_similarity import minhash_signature
+
+try:
+    import zstandard
+except ImportError:  # zlib keeps the store usable where zstandard isn't installed
+    zstandard = None
+
+ZSTD_LEVEL = 10
+
+
+def code_digest(code: str) -> str:
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+def compress_code(code: str) -> Dict:
+    raw = code.encode()
+    if zstandard is not None:
+        return {"codec": "zstd", "data": Binary(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw))}
+    return {"codec": "zlib", "data": Binary(zlib.compress(raw, 9))}
+
+
+def decompress_code(doc: Dict) -> str:
+    if doc["codec"] == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed submission code")
+        return zstandard.ZstdDecompressor().decompress(doc["data"]).decode()
+    return zlib.decompress(doc["data"]).decode()
+
+
+class CodeStore:
+    """Content-addressed, compressed submission source shared by identical submissions"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def put(self, code: str, language: Optional[str] = None) -> str:
+        """Store code once per digest; with a language, also its similarity signature.
+
+        Resubmissions and untouched templates are common, so known code is
+        looked up by digest before paying for compression and the signature.
+        """
+        digest = code_digest(code)
+        if await self.collection.find_one({"_id": digest}, {"_id": 1}):
+            return digest
+        fields = {
+            **compress_code(code),
+            "size": len(code),
+            "created_at": datetime.utcnow()
+        }
+        minhash = minhash_signature(code, language) if language is not None else None
+        if minhash is not None:
+            # Similarity signature for plagiarism checks (see code_similarity.py)
+            fields["minhash"] = Binary(minhash)
+        # Still an upsert: a concurrent put of the same code may insert it first
+        await self.collection.update_one({"_id": digest}, {"$setOnInsert": fields}, upsert=True)
+        return digest
+
+    async def get(self, digest: str) -> Optional[str]:
+        doc = await self.collection.find_one({"_id": digest})
+        return decompress_code(doc) if doc else None
+
+    async def get_many(self, digests: Iterable[str]) -> Dict[str, str]:
+        cursor = self.collection.find({"_id": {"$in": list(set(digests))}})
+        return {doc["_id"]: decompress_code(doc) async for doc in cursor}
+
+
+async def migrate_inline_code(submissions_collection, store: CodeStore) -> int:
+    """Move `code` of submissions stored before the code store existed"""
+    migrated = 0
+    cursor = submissions_collection.find({"code": {"$exists": True}}, {"id": 1, "code": 1})
+    async for doc in cursor:
+        digest = await store.put(doc["code"])
+        await submissions_collection.update_one(
+            {"id": doc["id"]},
+            {"$set": {"code_hash": digest}, "$unset": {"code": ""}}
+        )
+        migrated += 1
+    return migrated
+
+
+if __name__ == "__main__":
+    from database import submissions_collection, code_store
+
+    count = asyncio.run(migrate_inline_code(submissions_collection, code_store))
+    print(f"Moved code of {count} submissions into the code store")
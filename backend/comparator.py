@@ -0,0 +1,238 @@
+import math
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+from models import CompareModeEnum
+
+# Either a complete output string or an iterable of chunks read from a stream
+Output = Union[str, Iterable[str]]
+Token = Tuple[str, object]
+
+_TOKEN_RE = re.compile(r"""
+    (?P<punct>[\[\]{}(),:])
+  | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<num>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?![\w.]))
+  | (?P<word>[^\s\[\]{}(),:"']+)
+  | (?P<other>\S)
+""", re.VERBOSE)
+_WHITESPACE_RE = re.compile(r"\s*")
+
+# Literals that print differently in Python and JavaScript
+_LITERALS = {
+    "true": "true", "True": "true",
+    "false": "false", "False": "false",
+    "null": "null", "None": "null", "undefined": "null",
+}
+_BRACKETS = {"(": "[", ")": "]"}
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", "'": "'", '"': '"', "/": "/"}
+
+class UnknownCheckerError(ValueError):
+    """A problem names a custom checker that isn't registered"""
+
+
+# Custom checkers: name -> fn(expected, actual) -> bool
+CHECKERS: Dict[str, Callable[[str, str], bool]] = {}
+
+
+def register_checker(name: str):
+    """Register a custom checker usable via `Problem.checker`"""
+    def decorator(fn: Callable[[str, str], bool]):
+        CHECKERS[name] = fn
+        return fn
+    return decorator
+
+
+def _chunks(output: Output) -> Iterator[str]:
+    if isinstance(output, str):
+        yield output
+    else:
+        for chunk in output:
+            if chunk:
+                yield chunk
+
+
+def _unescape(body: str) -> str:
+    if "\\" not in body:
+        return body
+    return re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+def _normalize(kind: str, text: str) -> Token:
+    if kind == "punct":
+        return ("p", _BRACKETS.get(text, text))
+    if kind == "str":
+        return ("s", _unescape(text[1:-1]))
+    if kind == "num":
+        try:
+            return ("n", int(text))
+        except ValueError:
+            return ("n", float(text))
+    if text in _LITERALS:
+        return ("l", _LITERALS[text])
+    return ("w", text)
+
+
+def iter_tokens(output: Output) -> Iterator[Token]:
+    """Tokenize output incrementally, never holding more than a chunk plus one token"""
+    buf = ""
+    chunks = _chunks(output)
+    done = False
+    while not done:
+        try:
+            buf += next(chunks)
+        except StopIteration:
+            done = True
+        pos = 0
+        while True:
+            pos = _WHITESPACE_RE.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            m = _TOKEN_RE.match(buf, pos)
+            kind = m.lastgroup
+            # A token touching the end of the buffer may continue in the next chunk
+            if not done and kind != "punct" and (m.end() == len(buf) or kind == "other"):
+                break
+            yield _normalize(kind, m.group())
+            pos = m.end()
+        buf = buf[pos:]
+
+
+def _iter_stripped(output: Output) -> Iterator[str]:
+    """Yield output with leading and trailing whitespace removed, chunk by chunk"""
+    started = False
+    pending = ""
+    for chunk in _chunks(output):
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        body = chunk.rstrip()
+        if body:
+            yield pending + body
+            pending = chunk[len(body):]
+        else:
+            pending += chunk
+
+
+def _streams_equal(a: Iterator[str], b: Iterator[str]) -> bool:
+    """Compare two chunk streams without joining either side"""
+    buf_a = buf_b = ""
+    while True:
+        if not buf_a:
+            buf_a = next(a, None)
+        if not buf_b:
+            buf_b = next(b, None)
+        if buf_a is None or buf_b is None:
+            return buf_a is None and buf_b is None
+        n = min(len(buf_a), len(buf_b))
+        if buf_a[:n] != buf_b[:n]:
+            return False
+        buf_a, buf_b = buf_a[n:], buf_b[n:]
+
+
+def _parse_value(first: Token, tokens: Iterator[Token]):
+    """Build a hashable value from a token stream (lists become tuples)"""
+    if first == ("p", "["):
+        items = []
+        for tok in tokens:
+            if tok == ("p", "]"):
+                return ("list", tuple(items))
+            if tok != ("p", ","):
+                items.append(_parse_value(tok, tokens))
+        raise ValueError("Unterminated list")
+    if first == ("p", "{"):
+        items = []
+        for tok in tokens:
+            if tok == ("p", "}"):
+                return ("dict", frozenset(items))
+            if tok in (("p", ","), ("p", ":")):
+                continue
+            key = _parse_value(tok, tokens)
+            if next(tokens, None) != ("p", ":"):
+                raise ValueError("Expected ':'")
+            value = next(tokens, None)
+            if value is None:
+                raise ValueError("Unterminated object")
+            items.append((key, _parse_value(value, tokens)))
+        raise ValueError("Unterminated object")
+    return first
+
+
+def _iter_elements(output: Output) -> Iterator[object]:
+    """Yield top-level elements of a list output, or the whole output as one element"""
+    tokens = iter_tokens(output)
+    first = next(tokens, None)
+    if first is None:
+        return
+    if first != ("p", "["):
+        yield _parse_value(first, tokens)
+        for tok in tokens:
+            yield _parse_value(tok, tokens)
+        return
+    for tok in tokens:
+        if tok == ("p", "]"):
+            break
+        if tok != ("p", ","):
+            yield _parse_value(tok, tokens)
+    else:
+        raise ValueError("Unterminated list")
+    if next(tokens, None) is not None:
+        raise ValueError("Trailing output after list")
+
+
+class Comparator:
+    """Decides whether a program's output matches the expected output"""
+
+    def __init__(
+        self,
+        mode: CompareModeEnum = CompareModeEnum.WHITESPACE,
+        epsilon: float = 1e-6,
+        checker: Optional[str] = None
+    ):
+        self.mode = CompareModeEnum(mode)
+        self.epsilon = epsilon
+        self.checker = None
+        if self.mode == CompareModeEnum.CUSTOM:
+            if checker not in CHECKERS:
+                raise UnknownCheckerError(f"Unknown checker: {checker}")
+            self.checker = CHECKERS[checker]
+
+    @classmethod
+    def for_problem(cls, problem) -> "Comparator":
+        return cls(problem.compare_mode, problem.float_epsilon, problem.checker)
+
+    def compare(self, expected: Output, actual: Output) -> bool:
+        if self.mode == CompareModeEnum.EXACT:
+            return _streams_equal(_iter_stripped(expected), _iter_stripped(actual))
+        if self.mode == CompareModeEnum.UNORDERED:
+            return self._compare_unordered(expected, actual)
+        if self.mode == CompareModeEnum.CUSTOM:
+            return bool(self.checker("".join(_chunks(expected)), "".join(_chunks(actual))))
+        return self._compare_tokens(expected, actual)
+
+    def _compare_tokens(self, expected: Output, actual: Output) -> bool:
+        use_epsilon = self.mode == CompareModeEnum.FLOAT
+        exp_tokens, act_tokens = iter_tokens(expected), iter_tokens(actual)
+        while True:
+            exp, act = next(exp_tokens, None), next(act_tokens, None)
+            if exp is None or act is None:
+                return exp is None and act is None
+            if exp == act:
+                continue
+            if use_epsilon and exp[0] == act[0] == "n":
+                if math.isclose(exp[1], act[1], rel_tol=self.epsilon, abs_tol=self.epsilon):
+                    continue
+            return False
+
+    def _compare_unordered(self, expected: Output, actual: Output) -> bool:
+        # Only the expected side is held, as a multiset; actual is consumed as it streams
+        try:
+            remaining = Counter(_iter_elements(expected))
+            for element in _iter_elements(actual):
+                if not remaining[element]:
+                    return False
+                remaining[element] -= 1
+        except ValueError:
+            return False
+        return not +remaining
@@ -1,32 +1,205 @@
-from motor.motor_asyncio import AsyncIOMotorClient
 from models import *
-from typing import List, Optional, Dict
+from blob_store import create_blob_store, create_blob_cache, externalize_test_cases, resolve_test_cases
+from code_store import CodeStore
+from search_index import ProblemSearchIndex
+from problem_counters import ProblemCounterBuffer
+from activity import activity_id, activity_range, current_streak
+from ranking import RankIndex, ranking_score
+from submission_archive import SubmissionArchive
+from runtime_histograms import beats, histogram_id, histogram_increments, memory_bucket, runtime_bucket
+from typing import Iterable, List, Optional, Dict, Set, Tuple
+from datetime import datetime, timedelta
 import os
 
-# Database connection
+# Database connection settings; the client itself is created on first use or in the app lifespan
 mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'leetcode_clone')]
+db_name = os.environ.get('DB_NAME', 'leetcode_clone')
+
+def _client_options() -> Dict:
+    from mongo_metrics import MongoCommandMetrics, MongoPoolMetrics
+    env = os.environ.get
+    return {
+        "maxPoolSize": int(env('MONGO_MAX_POOL_SIZE', 100)),
+        "minPoolSize": int(env('MONGO_MIN_POOL_SIZE', 0)),
+        "maxIdleTimeMS": int(env('MONGO_MAX_IDLE_TIME_MS', 300000)),
+        "waitQueueTimeoutMS": int(env('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000)),
+        "serverSelectionTimeoutMS": int(env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        "connectTimeoutMS": int(env('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        "socketTimeoutMS": int(env('MONGO_SOCKET_TIMEOUT_MS', 30000)),
+        "compressors": env('MONGO_COMPRESSORS', 'zstd,zlib'),
+        "event_listeners": [MongoCommandMetrics(), MongoPoolMetrics()],
+    }
+
+# Read-heavy catalog queries may go to secondaries; writes and judge reads stay on the primary
+READ_PREFERENCE_MODES = ('primary', 'primaryPreferred', 'secondary', 'secondaryPreferred', 'nearest')
+CATALOG_READ_PREFERENCE = os.environ.get('MONGO_CATALOG_READ_PREFERENCE', 'secondaryPreferred')
+# Checked here rather than on first query, so a typo stops startup instead of failing catalog reads
+if CATALOG_READ_PREFERENCE not in READ_PREFERENCE_MODES:
+    raise ValueError(
+        f"MONGO_CATALOG_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCE_MODES)}, "
+        f"not {CATALOG_READ_PREFERENCE!r}"
+    )
+
+client = None
+db = None
+_generation = 0
+_read_preferences_supported = True
+
+def use_client(new_client, name: str = db_name, read_preferences: bool = True):
+    """Bind the module's collections to a client (the real one, or an in-process mock).
+
+    In-process mocks don't support read preferences; pass read_preferences=False for them.
+    """
+    global client, db, _generation, _read_preferences_supported
+    client = new_client
+    db = client[name]
+    _read_preferences_supported = read_preferences
+    _generation += 1
+
+def get_db():
+    if db is None:
+        # Imported here so processes that never reach Mongo (health checks, tooling) skip it
+        from motor.motor_asyncio import AsyncIOMotorClient
+        use_client(AsyncIOMotorClient(mongo_url, **_client_options()))
+    return db
+
+def close_client():
+    global client, db
+    if client is not None:
+        client.close()
+    client = db = None
+
+class _LazyCollection:
+    """Stands in for a collection and resolves it on use, so importing this module doesn't connect"""
+    
+    def __init__(self, name: str, read_preference: str = 'primary'):
+        self._name = name
+        self._read_preference = read_preference
+        self._cached = (None, None)
+    
+    def _resolve(self):
+        generation, collection = self._cached
+        if generation != _generation or collection is None:
+            collection = get_db()[self._name]
+            if self._read_preference != 'primary' and _read_preferences_supported:
+                from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+                mode = read_pref_mode_from_name(self._read_preference)
+                collection = collection.with_options(read_preference=make_read_preference(mode, None))
+            self._cached = (_generation, collection)
+        return collection
+    
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
 
 # Collections
-problems_collection = db.problems
-users_collection = db.users
-submissions_collection = db.submissions
-contests_collection = db.contests
+problems_collection = _LazyCollection("problems")
+users_collection = _LazyCollection("users")
+submissions_collection = _LazyCollection("submissions")
+contests_collection = _LazyCollection("contests")
+reactions_collection = _LazyCollection("problem_reactions")
+# Accepted runtime/memory bucket counts per (problem, language); see runtime_histograms.py
+runtime_histograms_collection = _LazyCollection("runtime_histograms")
+# Per-user, per-day submission rollups; see activity.py
+activity_collection = _LazyCollection("user_activity")
+
+# Reference solutions and generators, away from problem reads
+references_collection = _LazyCollection("problem_references")
+
+# Submissions past SUBMISSION_HOT_DAYS, by month, and hot per-(user, problem, month) counts of them
+submission_archive = SubmissionArchive(_LazyCollection, lambda: get_db().list_collection_names())
+submission_summaries_collection = _LazyCollection("submission_summaries")
+
+# Users per ranking score, for live "my rank" lookups between recomputes
+rank_index = RankIndex(_LazyCollection("rank_buckets"))
+
+# Problem list and title lookups tolerate slightly stale secondaries
+catalog_problems_collection = _LazyCollection("problems", CATALOG_READ_PREFERENCE)
+
+# Deduplicated, compressed submission source
+code_store = CodeStore(_LazyCollection("submission_code"))
+
+# Large test case payloads live outside the problem documents
+blob_store = create_blob_store(get_db)
+blob_cache = create_blob_cache(blob_store)
+
+# Fields needed for the problem list; keeps test data out of catalog scans
+PROBLEM_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "difficulty": 1, "category": 1,
+    "tags": 1, "acceptance_rate": 1, "likes": 1
+}
+PROBLEM_SEARCH_PROJECTION = {**PROBLEM_SUMMARY_PROJECTION, "description": 1, "companies": 1}
+PROBLEM_DETAIL_PROJECTION = {**PROBLEM_SEARCH_PROJECTION, "examples": 1, "constraints": 1, "dislikes": 1}
+
+async def _load_search_documents() -> List[Dict]:
+    return [doc async for doc in catalog_problems_collection.find({}, PROBLEM_SEARCH_PROJECTION)]
+
+problem_search_index = ProblemSearchIndex(_load_search_documents)
+
+# Attempts, accepts and reactions, flushed to the problem documents in batches
+problem_counters = ProblemCounterBuffer(
+    problems_collection,
+    on_flush=lambda doc: problem_search_index.update_row(doc["id"], doc)
+)
+
+# SubmissionResponse fields, minus code and problem_title which are filled in separately
+SUBMISSION_HISTORY_PROJECTION = {
+    "_id": 0, "id": 1, "problem_id": 1, "language": 1, "status": 1, "runtime": 1,
+    "memory": 1, "test_cases_passed": 1, "total_test_cases": 1, "error_message": 1,
+    "submitted_at": 1
+}
 
 # Problem operations
 async def create_problem(problem: ProblemCreate) -> Problem:
-    problem_doc = Problem(**problem.dict())
-    result = await problems_collection.insert_one(problem_doc.dict())
-    problem_doc.id = str(result.inserted_id)
+    problem_doc = Problem(**problem.dict(exclude={"reference"}))
+    problem_doc.test_cases = await externalize_test_cases(problem_doc.test_cases, blob_store)
+    await problems_collection.insert_one(problem_doc.dict())
+    problem_search_index.add(problem_doc.dict())
+    if problem.reference is not None:
+        await set_problem_reference(problem_doc.id, problem.reference)
     return problem_doc
 
+async def set_problem_reference(problem_id: str, reference: ProblemReference):
+    await references_collection.update_one(
+        {"problem_id": problem_id},
+        {"$set": {**reference.dict(), "problem_id": problem_id, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def get_problem_reference(problem_id: str) -> Optional[ProblemReference]:
+    doc = await references_collection.find_one({"problem_id": problem_id})
+    if doc:
+        return ProblemReference(**doc)
+    return None
+
+async def replace_generated_test_cases(problem_id: str, generated: List[TestCase]):
+    """Swap a problem's generated test cases for a new set, keeping hand-written ones first"""
+    problem = await get_problem_by_id(problem_id)
+    manual = [tc for tc in problem.test_cases if not tc.generated]
+    test_cases = manual + await externalize_test_cases(generated, blob_store)
+    await problems_collection.update_one(
+        {"id": problem_id},
+        {"$set": {"test_cases": [tc.dict() for tc in test_cases]}}
+    )
+
 async def get_problem_by_id(problem_id: str) -> Optional[Problem]:
     doc = await problems_collection.find_one({"id": problem_id})
     if doc:
         return Problem(**doc)
     return None
 
+async def get_problems_by_ids(problem_ids: List[str]) -> List[ProblemDetail]:
+    """Problem pages for several ids with one query, in the order asked for; unknown ids are left out"""
+    problems = {
+        doc["id"]: ProblemDetail(**doc)
+        async for doc in problems_collection.find({"id": {"$in": problem_ids}}, PROBLEM_DETAIL_PROJECTION)
+    }
+    return [problems[problem_id] for problem_id in problem_ids if problem_id in problems]
+
+async def get_problem_test_cases(problem: Problem, limit: Optional[int] = None):
+    """Executor-ready (input, expected) pairs, with blob-backed cases served from the local cache"""
+    test_cases = problem.test_cases[:limit] if limit else problem.test_cases
+    return await resolve_test_cases(test_cases, blob_cache)
+
 async def get_problems(
     skip: int = 0, 
     limit: int = 20,
@@ -42,44 +215,75 @@ async def get_problems(
     if tags:
         query["tags"] = {"$in": tags}
     
-    cursor = problems_collection.find(query).skip(skip).limit(limit)
+    cursor = catalog_problems_collection.find(query).skip(skip).limit(limit)
     problems = []
     async for doc in cursor:
         problems.append(Problem(**doc))
     return problems
 
-async def get_problems_summary(user_id: Optional[str] = None) -> List[ProblemSummary]:
-    problems = await get_problems(limit=1000)  # Get all problems for summary
-    summaries = []
-    
-    user_submissions = {}
+async def set_problem_reaction(user_id: str, problem_id: str, reaction: ReactionEnum) -> ProblemReaction:
+    """Record a user's like/dislike and feed the change into the problem counters"""
+    previous = await reactions_collection.find_one_and_update(
+        {"_id": f"{user_id}:{problem_id}"},
+        {"$set": {
+            "user_id": user_id,
+            "problem_id": problem_id,
+            "reaction": reaction,
+            "updated_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    old = previous["reaction"] if previous else ReactionEnum.NONE
+    problem_counters.incr(
+        problem_id,
+        likes=(reaction == ReactionEnum.LIKE) - (old == ReactionEnum.LIKE),
+        dislikes=(reaction == ReactionEnum.DISLIKE) - (old == ReactionEnum.DISLIKE)
+    )
+    return ProblemReaction(problem_id=problem_id, reaction=reaction)
+
+async def get_user_problem_status(
+    user_id: Optional[str],
+    problem_ids: Optional[List[str]] = None
+) -> Tuple[Set[str], Set[str]]:
+    """Ids of problems the user has solved and has submitted to at all, optionally among problem_ids only"""
+    solved = set()
+    attempted = set()
     if user_id:
+        query = {"user_id": user_id}
+        if problem_ids is not None:
+            query["problem_id"] = {"$in": problem_ids}
         # Get user's submission status for each problem
-        cursor = submissions_collection.find({"user_id": user_id})
+        cursor = submissions_collection.find(query, {"_id": 0, "problem_id": 1, "status": 1})
         async for sub in cursor:
-            problem_id = sub["problem_id"]
-            if problem_id not in user_submissions:
-                user_submissions[problem_id] = {"solved": False, "attempted": False}
+            attempted.add(sub["problem_id"])
             if sub["status"] == StatusEnum.ACCEPTED:
-                user_submissions[problem_id]["solved"] = True
-            user_submissions[problem_id]["attempted"] = True
+                solved.add(sub["problem_id"])
+        # Archived submissions are counted, not read
+        cursor = submission_summaries_collection.find(query, {"_id": 0, "problem_id": 1, "accepts": 1})
+        async for summary in cursor:
+            attempted.add(summary["problem_id"])
+            if summary["accepts"]:
+                solved.add(summary["problem_id"])
+    return solved, attempted
+
+async def search_problems(user_id: Optional[str] = None, status: Optional[str] = None, **filters) -> Dict:
+    """Full-text search with facets, shaped like ProblemSearchResponse"""
+    await problem_search_index.ensure_fresh()
+    solved, attempted = await get_user_problem_status(user_id)
+    return problem_search_index.search(status=status, solved=solved, attempted=attempted, **filters)
+
+async def get_problems_summary(user_id: Optional[str] = None) -> List[Dict]:
+    """Problem list rows shaped like ProblemSummary, ready to serialize as-is"""
+    # Get all problems for summary, without their test data
+    cursor = catalog_problems_collection.find({}, PROBLEM_SUMMARY_PROJECTION).limit(1000)
+    problems = [doc async for doc in cursor]
+    solved, attempted = await get_user_problem_status(user_id)
     
     for problem in problems:
-        status = user_submissions.get(problem.id, {"solved": False, "attempted": False})
-        summary = ProblemSummary(
-            id=problem.id,
-            title=problem.title,
-            difficulty=problem.difficulty,
-            category=problem.category,
-            tags=problem.tags,
-            acceptance_rate=problem.acceptance_rate,
-            likes=problem.likes,
-            solved=status["solved"],
-            attempted=status["attempted"]
-        )
-        summaries.append(summary)
+        problem["solved"] = problem["id"] in solved
+        problem["attempted"] = problem["id"] in attempted
     
-    return summaries
+    return problems
 
 # User operations
 async def create_user(user_data: UserCreate, password_hash: str) -> User:
@@ -89,6 +293,7 @@ async def create_user(user_data: UserCreate, password_hash: str) -> User:
         password_hash=password_hash
     )
     await users_collection.insert_one(user_doc.dict())
+    await rank_index.move([(None, user_doc.profile.score)])
     return user_doc
 
 async def get_user_by_username(username: str) -> Optional[User]:
@@ -109,39 +314,110 @@ async def update_user_profile(user_id: str, profile_update: Dict):
         {"$set": {f"profile.{k}": v for k, v in profile_update.items()}}
     )
 
+async def _solved_problems(user_ids: List[str]) -> Dict[str, Set[str]]:
+    """Distinct problems each user has an accepted submission to, hot or archived"""
+    solved: Dict[str, Set[str]] = {user_id: set() for user_id in user_ids}
+    async for doc in submissions_collection.aggregate([
+        {"$match": {"user_id": {"$in": user_ids}, "status": StatusEnum.ACCEPTED}},
+        {"$group": {"_id": {"user_id": "$user_id", "problem_id": "$problem_id"}}}
+    ]):
+        solved[doc["_id"]["user_id"]].add(doc["_id"]["problem_id"])
+    # Archived months are only kept hot as per-(user, problem, month) counts
+    async for doc in submission_summaries_collection.find(
+        {"user_id": {"$in": user_ids}, "accepts": {"$gt": 0}}, {"_id": 0, "user_id": 1, "problem_id": 1}
+    ):
+        solved[doc["user_id"]].add(doc["problem_id"])
+    return solved
+
+async def _solved_stats(user_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """Solved problem counts per user and difficulty; solving a problem again counts nothing"""
+    solved = await _solved_problems(user_ids)
+    difficulties = {}
+    async for problem in problems_collection.find(
+        {"id": {"$in": list(set().union(*solved.values()))}}, {"_id": 0, "id": 1, "difficulty": 1}
+    ):
+        difficulties[problem["id"]] = problem["difficulty"].lower()
+    stats = {}
+    for user_id, problem_ids in solved.items():
+        user_stats = {"easy": 0, "medium": 0, "hard": 0, "total": 0}
+        for problem_id in problem_ids:
+            difficulty = difficulties.get(problem_id)
+            if difficulty:
+                user_stats[difficulty] += 1
+                user_stats["total"] += 1
+        stats[user_id] = user_stats
+    return stats
+
 async def update_user_stats(user_id: str):
     """Update user's solved problems statistics"""
-    # Count solved problems by difficulty
-    pipeline = [
-        {"$match": {"user_id": user_id, "status": StatusEnum.ACCEPTED}},
-        {"$lookup": {
-            "from": "problems",
-            "localField": "problem_id", 
-            "foreignField": "id",
-            "as": "problem"
-        }},
-        {"$unwind": "$problem"},
-        {"$group": {
-            "_id": "$problem.difficulty",
-            "count": {"$sum": 1}
-        }}
-    ]
-    
-    cursor = submissions_collection.aggregate(pipeline)
-    stats = {"easy": 0, "medium": 0, "hard": 0, "total": 0}
-    
-    async for result in cursor:
-        difficulty = result["_id"].lower()
-        count = result["count"]
-        stats[difficulty] = count
-        stats["total"] += count
+    stats = (await _solved_stats([user_id]))[user_id]
+    score = ranking_score(stats)
+    previous = await users_collection.find_one_and_update(
+        {"id": user_id},
+        {"$set": {"profile.solved": stats, "profile.score": score}},
+        projection={"_id": 0, "profile.score": 1}
+    )
+    if previous is not None:
+        await rank_index.move([(previous.get("profile", {}).get("score"), score)])
+
+async def recompute_user_stats(user_ids: Iterable[str]):
+    """update_user_stats for many users with one aggregation and one bulk write"""
+    from pymongo import UpdateOne
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return
+    stats = await _solved_stats(user_ids)
     
-    await update_user_profile(user_id, {"solved": stats})
+    previous = {
+        doc["id"]: doc.get("profile", {}).get("score")
+        async for doc in users_collection.find({"id": {"$in": user_ids}}, {"_id": 0, "id": 1, "profile.score": 1})
+    }
+    await users_collection.bulk_write([
+        UpdateOne({"id": user_id}, {"$set": {"profile.solved": solved, "profile.score": ranking_score(solved)}})
+        for user_id, solved in stats.items()
+    ], ordered=False)
+    await rank_index.move(
+        (previous[user_id], ranking_score(solved)) for user_id, solved in stats.items() if user_id in previous
+    )
 
 # Submission operations
+async def get_user_rank(user_id: str) -> Optional[Dict]:
+    """Live rank, shaped like UserRank"""
+    user = await users_collection.find_one({"id": user_id}, {"_id": 0, "profile": 1})
+    if user is None:
+        return None
+    profile = user.get("profile", {})
+    score = profile.get("score", ranking_score(profile.get("solved", {})))
+    return {
+        "score": score,
+        "rank": await rank_index.rank_of(score),
+        "ranking": profile.get("ranking", 0),
+        "total_users": await rank_index.total()
+    }
+
+async def get_leaderboard(skip: int = 0, limit: int = 50) -> List[Dict]:
+    """Top users by score off the profile.score index, shaped like LeaderboardEntry"""
+    cursor = users_collection.find(
+        {}, {"_id": 0, "id": 1, "username": 1, "profile.score": 1, "profile.solved": 1}
+    ).sort([("profile.score", -1), ("id", 1)]).skip(skip).limit(limit)
+    entries = []
+    async for doc in cursor:
+        profile = doc.get("profile", {})
+        score = profile.get("score", 0)
+        entries.append({
+            "rank": await rank_index.rank_of(score),
+            "user_id": doc["id"],
+            "username": doc["username"],
+            "score": score,
+            "solved": profile.get("solved", UserProfile().solved)
+        })
+    return entries
+
 async def create_submission(submission: SubmissionCreate, user_id: str) -> Submission:
     submission_doc = Submission(user_id=user_id, **submission.dict())
-    await submissions_collection.insert_one(submission_doc.dict())
+    submission_doc.code_hash = await code_store.put(submission_doc.code, submission_doc.language)
+    await submissions_collection.insert_one(submission_doc.dict(exclude={"code"}))
+    await record_submission_activity(user_id, submission_doc.problem_id, submission_doc.submitted_at)
     return submission_doc
 
 async def update_submission_status(
@@ -152,7 +428,8 @@ async def update_submission_status(
     runtime: Optional[str] = None,
     memory: Optional[str] = None,
     error_message: Optional[str] = None
-):
+) -> Optional[StatusEnum]:
+    """Record a verdict; returns the status it replaced, or None if there is no such submission"""
     update_data = {
         "status": status,
         "test_cases_passed": test_cases_passed,
@@ -165,27 +442,161 @@ async def update_submission_status(
     if error_message:
         update_data["error_message"] = error_message
         
-    await submissions_collection.update_one(
+    previous = await submissions_collection.find_one_and_update(
         {"id": submission_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={
+            "_id": 0, "user_id": 1, "problem_id": 1, "language": 1, "status": 1, "submitted_at": 1,
+            "runtime": 1, "memory": 1
+        }
     )
+    if previous is None:
+        return None
+    # A verdict recorded twice (a worker whose lease expired mid-judge) only counts what changed
+    was_accepted = previous["status"] == StatusEnum.ACCEPTED
+    if was_accepted != (status == StatusEnum.ACCEPTED):
+        day_update = {"$inc": {"accepts": -1 if was_accepted else 1}}
+        if not was_accepted:
+            day_update["$addToSet"] = {"solved": previous["problem_id"]}
+        await activity_collection.update_one(
+            {"_id": activity_id(previous["user_id"], previous["submitted_at"].date())}, day_update
+        )
+        if was_accepted:
+            increments = histogram_increments(previous.get("runtime"), previous.get("memory"), -1)
+        else:
+            increments = histogram_increments(runtime, memory)
+        if increments:
+            await runtime_histograms_collection.update_one(
+                {"_id": histogram_id(previous["problem_id"], previous["language"])},
+                {"$inc": increments},
+                upsert=True
+            )
+    return StatusEnum(previous["status"])
 
-async def get_user_submissions(user_id: str, limit: int = 50) -> List[SubmissionResponse]:
-    cursor = submissions_collection.find({"user_id": user_id}).sort("submitted_at", -1).limit(limit)
-    submissions = []
-    
-    async for doc in cursor:
-        # Get problem title
-        problem = await get_problem_by_id(doc["problem_id"])
-        problem_title = problem.title if problem else "Unknown Problem"
-        
-        submission = SubmissionResponse(
-            problem_title=problem_title,
-            **doc
+async def record_submission_activity(user_id: str, problem_id: str, submitted_at: datetime):
+    """Count a submission in the user's rollup for its day, extending the streak on the day's first one"""
+    day = submitted_at.date()
+    previous = await activity_collection.find_one_and_update(
+        {"_id": activity_id(user_id, day)},
+        {
+            "$inc": {"submissions": 1},
+            "$addToSet": {"problems": problem_id},
+            "$setOnInsert": {"user_id": user_id, "day": day.isoformat(), "accepts": 0, "solved": []}
+        },
+        projection={"_id": 1},
+        upsert=True
+    )
+    if previous is None:
+        yesterday = await activity_collection.find_one(
+            {"_id": activity_id(user_id, day - timedelta(days=1))}, {"streak": 1}
         )
-        submissions.append(submission)
+        streak = (yesterday.get("streak", 0) if yesterday else 0) + 1
+        await activity_collection.update_one({"_id": activity_id(user_id, day)}, {"$set": {"streak": streak}})
+
+async def get_current_streak(user_id: str) -> int:
+    """Streak as of today, from the rollups of today and yesterday"""
+    today = datetime.utcnow().date()
+    cursor = activity_collection.find(
+        activity_range(user_id, today - timedelta(days=1), today), {"day": 1, "streak": 1}
+    )
+    return current_streak(await cursor.sort("_id", 1).to_list(None), today)
+
+async def get_user_progress(user_id: str, days: int = 365) -> Dict:
+    """Streaks, daily heatmap and difficulty breakdown, shaped like UserProgress"""
+    today = datetime.utcnow().date()
+    cursor = activity_collection.find(activity_range(user_id, today - timedelta(days=days - 1), today))
+    rollups = await cursor.sort("_id", 1).to_list(None)
+    user = await users_collection.find_one({"id": user_id}, {"_id": 0, "profile.solved": 1})
+    return {
+        "solved": (user or {}).get("profile", {}).get("solved", UserProfile().solved),
+        "current_streak": current_streak(rollups, today),
+        "longest_streak": max((doc.get("streak", 0) for doc in rollups), default=0),
+        "active_days": len(rollups),
+        "submissions": sum(doc["submissions"] for doc in rollups),
+        "accepts": sum(doc.get("accepts", 0) for doc in rollups),
+        "heatmap": [
+            {
+                "day": doc["day"],
+                "submissions": doc["submissions"],
+                "accepts": doc.get("accepts", 0),
+                "problems": len(doc.get("problems", [])),
+                "solved": len(doc.get("solved", []))
+            }
+            for doc in rollups
+        ]
+    }
+
+async def get_submission_percentiles(
+    problem_id: str,
+    language: str,
+    runtime: Optional[str],
+    memory: Optional[str]
+) -> Tuple[Optional[float], Optional[float]]:
+    """How much of the problem's accepted submissions in the same language a runtime and memory beat"""
+    histogram = await runtime_histograms_collection.find_one({"_id": histogram_id(problem_id, language)})
+    if not histogram:
+        return None, None
+    return (
+        beats(histogram, "runtime", runtime_bucket(runtime)),
+        beats(histogram, "memory", memory_bucket(memory))
+    )
+
+async def get_user_submissions(
+    user_id: str,
+    limit: int = 50,
+    include_code: bool = False
+) -> List[Dict]:
+    """History rows shaped like SubmissionResponse, ready to serialize as-is"""
+    projection = dict(SUBMISSION_HISTORY_PROJECTION)
+    if include_code:
+        projection.update({"code": 1, "code_hash": 1})
+    cursor = submissions_collection.find({"user_id": user_id}, projection).sort("submitted_at", -1).limit(limit)
+    docs = [doc async for doc in cursor]
+    if len(docs) < limit:
+        # Deep history continues in the archive
+        seen = {doc["id"] for doc in docs}
+        archived = await submission_archive.user_history(user_id, projection, limit - len(docs))
+        docs.extend(doc for doc in archived if doc["id"] not in seen)
+    
+    # Resolve problem titles (and code, if asked for) with one query each
+    titles = {}
+    title_cursor = catalog_problems_collection.find(
+        {"id": {"$in": list({doc["problem_id"] for doc in docs})}},
+        {"id": 1, "title": 1}
+    )
+    async for problem in title_cursor:
+        titles[problem["id"]] = problem["title"]
+    
+    codes = {}
+    if include_code:
+        codes = await code_store.get_many(doc["code_hash"] for doc in docs if doc.get("code_hash"))
+    
+    for doc in docs:
+        doc["problem_title"] = titles.get(doc["problem_id"], "Unknown Problem")
+        if include_code:
+            code_hash = doc.pop("code_hash", None)
+            if code_hash:
+                doc["code"] = codes.get(code_hash)
     
-    return submissions
+    return docs
+
+async def is_submission_owner(submission_id: str, user_id: str) -> bool:
+    return await submissions_collection.find_one({"id": submission_id, "user_id": user_id}, {"_id": 1}) is not None
+
+async def get_submission_code(submission_id: str, user_id: str) -> Optional[SubmissionCode]:
+    query = {"id": submission_id, "user_id": user_id}
+    projection = {"id": 1, "language": 1, "code": 1, "code_hash": 1}
+    doc = await submissions_collection.find_one(query, projection)
+    if not doc:
+        doc = await submission_archive.find_one(query, projection)
+    if not doc:
+        return None
+    code = doc.get("code")
+    if code is None and doc.get("code_hash"):
+        code = await code_store.get(doc["code_hash"])
+    if code is None:
+        return None
+    return SubmissionCode(id=doc["id"], language=doc["language"], code=code)
 
 # Contest operations
 async def create_contest(contest: ContestCreate) -> Contest:
@@ -193,12 +604,61 @@ async def create_contest(contest: ContestCreate) -> Contest:
     await contests_collection.insert_one(contest_doc.dict())
     return contest_doc
 
-async def get_contests() -> List[Contest]:
-    cursor = contests_collection.find().sort("start_time", -1)
-    contests = []
-    async for doc in cursor:
-        contests.append(Contest(**doc))
-    return contests
+def _contest_card_projection(user_id: Optional[str]) -> Dict:
+    """Contest fields for listings, with the participant list reduced to a count and the user's registration"""
+    return {
+        "_id": 0, "id": 1, "title": 1, "description": 1, "start_time": 1, "duration_minutes": 1,
+        "prizes": 1, "difficulty": 1, "problem_ids": 1,
+        "participants_count": {"$size": {"$ifNull": ["$participants", []]}},
+        "registered": {"$in": [user_id, {"$ifNull": ["$participants", []]}]}
+    }
+
+async def get_contests(user_id: Optional[str] = None) -> List[Dict]:
+    """Contests newest first, without their participant lists"""
+    cursor = contests_collection.aggregate([
+        {"$sort": {"start_time": -1}},
+        {"$project": _contest_card_projection(user_id)}
+    ])
+    return [doc async for doc in cursor]
+
+async def get_contest_view(contest_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+    """A contest with its problem rows and the user's registration and problem status.
+
+    One query each for the contest, its problems and the user's submissions
+    to them. Problems stay hidden until the contest starts.
+    """
+    cursor = contests_collection.aggregate([
+        {"$match": {"id": contest_id}},
+        {"$project": _contest_card_projection(user_id)}
+    ])
+    contests = [doc async for doc in cursor]
+    if not contests:
+        return None
+    contest = contests[0]
+    problem_ids = contest.pop("problem_ids", [])
+    contest["problems"] = []
+    if datetime.utcnow() < contest["start_time"] or not problem_ids:
+        return contest
+
+    problems = {
+        doc["id"]: doc
+        async for doc in catalog_problems_collection.find({"id": {"$in": problem_ids}}, PROBLEM_SUMMARY_PROJECTION)
+    }
+    solved, attempted = await get_user_problem_status(user_id, problem_ids)
+    for problem_id in problem_ids:
+        if problem_id in problems:
+            problem = problems[problem_id]
+            problem["solved"] = problem_id in solved
+            problem["attempted"] = problem_id in attempted
+            contest["problems"].append(problem)
+    return contest
+
+async def register_contest_participant(contest_id: str, user_id: str) -> Optional[bool]:
+    """Add the user to the contest; None if there is no such contest, else whether they were newly added"""
+    result = await contests_collection.update_one({"id": contest_id}, {"$addToSet": {"participants": user_id}})
+    if result.matched_count == 0:
+        return None
+    return result.modified_count > 0
 
 async def get_contest_by_id(contest_id: str) -> Optional[Contest]:
     doc = await contests_collection.find_one({"id": contest_id})
@@ -0,0 +1,86 @@
+from typing import Optional
+from models import CodeRunResponse, JudgeJob, JudgeJobKind, JudgeResult, Problem, StatusEnum
+from code_executor import CodeExecutor
+from comparator import Comparator, UnknownCheckerError
+from database import (
+    get_problem_by_id, get_problem_test_cases, problem_counters, update_submission_status, update_user_stats
+)
+from metrics import JUDGE_VERDICTS, stage
+
+# Test cases used by /run; /submit judges against all of them
+RUN_TEST_CASE_LIMIT = 3
+
+
+def determine_status(result: CodeRunResponse) -> StatusEnum:
+    if result.success:
+        return StatusEnum.ACCEPTED
+    elif result.error:
+        return StatusEnum.RUNTIME_ERROR
+    return StatusEnum.WRONG_ANSWER
+
+
+def judge_error(message: str) -> CodeRunResponse:
+    """A run that failed before any test case was judged"""
+    return CodeRunResponse(success=False, test_results=[], console_output="", error=message)
+
+
+async def finalize_submission(job: JudgeJob, result: CodeRunResponse) -> StatusEnum:
+    """Record the verdict of a judged submission and the user stats derived from it"""
+    submission_status = determine_status(result)
+    accepted = submission_status == StatusEnum.ACCEPTED
+    
+    with stage("db_write"):
+        previous = await update_submission_status(
+            job.submission_id,
+            submission_status,
+            len([r for r in result.test_results if r.passed]),
+            len(result.test_results),
+            result.runtime,
+            # Memory isn't measured yet; stored and bucketed once the executor reports it
+            None,
+            result.error
+        )
+        if previous is None:
+            return submission_status
+        
+        # A job re-run after its lease expired is finalized again; count only what this verdict changed
+        was_accepted = previous == StatusEnum.ACCEPTED
+        first_verdict = previous == StatusEnum.PENDING
+        if first_verdict:
+            JUDGE_VERDICTS.inc(submission_status.value, job.language.value)
+        if first_verdict or accepted != was_accepted:
+            problem_counters.incr(
+                job.problem_id, attempts=int(first_verdict), accepts=int(accepted) - int(was_accepted)
+            )
+        
+        # Update user statistics if the verdict changed whether it was accepted
+        if accepted != was_accepted:
+            await update_user_stats(job.user_id)
+    return submission_status
+
+
+async def process_job(job: JudgeJob, executor: CodeExecutor, problem: Optional[Problem] = None) -> JudgeResult:
+    """Run a job end to end; the same path serves the API process and standalone judge workers"""
+    if problem is None:
+        with stage("problem_fetch"):
+            problem = await get_problem_by_id(job.problem_id)
+    if not problem:
+        result = judge_error("Problem not found")
+        status: Optional[StatusEnum] = None
+        if job.kind == JudgeJobKind.SUBMIT:
+            status = await finalize_submission(job, result)
+        return JudgeResult(result=result, status=status)
+    
+    try:
+        comparator = Comparator.for_problem(problem)
+    except UnknownCheckerError as e:
+        # A misconfigured problem fails the run instead of leaving the submission pending
+        result = judge_error(f"Judge error: {e}")
+    else:
+        limit = RUN_TEST_CASE_LIMIT if job.kind == JudgeJobKind.RUN else None
+        test_cases = await get_problem_test_cases(problem, limit=limit)
+        result = await executor.execute_code(job.code, job.language, test_cases, comparator)
+    
+    if job.kind == JudgeJobKind.SUBMIT:
+        return JudgeResult(result=result, status=await finalize_submission(job, result))
+    return JudgeResult(result=result)
@@ -0,0 +1,370 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from models import CodeRunResponse, JudgeJob, JudgeResult
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Only needed with JUDGE_BROKER=redis
+    aioredis = None
+
+# Seconds a claimed job stays invisible to other workers; workers extend it while judging
+LEASE_SECONDS = float(os.environ.get('JUDGE_LEASE_SECONDS', 30))
+# A job that has killed this many workers is failed instead of handed out again
+MAX_ATTEMPTS = int(os.environ.get('JUDGE_MAX_ATTEMPTS', 3))
+# How long finished results are kept for the API to pick up
+RESULT_TTL_SECONDS = int(os.environ.get('JUDGE_RESULT_TTL_SECONDS', 3600))
+
+
+def _abandoned_result(job: JudgeJob) -> JudgeResult:
+    return JudgeResult(result=CodeRunResponse(
+        success=False,
+        test_results=[],
+        console_output="",
+        error=f"Judging was abandoned after {MAX_ATTEMPTS} attempts"
+    ))
+
+
+class JudgeBroker:
+    """Hands judge jobs to workers under a lease and carries results back to the API.
+
+    A claimed job is leased to one worker. If the worker does not ack or
+    extend the lease before it expires (the process died, the host went away)
+    the job becomes claimable again.
+    """
+
+    async def enqueue(self, job: JudgeJob):
+        raise NotImplementedError
+
+    async def claim(self, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> Optional[JudgeJob]:
+        raise NotImplementedError
+
+    async def extend(self, job_id: str, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Renew a lease; False means it was lost and the job may be running elsewhere"""
+        raise NotImplementedError
+
+    async def ack(self, job_id: str, worker_id: str, result: JudgeResult):
+        raise NotImplementedError
+
+    async def wait_result(self, job_id: str, timeout: float) -> Optional[JudgeResult]:
+        raise NotImplementedError
+
+    async def stats(self) -> Tuple[int, int]:
+        """(queued, leased) job counts"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemoryBroker(JudgeBroker):
+    """Single-process broker for tests and running workers inside the API process"""
+
+    def __init__(self):
+        self._queue: deque = deque()
+        self._jobs: Dict[str, JudgeJob] = {}
+        # job id -> (worker id, lease expiry on the monotonic clock)
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._attempts: Dict[str, int] = {}
+        self._results: Dict[str, JudgeResult] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+        self._available = asyncio.Condition()
+
+    async def enqueue(self, job: JudgeJob):
+        self._jobs[job.id] = job
+        self._done.setdefault(job.id, asyncio.Event())
+        async with self._available:
+            self._queue.append(job.id)
+            self._available.notify()
+
+    def _requeue_expired(self):
+        now = time.monotonic()
+        for job_id, (_, expires) in list(self._leases.items()):
+            if expires <= now:
+                del self._leases[job_id]
+                self._queue.appendleft(job_id)
+
+    async def claim(self, worker_id, lease_seconds=LEASE_SECONDS):
+        self._requeue_expired()
+        while self._queue:
+            job_id = self._queue.popleft()
+            job = self._jobs[job_id]
+            self._attempts[job_id] = self._attempts.get(job_id, 0) + 1
+            if self._attempts[job_id] > MAX_ATTEMPTS:
+                self._finish(job_id, _abandoned_result(job))
+                continue
+            self._leases[job_id] = (worker_id, time.monotonic() + lease_seconds)
+            return job
+        return None
+
+    async def wait_for_job(self, timeout: float):
+        """Block until something is enqueued, so in-process workers don't poll"""
+        async with self._available:
+            try:
+                await asyncio.wait_for(self._available.wait_for(lambda: self._queue), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def extend(self, job_id, worker_id, lease_seconds=LEASE_SECONDS):
+        lease = self._leases.get(job_id)
+        if lease is None or lease[0] != worker_id:
+            return False
+        self._leases[job_id] = (worker_id, time.monotonic() + lease_seconds)
+        return True
+
+    async def ack(self, job_id, worker_id, result):
+        lease = self._leases.get(job_id)
+        if lease is None or lease[0] != worker_id:
+            return
+        del self._leases[job_id]
+        self._finish(job_id, result)
+
+    def _finish(self, job_id: str, result: JudgeResult):
+        self._jobs.pop(job_id, None)
+        self._attempts.pop(job_id, None)
+        self._results[job_id] = result
+        self._done.setdefault(job_id, asyncio.Event()).set()
+
+    async def wait_result(self, job_id, timeout):
+        done = self._done.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._done.pop(job_id, None)
+        return self._results.pop(job_id, None)
+
+    async def stats(self):
+        self._requeue_expired()
+        return len(self._queue), len(self._leases)
+
+
+class MongoBroker(JudgeBroker):
+    """Jobs as documents in a collection; leases are an expiry timestamp on the document"""
+
+    POLL_MIN = 0.02
+    POLL_MAX = 0.5
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("state", 1), ("lease_expires", 1), ("created_at", 1)])
+        await self.collection.create_index("finished_at", expireAfterSeconds=RESULT_TTL_SECONDS)
+
+    async def enqueue(self, job):
+        await self.collection.insert_one({
+            "_id": job.id,
+            "job": job.dict(),
+            "state": "queued",
+            "attempts": 0,
+            "created_at": datetime.utcnow(),
+            "lease_expires": None
+        })
+
+    async def claim(self, worker_id, lease_seconds=LEASE_SECONDS):
+        from pymongo import ReturnDocument
+        while True:
+            now = datetime.utcnow()
+            doc = await self.collection.find_one_and_update(
+                {"$or": [
+                    {"state": "queued"},
+                    {"state": "leased", "lease_expires": {"$lte": now}}
+                ]},
+                {
+                    "$set": {
+                        "state": "leased",
+                        "worker_id": worker_id,
+                        "lease_expires": now + timedelta(seconds=lease_seconds)
+                    },
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                return None
+            job = JudgeJob(**doc["job"])
+            if doc["attempts"] <= MAX_ATTEMPTS:
+                return job
+            await self.ack(job.id, worker_id, _abandoned_result(job))
+
+    async def extend(self, job_id, worker_id, lease_seconds=LEASE_SECONDS):
+        updated = await self.collection.update_one(
+            {"_id": job_id, "state": "leased", "worker_id": worker_id},
+            {"$set": {"lease_expires": datetime.utcnow() + timedelta(seconds=lease_seconds)}}
+        )
+        return updated.matched_count == 1
+
+    async def ack(self, job_id, worker_id, result):
+        await self.collection.update_one(
+            {"_id": job_id, "state": "leased", "worker_id": worker_id},
+            {
+                "$set": {"state": "done", "result": result.dict(), "finished_at": datetime.utcnow()},
+                "$unset": {"job.code": ""}
+            }
+        )
+
+    async def wait_result(self, job_id, timeout):
+        # Polling with backoff; change streams would need a replica set
+        deadline = time.monotonic() + timeout
+        delay = self.POLL_MIN
+        while True:
+            doc = await self.collection.find_one({"_id": job_id, "state": "done"}, {"result": 1})
+            if doc is not None:
+                return JudgeResult(**doc["result"])
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.POLL_MAX)
+
+    async def stats(self):
+        now = datetime.utcnow()
+        expired = {"state": "leased", "lease_expires": {"$lte": now}}
+        queued = await self.collection.count_documents({"$or": [{"state": "queued"}, expired]})
+        leased = await self.collection.count_documents({"state": "leased", "lease_expires": {"$gt": now}})
+        return queued, leased
+
+
+# KEYS: stream; ARGV: group, entry id, worker id. Re-claims the entry only if the worker still holds it
+_REDIS_EXTEND = """
+local pending = redis.call('XPENDING', KEYS[1], ARGV[1], ARGV[2], ARGV[2], 1)
+if #pending == 0 or pending[1][2] ~= ARGV[3] then
+    return 0
+end
+redis.call('XCLAIM', KEYS[1], ARGV[1], ARGV[3], 0, ARGV[2], 'JUSTID')
+return 1
+"""
+
+# KEYS: stream, result key; ARGV: group, entry id, worker id, result, result TTL.
+# Publishes the result and acks only if the worker still holds the entry
+_REDIS_ACK = """
+local pending = redis.call('XPENDING', KEYS[1], ARGV[1], ARGV[2], ARGV[2], 1)
+if #pending == 0 or pending[1][2] ~= ARGV[3] then
+    return 0
+end
+redis.call('RPUSH', KEYS[2], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('XACK', KEYS[1], ARGV[1], ARGV[2])
+redis.call('XDEL', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class RedisStreamsBroker(JudgeBroker):
+    """Jobs on a Redis stream read through a consumer group.
+
+    The pending entries list is the lease: an entry idle for longer than the
+    lease is taken over with XAUTOCLAIM, and workers extend by re-claiming
+    their own entries, which resets the idle time. Extends and acks check
+    ownership and act in one script, so a worker whose entry was taken
+    over can neither take it back nor publish a second result.
+    """
+
+    GROUP = "judges"
+
+    def __init__(self, url: str, stream: str = "judge:jobs"):
+        if aioredis is None:
+            raise RuntimeError("The redis package is required for JUDGE_BROKER=redis")
+        self.redis = aioredis.from_url(url)
+        self.stream = stream
+        # job id -> stream entry id, for jobs claimed by this process
+        self._entries: Dict[str, bytes] = {}
+        self._group_ready = False
+        self._extend_script = self.redis.register_script(_REDIS_EXTEND)
+        self._ack_script = self.redis.register_script(_REDIS_ACK)
+
+    async def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(self.stream, self.GROUP, id="0", mkstream=True)
+        except aioredis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def _result_key(self, job_id: str) -> str:
+        return f"judge:result:{job_id}"
+
+    async def enqueue(self, job):
+        await self._ensure_group()
+        await self.redis.xadd(self.stream, {"job": job.json()})
+
+    async def claim(self, worker_id, lease_seconds=LEASE_SECONDS):
+        await self._ensure_group()
+        while True:
+            # Expired leases first, then new entries
+            _, entries, *_ = await self.redis.xautoclaim(
+                self.stream, self.GROUP, worker_id, min_idle_time=int(lease_seconds * 1000), count=1
+            )
+            if not entries:
+                response = await self.redis.xreadgroup(self.GROUP, worker_id, {self.stream: ">"}, count=1)
+                entries = response[0][1] if response else []
+            if not entries:
+                return None
+            entry_id, fields = entries[0]
+            job = JudgeJob(**json.loads(fields[b"job"]))
+            self._entries[job.id] = entry_id
+            pending = await self.redis.xpending_range(self.stream, self.GROUP, entry_id, entry_id, 1)
+            if pending and pending[0]["times_delivered"] > MAX_ATTEMPTS:
+                await self.ack(job.id, worker_id, _abandoned_result(job))
+                continue
+            return job
+
+    async def extend(self, job_id, worker_id, lease_seconds=LEASE_SECONDS):
+        entry_id = self._entries.get(job_id)
+        if entry_id is None:
+            return False
+        extended = await self._extend_script(keys=[self.stream], args=[self.GROUP, entry_id, worker_id])
+        if not extended:
+            self._entries.pop(job_id, None)
+        return bool(extended)
+
+    async def ack(self, job_id, worker_id, result):
+        entry_id = self._entries.pop(job_id, None)
+        if entry_id is None:
+            return
+        await self._ack_script(
+            keys=[self.stream, self._result_key(job_id)],
+            args=[self.GROUP, entry_id, worker_id, result.json(), RESULT_TTL_SECONDS]
+        )
+
+    async def wait_result(self, job_id, timeout):
+        popped = await self.redis.blpop(self._result_key(job_id), timeout=max(1, int(timeout)))
+        if popped is None:
+            return None
+        return JudgeResult(**json.loads(popped[1]))
+
+    async def stats(self):
+        await self._ensure_group()
+        groups = await self.redis.xinfo_groups(self.stream)
+        group = next((g for g in groups if g["name"] in (self.GROUP, self.GROUP.encode())), None)
+        if group is None:
+            return 0, 0
+        leased = group["pending"]
+        queued = (group.get("lag") or 0)
+        return queued, leased
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_broker() -> Optional[JudgeBroker]:
+    """The broker named by JUDGE_BROKER, or None to judge inside the API process"""
+    backend = os.environ.get('JUDGE_BROKER', 'local')
+    if backend == 'local':
+        return None
+    if backend == 'memory':
+        return InMemoryBroker()
+    if backend == 'mongo':
+        from database import _LazyCollection
+        return MongoBroker(_LazyCollection("judge_jobs"))
+    if backend == 'redis':
+        return RedisStreamsBroker(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    raise ValueError(f"Unknown JUDGE_BROKER: {backend}")
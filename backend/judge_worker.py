@@ -0,0 +1,116 @@
+"""Standalone judge worker.
+
+Pulls jobs from the broker named by JUDGE_BROKER (mongo or redis), judges
+them with a local CodeExecutor and acks the results, so judge hosts scale
+independently of API replicas:
+
+    JUDGE_BROKER=mongo python judge_worker.py --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Optional
+from dotenv import load_dotenv
+from pathlib import Path
+
+load_dotenv(Path(__file__).parent / '.env')
+
+from code_executor import CodeExecutor, sweep_orphaned_workspaces  # noqa: E402
+from database import problem_counters  # noqa: E402
+from judge import process_job  # noqa: E402
+from judge_queue import LEASE_SECONDS, InMemoryBroker, JudgeBroker, MongoBroker, create_broker  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Idle workers poll the broker this often
+POLL_INTERVAL = float(os.environ.get('JUDGE_POLL_INTERVAL', 0.2))
+
+
+class JudgeWorker:
+    """Runs `concurrency` claim/judge/ack loops against one broker"""
+
+    def __init__(self, broker: JudgeBroker, executor: CodeExecutor, worker_id: Optional[str] = None):
+        self.broker = broker
+        self.executor = executor
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+
+    async def _keep_lease(self, job_id: str, lease_seconds: float):
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            if not await self.broker.extend(job_id, self.worker_id, lease_seconds):
+                logger.warning("Lost lease on job %s", job_id)
+                return
+
+    async def _idle(self):
+        if isinstance(self.broker, InMemoryBroker):
+            await self.broker.wait_for_job(POLL_INTERVAL)
+        else:
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _loop(self, lease_seconds: float):
+        while not self._stopping.is_set():
+            try:
+                job = await self.broker.claim(self.worker_id, lease_seconds)
+            except Exception:
+                logger.exception("Claiming a job failed")
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            if job is None:
+                await self._idle()
+                continue
+
+            heartbeat = asyncio.create_task(self._keep_lease(job.id, lease_seconds))
+            try:
+                result = await process_job(job, self.executor)
+            except Exception:
+                # Leave the job leased; it is retried once the lease runs out
+                logger.exception("Judging job %s failed", job.id)
+                continue
+            finally:
+                heartbeat.cancel()
+            await self.broker.ack(job.id, self.worker_id, result)
+
+    async def run(self, concurrency: int, lease_seconds: float = LEASE_SECONDS):
+        logger.info("Judge worker %s started with %d slots", self.worker_id, concurrency)
+        await asyncio.gather(*(self._loop(lease_seconds) for _ in range(concurrency)))
+
+    def stop(self):
+        self._stopping.set()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Judge submissions pulled from the shared broker")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="jobs judged at once (default: JUDGE_CONCURRENCY or the CPU count)")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="lease length in seconds")
+    parser.add_argument("--worker-id", help="defaults to host-pid-random")
+    return parser.parse_args()
+
+
+async def main(args):
+    broker = create_broker()
+    if broker is None or isinstance(broker, InMemoryBroker):
+        raise SystemExit("Set JUDGE_BROKER=mongo or JUDGE_BROKER=redis to run a standalone worker")
+    if isinstance(broker, MongoBroker):
+        await broker.ensure_indexes()
+    removed = sweep_orphaned_workspaces()
+    if removed:
+        logger.info("Removed %d orphaned judge workspaces", removed)
+    executor = CodeExecutor(args.concurrency)
+    worker = JudgeWorker(broker, executor, args.worker_id)
+    # Workers record verdicts, so they also own the attempt/accept counters
+    problem_counters.start()
+    try:
+        await worker.run(executor.max_concurrency, args.lease)
+    finally:
+        await problem_counters.stop()
+        await broker.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds, from a fast Mongo read to a multi-case TLE
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """A gauge set explicitly, or read from `callback` at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        values = {(): self.callback()} if self.callback else self._values
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    """Everything registered, in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Judge pipeline metrics
+JUDGE_STAGE_SECONDS = Histogram(
+    "judge_stage_seconds", "Time spent in each stage of running or judging code", ["stage"]
+)
+JUDGE_VERDICTS = Counter(
+    "judge_verdicts_total", "Final submission verdicts", ["verdict", "language"]
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_seconds", "MongoDB command round-trip time", ["command"]
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total", "MongoDB commands that returned an error", ["command"]
+)
+MONGO_POOL_WAIT_SECONDS = Histogram(
+    "mongo_pool_wait_seconds", "Time spent waiting to check a connection out of the pool"
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Connection checkouts that failed", ["reason"]
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_connections_checked_out", "Connections currently checked out of the pool"
+)
+
+
+def register_executor_gauges(executor):
+    Gauge("judge_jobs_queued", "Jobs waiting for a sandbox slot", callback=lambda: executor.queued)
+    Gauge("judge_jobs_running", "Jobs currently holding a sandbox slot", callback=lambda: executor.running)
+    Gauge("judge_capacity", "Concurrent sandbox slots", callback=lambda: executor.max_concurrency)
+
+
+# Optional per-submission tracing, enabled with JUDGE_TRACING=1
+TRACING_ENABLED = os.environ.get('JUDGE_TRACING', '').lower() in ('1', 'true', 'yes')
+MAX_TRACES = int(os.environ.get('JUDGE_TRACE_LIMIT', 1000))
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_traces: "OrderedDict[str, Trace]" = OrderedDict()
+
+
+class Trace:
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+
+    def add_span(self, name: str, start: float, duration: float):
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self.started) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3)
+        })
+
+    def to_dict(self) -> Dict:
+        return {"trace_id": self.trace_id, "spans": self.spans}
+
+
+@contextmanager
+def trace(trace_id: str):
+    """Collect stage spans for one submission; a no-op unless tracing is enabled"""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    current = Trace(trace_id)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        # trace_id may have been updated once the submission id was known
+        _traces[current.trace_id] = current
+        while len(_traces) > MAX_TRACES:
+            _traces.popitem(last=False)
+
+
+def get_trace(trace_id: str) -> Optional[Trace]:
+    return _traces.get(trace_id)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into JUDGE_STAGE_SECONDS and the active trace"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        JUDGE_STAGE_SECONDS.observe(elapsed, name)
+        current = _current_trace.get()
+        if current is not None:
+            current.add_span(name, start, elapsed)
@@ -24,6 +24,18 @@ class LanguageEnum(str, Enum):
     JAVA = "java"
     CPP = "cpp"
 
+class ReactionEnum(str, Enum):
+    LIKE = "like"
+    DISLIKE = "dislike"
+    NONE = "none"
+
+class CompareModeEnum(str, Enum):
+    EXACT = "exact"
+    WHITESPACE = "whitespace"
+    UNORDERED = "unordered"
+    FLOAT = "float"
+    CUSTOM = "custom"
+
 # Problem Models
 class Example(BaseModel):
     input: str
@@ -31,8 +43,13 @@ class Example(BaseModel):
     explanation: Optional[str] = None
 
 class TestCase(BaseModel):
-    input: str
-    expected: str
+    input: str = ""
+    expected: str = ""
+    # sha256 references into the blob store for payloads too large to keep inline
+    input_ref: Optional[str] = None
+    expected_ref: Optional[str] = None
+    # Produced by the reference runner; replaced on every rebuild
+    generated: bool = False
 
 class Problem(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -45,11 +62,67 @@ class Problem(BaseModel):
     constraints: List[str]
     test_cases: List[TestCase]
     companies: List[str] = []
+    compare_mode: CompareModeEnum = CompareModeEnum.WHITESPACE
+    float_epsilon: float = 1e-6
+    checker: Optional[str] = None
     likes: int = 0
     dislikes: int = 0
+    # Maintained by write-behind counters; acceptance_rate is accepts / attempts as a percentage
+    attempts: int = 0
+    accepts: int = 0
     acceptance_rate: float = 0.0
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ReferenceSolution(BaseModel):
+    language: LanguageEnum
+    code: str
+
+class ProblemReference(BaseModel):
+    """Reference solutions and input generator; kept out of the problem document"""
+    solution: ReferenceSolution
+    # Optional independent solution whose outputs must agree with `solution`
+    cross_check: Optional[ReferenceSolution] = None
+    # Python source defining generate(rng: random.Random, index: int) -> str
+    generator: str
+    count: int = Field(1000, ge=1, le=100000)
+    seed: int = 0
+
+class ReferenceCaseIssue(BaseModel):
+    index: int
+    input: str
+    detail: str
+
+class ReferenceBuildReport(BaseModel):
+    problem_id: str
+    cases: int
+    workers: int
+    wall_seconds: float
+    cases_per_second: float
+    # Per-case wall time percentiles in ms, keyed "solution" / "cross_check"
+    timings: Dict[str, Dict[str, float]]
+    failures: List[ReferenceCaseIssue] = []
+    disagreements: List[ReferenceCaseIssue] = []
+    # False when problems were found or for a dry run; the stored test cases are unchanged then
+    written: bool = False
+
+class ReferenceBuildStatusEnum(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ReferenceBuildJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    problem_id: str
+    count: Optional[int] = None
+    dry_run: bool = False
+    status: ReferenceBuildStatusEnum = ReferenceBuildStatusEnum.RUNNING
+    # Set once the build completes
+    report: Optional[ReferenceBuildReport] = None
+    error: Optional[str] = None
+    created_by: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 class ProblemCreate(BaseModel):
     title: str
     difficulty: DifficultyEnum
@@ -60,6 +133,11 @@ class ProblemCreate(BaseModel):
     constraints: List[str]
     test_cases: List[TestCase]
     companies: List[str] = []
+    compare_mode: CompareModeEnum = CompareModeEnum.WHITESPACE
+    float_epsilon: float = 1e-6
+    checker: Optional[str] = None
+    # Generated test cases are built from this afterwards with reference_runner.py
+    reference: Optional[ProblemReference] = None
 
 class ProblemSummary(BaseModel):
     id: str
@@ -72,14 +150,78 @@ class ProblemSummary(BaseModel):
     solved: bool = False
     attempted: bool = False
 
+class ProblemDetail(BaseModel):
+    """What the problem page renders; test cases and judging settings stay server-side"""
+    id: str
+    title: str
+    difficulty: DifficultyEnum
+    category: str
+    tags: List[str]
+    description: str
+    examples: List[Example]
+    constraints: List[str]
+    companies: List[str] = []
+    likes: int = 0
+    dislikes: int = 0
+    acceptance_rate: float = 0.0
+
+class ProblemReactionRequest(BaseModel):
+    reaction: ReactionEnum
+
+class ProblemReaction(BaseModel):
+    problem_id: str
+    reaction: ReactionEnum
+
+class ProblemSearchResponse(BaseModel):
+    total: int
+    results: List[ProblemSummary]
+    # facet name -> value -> number of matching problems
+    facets: Dict[str, Dict[str, int]]
+
 # User Models
 class UserProfile(BaseModel):
     avatar: Optional[str] = None
+    # Exact as of the last ranking recompute (see ranking.py); 0 until then
     ranking: int = 0
     solved: Dict[str, int] = {"easy": 0, "medium": 0, "hard": 0, "total": 0}
+    # Weighted solved count that ranking orders by
+    score: int = 0
+    # Not stored: filled in from the activity rollups when served, so a lapsed streak reads 0
     streak: int = 0
     badges: List[str] = []
 
+class ActivityDay(BaseModel):
+    day: str
+    submissions: int
+    accepts: int
+    # Distinct problems submitted to, and accepted, that day
+    problems: int
+    solved: int
+
+class UserProgress(BaseModel):
+    solved: Dict[str, int]
+    current_streak: int
+    longest_streak: int
+    active_days: int
+    submissions: int
+    accepts: int
+    # Only days with activity, oldest first
+    heatmap: List[ActivityDay]
+
+class UserRank(BaseModel):
+    score: int
+    # Live rank from the score buckets; `ranking` is the last exact recompute
+    rank: int
+    ranking: int
+    total_users: int
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: str
+    username: str
+    score: int
+    solved: Dict[str, int]
+
 class User(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
     username: str
@@ -109,7 +251,9 @@ class Submission(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     problem_id: str
-    code: str
+    # Source lives in the code store; `code` is only set on in-memory copies
+    code: Optional[str] = None
+    code_hash: Optional[str] = None
     language: LanguageEnum
     status: StatusEnum = StatusEnum.PENDING
     runtime: Optional[str] = None
@@ -117,38 +261,53 @@ class Submission(BaseModel):
     test_cases_passed: int = 0
     total_test_cases: int = 0
     error_message: Optional[str] = None
+    contest_id: Optional[str] = None
     submitted_at: datetime = Field(default_factory=datetime.utcnow)
 
 class SubmissionCreate(BaseModel):
     problem_id: str
     code: str
     language: LanguageEnum
+    # Set when submitted from a contest page; selects the contest's rate limits
+    contest_id: Optional[str] = None
 
 class SubmissionResponse(BaseModel):
     id: str
     problem_id: str
     problem_title: Optional[str] = None
-    code: str
+    code: Optional[str] = None
     language: LanguageEnum
     status: StatusEnum
     runtime: Optional[str] = None
     memory: Optional[str] = None
+    # Share of other accepted submissions in the same language this one beats
+    runtime_percentile: Optional[float] = None
+    # Unset until memory is measured rather than a placeholder
+    memory_percentile: Optional[float] = None
     test_cases_passed: int
     total_test_cases: int
     error_message: Optional[str] = None
     submitted_at: datetime
 
+class SubmissionCode(BaseModel):
+    id: str
+    language: LanguageEnum
+    code: str
+
 # Code Execution Models
 class CodeRunRequest(BaseModel):
     problem_id: str
     code: str
     language: LanguageEnum
+    contest_id: Optional[str] = None
 
 class TestResult(BaseModel):
     input: str
     expected: str
     actual: str
     passed: bool
+    # Wall time of the case's process; unset when it timed out or failed to run
+    time_ms: Optional[float] = None
 
 class CodeRunResponse(BaseModel):
     success: bool
@@ -157,6 +316,73 @@ class CodeRunResponse(BaseModel):
     error: Optional[str] = None
     runtime: Optional[str] = None
 
+class JudgeStatus(BaseModel):
+    queued: int
+    running: int
+    capacity: int
+
+class JudgeJobKind(str, Enum):
+    RUN = "run"
+    SUBMIT = "submit"
+
+class JudgeJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    kind: JudgeJobKind
+    problem_id: str
+    user_id: str
+    code: str
+    language: LanguageEnum
+    submission_id: Optional[str] = None
+
+class JudgeResult(BaseModel):
+    result: CodeRunResponse
+    # Only set for submit jobs
+    status: Optional[StatusEnum] = None
+
+# Rejudge Models
+class RejudgeStatusEnum(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    CANCELLED = "cancelled"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class RejudgeRequest(BaseModel):
+    # Any combination; submissions must match all that are set
+    problem_id: Optional[str] = None
+    contest_id: Optional[str] = None
+    submitted_after: Optional[datetime] = None
+    submitted_before: Optional[datetime] = None
+
+class RejudgeJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    request: RejudgeRequest
+    status: RejudgeStatusEnum = RejudgeStatusEnum.PENDING
+    total: int = 0
+    processed: int = 0
+    changed: int = 0
+    # (submitted_at, id) of the last submission whose new verdict was written
+    checkpoint_submitted_at: Optional[datetime] = None
+    checkpoint_id: Optional[str] = None
+    error: Optional[str] = None
+    created_by: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+# Rate limit Models
+class RateLimitConfig(BaseModel):
+    # Sustained requests per minute, and how many may be made back to back
+    rate_per_minute: float = Field(gt=0)
+    burst: int = Field(gt=0)
+
+class RateLimitUsage(BaseModel):
+    endpoint: str
+    rate_per_minute: float
+    burst: int
+    remaining: float
+    allowed: int
+    rejected: int
+
 # Contest Models
 class Contest(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -168,6 +394,8 @@ class Contest(BaseModel):
     participants: List[str] = []
     prizes: List[str] = []
     difficulty: DifficultyEnum = DifficultyEnum.MEDIUM
+    # Endpoint ("run" or "submit") -> limits replacing the defaults during this contest
+    rate_limits: Dict[str, RateLimitConfig] = {}
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class ContestCreate(BaseModel):
@@ -178,6 +406,7 @@ class ContestCreate(BaseModel):
     problem_ids: List[str]
     prizes: List[str] = []
     difficulty: DifficultyEnum = DifficultyEnum.MEDIUM
+    rate_limits: Dict[str, RateLimitConfig] = {}
 
 class ContestResponse(BaseModel):
     id: str
@@ -189,6 +418,11 @@ class ContestResponse(BaseModel):
     prizes: List[str]
     difficulty: DifficultyEnum
     status: str  # upcoming, ongoing, completed
+    registered: bool = False
+
+class ContestDetail(ContestResponse):
+    """A contest page in one response; problems are empty until the contest starts"""
+    problems: List[ProblemSummary] = []
 
 # Auth Models
 class Token(BaseModel):
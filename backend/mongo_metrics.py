@@ -0,0 +1,73 @@
+import threading
+import time
+from pymongo import monitoring
+from metrics import (
+    MONGO_COMMAND_FAILURES, MONGO_COMMAND_SECONDS, MONGO_POOL_CHECKED_OUT,
+    MONGO_POOL_CHECKOUT_FAILURES, MONGO_POOL_WAIT_SECONDS
+)
+
+# Kept apart from metrics.py so importing metrics doesn't pull in pymongo
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Motor command monitoring feeding MONGO_COMMAND_SECONDS"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name)
+        MONGO_COMMAND_FAILURES.inc(event.command_name)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool monitoring; a checkout starts and finishes on the same driver thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._checked_out = 0
+        self._lock = threading.Lock()
+
+    def _adjust(self, delta: int):
+        with self._lock:
+            self._checked_out += delta
+            MONGO_POOL_CHECKED_OUT.set(self._checked_out)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+        self._adjust(1)
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.inc(str(event.reason))
+
+    def connection_checked_in(self, event):
+        self._adjust(-1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
@@ -0,0 +1,157 @@
+"""Find suspiciously similar submissions in a contest.
+
+Each user's last accepted submission per contest problem is compared with
+everyone else's in the same language. MinHash signatures stored with the
+code go through LSH to find candidate pairs, and only those pairs get a
+token-level diff:
+
+    python plagiarism.py <contest id> --threshold 0.8 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from pathlib import Path
+
+load_dotenv(Path(__file__).parent / '.env')
+
+from code_similarity import candidate_pairs, estimated_similarity, minhash_signature, token_similarity  # noqa: E402
+from code_store import decompress_code  # noqa: E402
+from database import code_store, get_contest_by_id, submission_archive, submissions_collection  # noqa: E402
+from models import StatusEnum  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.8
+
+
+async def load_contest_submissions(contest_id: str) -> List[Dict]:
+    """Latest accepted submission of each user for each contest problem, hot or archived"""
+    contest = await get_contest_by_id(contest_id)
+    if contest is None:
+        raise SystemExit(f"Contest {contest_id} not found")
+    end_time = contest.start_time + timedelta(minutes=contest.duration_minutes)
+    query = {
+        "status": StatusEnum.ACCEPTED,
+        "$or": [
+            {"contest_id": contest_id},
+            {
+                "problem_id": {"$in": contest.problem_ids},
+                "submitted_at": {"$gte": contest.start_time, "$lt": end_time}
+            }
+        ]
+    }
+    projection = {"_id": 0, "id": 1, "user_id": 1, "problem_id": 1, "language": 1, "code_hash": 1, "submitted_at": 1}
+    docs = await submissions_collection.find(query, projection).to_list(None)
+    # Older contests have moved to the archive; their submissions are in the months the contest ran
+    archived = await submission_archive.find(query, projection, contest.start_time, end_time)
+    if archived:
+        logger.info("%d submissions read from the archive", len(archived))
+    latest = {}
+    for doc in sorted(docs + archived, key=lambda doc: doc["submitted_at"]):
+        latest[(doc["user_id"], doc["problem_id"])] = doc
+    return list(latest.values())
+
+
+async def load_code(submissions: List[Dict], pool: Optional[ProcessPoolExecutor]) -> Tuple[Dict, Dict]:
+    """Code and signatures by code hash, signing code stored before signatures existed"""
+    languages = {doc["code_hash"]: doc["language"] for doc in submissions if doc.get("code_hash")}
+    codes, signatures = {}, {}
+    async for doc in code_store.collection.find({"_id": {"$in": list(languages)}}):
+        codes[doc["_id"]] = decompress_code(doc)
+        if doc.get("minhash") is not None:
+            signatures[doc["_id"]] = bytes(doc["minhash"])
+
+    unsigned = [digest for digest in codes if digest not in signatures]
+    if unsigned:
+        loop = asyncio.get_running_loop()
+        computed = await asyncio.gather(*(
+            loop.run_in_executor(pool, minhash_signature, codes[digest], languages[digest]) for digest in unsigned
+        ))
+        for digest, signature in zip(unsigned, computed):
+            if signature is not None:
+                signatures[digest] = signature
+                await code_store.collection.update_one({"_id": digest}, {"$set": {"minhash": signature}})
+        logger.info("Signed %d stored submissions", len(unsigned))
+    return codes, signatures
+
+
+async def find_similar(
+    contest_id: str,
+    threshold: float = DEFAULT_THRESHOLD,
+    workers: Optional[int] = None
+) -> List[Dict]:
+    submissions = await load_contest_submissions(contest_id)
+    pool = ProcessPoolExecutor(workers) if workers and workers > 1 else None
+    try:
+        codes, signatures = await load_code(submissions, pool)
+
+        # Only submissions to the same problem in the same language are compared
+        groups: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+        for doc in submissions:
+            if doc.get("code_hash") in signatures:
+                groups.setdefault((doc["problem_id"], doc["language"]), {})[doc["id"]] = doc
+
+        candidates = []
+        for (_, language), docs in groups.items():
+            for a, b in candidate_pairs({sid: signatures[doc["code_hash"]] for sid, doc in docs.items()}):
+                if docs[a]["user_id"] != docs[b]["user_id"]:
+                    candidates.append((docs[a], docs[b], language))
+        logger.info("%d submissions, %d candidate pairs", len(submissions), len(candidates))
+
+        loop = asyncio.get_running_loop()
+        scores = await asyncio.gather(*(
+            loop.run_in_executor(pool, token_similarity, codes[a["code_hash"]], codes[b["code_hash"]], language)
+            for a, b, language in candidates
+        ))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    matches = []
+    for (a, b, language), score in zip(candidates, scores):
+        if score >= threshold:
+            estimate = estimated_similarity(signatures[a["code_hash"]], signatures[b["code_hash"]])
+            matches.append({
+                "problem_id": a["problem_id"],
+                "language": getattr(language, "value", language),
+                "similarity": round(score, 3),
+                "estimated_jaccard": round(estimate, 3),
+                "submissions": [
+                    {"id": doc["id"], "user_id": doc["user_id"], "submitted_at": doc["submitted_at"].isoformat()}
+                    for doc in (a, b)
+                ]
+            })
+    matches.sort(key=lambda match: -match["similarity"])
+    return matches
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Report similar submissions in a contest")
+    parser.add_argument("contest_id")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="minimum token diff ratio to report (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="processes for signing and diffing")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+
+async def main(args):
+    matches = await find_similar(args.contest_id, args.threshold, args.workers)
+    if args.json:
+        print(json.dumps(matches, indent=2))
+        return
+    for match in matches:
+        first, second = match["submissions"]
+        print(f"{match['similarity']:.3f}  problem {match['problem_id']} ({match['language']}): "
+              f"user {first['user_id']} submission {first['id']} / user {second['user_id']} submission {second['id']}")
+    print(f"{len(matches)} pairs at or above {args.threshold}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds between flushes of buffered counters to the problem documents
+COUNTER_FLUSH_INTERVAL = float(os.environ.get('PROBLEM_COUNTER_FLUSH_INTERVAL', 5))
+
+COUNTER_FIELDS = ("attempts", "accepts", "likes", "dislikes")
+
+# Ids of the latest flushes applied to each problem, so a flush retried after an
+# ambiguous failure skips the problems it already reached. Costs a short array on
+# every problem document, and must outlast the flushes every replica makes between
+# a failure and its retry; a retry later than that can count twice.
+FLUSH_IDS_KEPT = 20
+
+# Returned after a flush so callers can patch cached rows in place
+REFRESHED_FIELDS = {"_id": 0, "id": 1, "likes": 1, "dislikes": 1, "acceptance_rate": 1}
+
+
+def _counter_update(deltas: Counter, flush_id: str) -> list:
+    """Pipeline update adding the deltas, recording the flush and re-deriving acceptance_rate from the totals"""
+    added = {
+        field: {"$add": [{"$ifNull": [f"${field}", 0]}, deltas[field]]}
+        for field in COUNTER_FIELDS if deltas[field]
+    }
+    added["counter_flushes"] = {"$slice": [
+        {"$concatArrays": [{"$ifNull": ["$counter_flushes", []]}, [flush_id]]}, -FLUSH_IDS_KEPT
+    ]}
+    return [
+        {"$set": added},
+        {"$set": {"acceptance_rate": {"$cond": [
+            {"$gt": [{"$ifNull": ["$attempts", 0]}, 0]},
+            {"$multiply": [{"$divide": [{"$ifNull": ["$accepts", 0]}, "$attempts"]}, 100]},
+            0
+        ]}}}
+    ]
+
+
+class ProblemCounterBuffer:
+    """Write-behind per-problem counters.
+
+    Submissions and reactions only bump an in-memory Counter; a background
+    task folds everything accumulated since the last flush into one bulk
+    write per interval, so a problem that is hot during a contest sees one
+    update per flush instead of one per submission.
+    """
+
+    def __init__(self, collection, interval: float = COUNTER_FLUSH_INTERVAL,
+                 on_flush: Optional[Callable[[Dict], None]] = None):
+        self.collection = collection
+        self.interval = interval
+        self.on_flush = on_flush
+        self._pending: Dict[str, Counter] = defaultdict(Counter)
+        # A flush that failed without telling which updates were applied: (flush id, batch)
+        self._unconfirmed: Optional[Tuple[str, List[Tuple[str, Counter]]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def incr(self, problem_id: str, **deltas: int):
+        self._pending[problem_id].update(deltas)
+
+    async def flush(self) -> int:
+        written = 0
+        flushed = set()
+        if self._unconfirmed is not None:
+            flush_id, batch = self._unconfirmed
+            self._unconfirmed = None
+            written += await self._write(flush_id, batch)
+            flushed.update(problem_id for problem_id, _ in batch)
+        if self._pending:
+            pending, self._pending = self._pending, defaultdict(Counter)
+            batch = [(problem_id, deltas) for problem_id, deltas in pending.items()
+                     if any(deltas[field] for field in COUNTER_FIELDS)]
+            written += await self._write(uuid.uuid4().hex, batch)
+            flushed.update(pending)
+        if written and self.on_flush is not None:
+            cursor = self.collection.find({"id": {"$in": list(flushed)}}, REFRESHED_FIELDS)
+            async for doc in cursor:
+                self.on_flush(doc)
+        return written
+
+    async def _write(self, flush_id: str, batch: List[Tuple[str, Counter]]) -> int:
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError
+        updates = [
+            UpdateOne({"id": problem_id, "counter_flushes": {"$ne": flush_id}}, _counter_update(deltas, flush_id))
+            for problem_id, deltas in batch
+        ]
+        if not updates:
+            return 0
+        try:
+            await self.collection.bulk_write(updates, ordered=False)
+        except BulkWriteError as e:
+            # The other updates were applied; the failed ones go out with the next flush
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            self._restore(item for i, item in enumerate(batch) if i in failed)
+            raise
+        except Exception:
+            # A timeout or lost connection may come after the server applied some or all of the
+            # updates. The batch is retried as is, under the same flush id, so the problems that
+            # recorded it skip it and nothing is counted twice; new deltas wait until it succeeds.
+            self._unconfirmed = (flush_id, batch)
+            raise
+        return len(updates)
+
+    def _restore(self, batch: Iterable[Tuple[str, Counter]]):
+        for problem_id, deltas in batch:
+            self._pending[problem_id].update(deltas)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing problem counters failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
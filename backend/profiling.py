@@ -0,0 +1,169 @@
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Opt-in: set SLOW_REQUEST_PROFILING=1
+PROFILING_ENABLED = os.environ.get('SLOW_REQUEST_PROFILING', '').lower() in ('1', 'true', 'yes')
+SLOW_REQUEST_THRESHOLD_MS = float(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 1000))
+SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5))
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', '/tmp/slow-request-profiles'))
+MAX_PROFILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+
+class _InFlight:
+    __slots__ = ("started", "method", "path", "samples")
+
+    def __init__(self, method: str, path: str):
+        self.started = time.perf_counter()
+        self.method = method
+        self.path = path
+        self.samples: Optional[Counter] = None
+
+
+class SlowRequestProfiler:
+    """Samples the event loop thread's stack while any request is over the threshold.
+
+    Requests only register their start time. A watchdog thread checks the
+    in-flight set and begins sampling once a request has been running longer
+    than the threshold, so fast requests pay for a dict insert and delete.
+    Sampling from a separate thread also catches code that blocks the loop.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_REQUEST_THRESHOLD_MS,
+        interval_ms: float = SAMPLE_INTERVAL_MS,
+        directory: Path = PROFILE_DIR,
+        max_profiles: int = MAX_PROFILES
+    ):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+        self._in_flight: Dict[int, _InFlight] = {}
+        self._keys = itertools.count()
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start_request(self, method: str, path: str) -> int:
+        if self._watchdog is None:
+            self._loop_thread_id = threading.get_ident()
+            self._watchdog = threading.Thread(target=self._watch, name="slow-request-profiler", daemon=True)
+            self._watchdog.start()
+        key = next(self._keys)
+        self._in_flight[key] = _InFlight(method, path)
+        return key
+
+    def finish_request(self, key: int, status_code: Optional[int]):
+        request = self._in_flight.pop(key, None)
+        if request is None or request.samples is None:
+            return
+        elapsed = time.perf_counter() - request.started
+        if elapsed >= self.threshold:
+            self._save(request, elapsed, status_code)
+
+    def _watch(self):
+        while True:
+            now = time.perf_counter()
+            slow = [r for r in list(self._in_flight.values()) if now - r.started >= self.threshold]
+            if not slow:
+                time.sleep(min(self.threshold / 2, 0.1))
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                stack = _fold_stack(frame)
+                for request in slow:
+                    if request.samples is None:
+                        request.samples = Counter()
+                    request.samples[stack] += 1
+            time.sleep(self.interval)
+
+    def _save(self, request: _InFlight, elapsed: float, status_code: Optional[int]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        profile = {
+            "id": profile_id,
+            "method": request.method,
+            "path": request.path,
+            "status_code": status_code,
+            "duration_ms": round(elapsed * 1000, 1),
+            "threshold_ms": self.threshold * 1000,
+            "sample_interval_ms": self.interval * 1000,
+            # Folded stacks (flamegraph.pl / speedscope input) with sample counts
+            "samples": dict(request.samples.most_common()),
+        }
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(profile))
+        self._trim()
+
+    def _trim(self):
+        files = sorted(self.directory.glob("*.json"))
+        for old in files[:-self.max_profiles]:
+            old.unlink(missing_ok=True)
+
+    def list_profiles(self) -> List[Dict]:
+        if not self.directory.exists():
+            return []
+        profiles = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            data.pop("samples", None)
+            profiles.append(data)
+        return profiles
+
+    def get_profile(self, profile_id: str) -> Optional[Dict]:
+        path = self.directory / f"{Path(profile_id).name}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+
+def _fold_stack(frame) -> str:
+    """Outermost-first `file:function:line` frames joined with ';'"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class SlowRequestProfilingMiddleware:
+    """ASGI middleware feeding request start/finish into a SlowRequestProfiler"""
+
+    def __init__(self, app: ASGIApp, profiler: SlowRequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        key = self.profiler.start_request(scope["method"], scope["path"])
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.finish_request(key, status_code)
+
+
+slow_request_profiler = SlowRequestProfiler()
@@ -0,0 +1,213 @@
+"""Global user ranking.
+
+A user's score is derived from profile.solved and stored as profile.score.
+Ranks use competition ranking: one plus the number of users with a higher
+score, so ties share a rank.
+
+- `RankIndex` keeps the number of users at each score in a Fenwick tree,
+  mirrored in the rank_buckets collection. Stats updates move a user
+  between buckets, so "my rank" is a logarithmic-time lookup that stays
+  current between recomputes.
+- `recompute_rankings` is the periodic exact pass. It streams users in
+  score order off the profile.score index, writes changed profile.ranking
+  values in bulk, and rebuilds the bucket counts from what it saw:
+
+    python ranking.py                 # once, e.g. from cron
+    python ranking.py --interval 900  # keep recomputing
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Harder problems count for more
+SCORE_WEIGHTS = {"easy": 1, "medium": 2, "hard": 3}
+# Reload bucket counts this often to pick up moves made by other replicas
+RANK_INDEX_TTL = float(os.environ.get('RANK_INDEX_TTL', 60))
+RANKING_BATCH_SIZE = 1000
+
+
+def ranking_score(solved: Dict[str, int]) -> int:
+    return sum(solved.get(difficulty, 0) * weight for difficulty, weight in SCORE_WEIGHTS.items())
+
+
+def score_expression(solved_path: str = "$profile.solved") -> Dict:
+    """ranking_score as an aggregation expression, for pipeline updates"""
+    return {"$add": [
+        {"$multiply": [{"$ifNull": [f"{solved_path}.{difficulty}", 0]}, weight]}
+        for difficulty, weight in SCORE_WEIGHTS.items()
+    ]}
+
+
+class FenwickTree:
+    """Counts per non-negative integer score with logarithmic updates and prefix sums"""
+
+    def __init__(self, size: int = 1024):
+        self._tree = [0] * (size + 1)
+        self.total = 0
+
+    def _grow(self, size: int):
+        counts = [self.count_at(score) for score in range(len(self._tree) - 1)]
+        self._tree = [0] * (size + 1)
+        self.total = 0
+        for score, count in enumerate(counts):
+            if count:
+                self.add(score, count)
+
+    def add(self, score: int, delta: int):
+        if score + 1 >= len(self._tree):
+            self._grow(max(2 * (len(self._tree) - 1), score + 1))
+        self.total += delta
+        i = score + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def count_upto(self, score: int) -> int:
+        """Users with a score of at most `score`"""
+        i = min(score + 1, len(self._tree) - 1)
+        count = 0
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+        return count
+
+    def count_at(self, score: int) -> int:
+        return self.count_upto(score) - (self.count_upto(score - 1) if score > 0 else 0)
+
+
+class RankIndex:
+    """Approximate live ranks from per-score user counts"""
+
+    def __init__(self, collection, ttl: float = RANK_INDEX_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self._tree = FenwickTree()
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def ensure_fresh(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            tree = FenwickTree()
+            async for doc in self.collection.find({"count": {"$gt": 0}}):
+                tree.add(doc["_id"], doc["count"])
+            self._tree = tree
+            self._loaded_at = time.monotonic()
+
+    async def move(self, changes: Iterable[Tuple[Optional[int], int]]):
+        """Apply (old score or None for a new user, new score) pairs"""
+        from pymongo import UpdateOne
+        deltas: Dict[int, int] = {}
+        for old, new in changes:
+            if old == new:
+                continue
+            if old is not None:
+                deltas[old] = deltas.get(old, 0) - 1
+            deltas[new] = deltas.get(new, 0) + 1
+        deltas = {score: delta for score, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        if self._loaded_at is not None:
+            for score, delta in deltas.items():
+                self._tree.add(score, delta)
+        await self.collection.bulk_write([
+            UpdateOne({"_id": score}, {"$inc": {"count": delta}}, upsert=True)
+            for score, delta in deltas.items()
+        ], ordered=False)
+
+    async def rank_of(self, score: int) -> int:
+        await self.ensure_fresh()
+        return 1 + self._tree.total - self._tree.count_upto(score)
+
+    async def total(self) -> int:
+        await self.ensure_fresh()
+        return self._tree.total
+
+    def reset(self, counts: Dict[int, int]):
+        tree = FenwickTree()
+        for score, count in counts.items():
+            tree.add(score, count)
+        self._tree = tree
+        self._loaded_at = time.monotonic()
+
+
+async def recompute_rankings(users_collection, rank_index: RankIndex) -> int:
+    """Exact ranks for every user; returns how many rankings changed"""
+    from pymongo import DeleteMany, ReplaceOne, UpdateOne
+
+    await users_collection.create_index([("profile.score", -1), ("id", 1)])
+    # Users whose stats predate stored scores
+    await users_collection.update_many(
+        {"profile.score": {"$exists": False}},
+        [{"$set": {"profile.score": score_expression()}}]
+    )
+
+    counts: Dict[int, int] = {}
+    updates: List = []
+    changed = 0
+    seen = 0
+    rank = 0
+    previous_score = None
+    cursor = users_collection.find(
+        {}, {"_id": 0, "id": 1, "profile.score": 1, "profile.ranking": 1}
+    ).sort([("profile.score", -1), ("id", 1)])
+    async for doc in cursor:
+        profile = doc.get("profile", {})
+        score = profile.get("score", 0)
+        seen += 1
+        if score != previous_score:
+            rank, previous_score = seen, score
+        counts[score] = counts.get(score, 0) + 1
+        if profile.get("ranking") != rank:
+            updates.append(UpdateOne({"id": doc["id"]}, {"$set": {"profile.ranking": rank}}))
+        if len(updates) >= RANKING_BATCH_SIZE:
+            await users_collection.bulk_write(updates, ordered=False)
+            changed += len(updates)
+            updates = []
+    if updates:
+        await users_collection.bulk_write(updates, ordered=False)
+        changed += len(updates)
+
+    # Replace the incrementally maintained counts with the exact ones
+    await rank_index.collection.bulk_write(
+        [ReplaceOne({"_id": score}, {"count": count}, upsert=True) for score, count in counts.items()]
+        + [DeleteMany({"_id": {"$nin": list(counts)}})],
+        ordered=False
+    )
+    rank_index.reset(counts)
+    return changed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recompute global user rankings")
+    parser.add_argument("--interval", type=float, help="recompute every this many seconds instead of once")
+    return parser.parse_args()
+
+
+async def main(args):
+    from database import rank_index, users_collection
+
+    while True:
+        started = time.monotonic()
+        changed = await recompute_rankings(users_collection, rank_index)
+        logger.info("Recomputed rankings in %.1fs, %d changed", time.monotonic() - started, changed)
+        if not args.interval:
+            return
+        await asyncio.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / '.env')
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_args()))
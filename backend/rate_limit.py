@@ -0,0 +1,299 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from models import Contest, RateLimitConfig, RateLimitUsage
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Only needed with RATE_LIMIT_BACKEND=redis
+    aioredis = None
+
+# Default per-user limits for each endpoint; contests may override them
+DEFAULT_LIMITS: Dict[str, RateLimitConfig] = {
+    "run": RateLimitConfig(
+        rate_per_minute=float(os.environ.get('RUN_RATE_LIMIT', 30)),
+        burst=int(os.environ.get('RUN_BURST', 10))
+    ),
+    "submit": RateLimitConfig(
+        rate_per_minute=float(os.environ.get('SUBMIT_RATE_LIMIT', 10)),
+        burst=int(os.environ.get('SUBMIT_BURST', 5))
+    ),
+}
+# An address may be shared by several users (offices, campuses), so it gets a multiple of the user limit
+IP_LIMIT_FACTOR = float(os.environ.get('IP_RATE_LIMIT_FACTOR', 5))
+# Seconds a contest's rate limit overrides are cached
+CONTEST_LIMITS_TTL = 60
+# Contest lookups kept at most; clients choose the ids, so unknown ones must not grow the cache without bound
+CONTEST_CACHE_SIZE = 1024
+
+
+class RateLimited(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class BucketStore:
+    """Token buckets keyed by string"""
+
+    # Seconds a key's allowed/rejected counts are kept after its last request
+    COUNTS_TTL = 24 * 3600
+
+    async def take(self, key: str, limit: RateLimitConfig) -> Tuple[bool, float]:
+        """Spend one token if available; returns (allowed, tokens left)"""
+        raise NotImplementedError
+
+    async def refund(self, key: str, limit: RateLimitConfig):
+        """Give back a token spent on a request that was refused elsewhere"""
+        raise NotImplementedError
+
+    async def peek(self, key: str, limit: RateLimitConfig) -> float:
+        raise NotImplementedError
+
+    async def record(self, key: str, allowed: bool):
+        raise NotImplementedError
+
+    async def counts(self, key: str) -> Tuple[int, int]:
+        """(allowed, rejected) requests recorded under key"""
+        raise NotImplementedError
+
+
+def _refill(tokens: float, updated: float, now: float, limit: RateLimitConfig) -> float:
+    return min(limit.burst, tokens + (now - updated) * limit.rate_per_minute / 60)
+
+
+class InMemoryBucketStore(BucketStore):
+    """Per-process buckets; each API replica enforces its own share of the limit.
+
+    Like the Redis keys' expiry, a bucket is dropped once it has refilled
+    (a missing bucket is a full one) and counts after COUNTS_TTL without a
+    request, so every user and address seen doesn't stay in memory.
+    """
+
+    SWEEP_INTERVAL = 60
+
+    def __init__(self):
+        # key -> (tokens, updated, when the bucket is full again)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        # key -> [allowed, rejected, last recorded]
+        self._counts: Dict[str, List[float]] = {}
+        self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+
+    def _sweep(self, now: float):
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.SWEEP_INTERVAL
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        self._counts = {key: counts for key, counts in self._counts.items() if counts[2] + self.COUNTS_TTL > now}
+
+    def _set(self, key: str, tokens: float, now: float, limit: RateLimitConfig):
+        self._buckets[key] = (tokens, now, now + (limit.burst - tokens) * 60 / limit.rate_per_minute)
+
+    async def take(self, key, limit):
+        now = time.monotonic()
+        self._sweep(now)
+        tokens = await self.peek(key, limit)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._set(key, tokens, now, limit)
+        return allowed, tokens
+
+    async def refund(self, key, limit):
+        now = time.monotonic()
+        self._set(key, min(limit.burst, await self.peek(key, limit) + 1), now, limit)
+
+    async def peek(self, key, limit):
+        now = time.monotonic()
+        tokens, updated, _ = self._buckets.get(key, (limit.burst, now, now))
+        return _refill(tokens, updated, now, limit)
+
+    async def record(self, key, allowed):
+        counts = self._counts.setdefault(key, [0, 0, 0.0])
+        counts[0 if allowed else 1] += 1
+        counts[2] = time.monotonic()
+
+    async def counts(self, key):
+        allowed, rejected, _ = self._counts.get(key, (0, 0, 0.0))
+        return allowed, rejected
+
+
+# Refill and spend atomically so replicas sharing Redis can't overspend a bucket
+_TAKE_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+# An expired bucket is already full, so there is nothing to give back
+_REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[1]), tokens + 1))
+end
+return 0
+"""
+
+
+class RedisBucketStore(BucketStore):
+    """Buckets shared by every API replica"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit"):
+        if aioredis is None:
+            raise RuntimeError("The redis package is required for RATE_LIMIT_BACKEND=redis")
+        self.redis = aioredis.from_url(url)
+        self.prefix = prefix
+        self._take = self.redis.register_script(_TAKE_SCRIPT)
+        self._refund = self.redis.register_script(_REFUND_SCRIPT)
+
+    async def take(self, key, limit):
+        allowed, tokens = await self._take(
+            keys=[f"{self.prefix}:bucket:{key}"],
+            args=[limit.rate_per_minute / 60, limit.burst, time.time()]
+        )
+        return bool(allowed), float(tokens)
+
+    async def refund(self, key, limit):
+        await self._refund(keys=[f"{self.prefix}:bucket:{key}"], args=[limit.burst])
+
+    async def peek(self, key, limit):
+        tokens, ts = await self.redis.hmget(f"{self.prefix}:bucket:{key}", "tokens", "ts")
+        if tokens is None:
+            return float(limit.burst)
+        return _refill(float(tokens), float(ts), time.time(), limit)
+
+    async def record(self, key, allowed):
+        counts_key = f"{self.prefix}:usage:{key}"
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(counts_key, "allowed" if allowed else "rejected", 1)
+            pipe.expire(counts_key, self.COUNTS_TTL)
+            await pipe.execute()
+
+    async def counts(self, key):
+        allowed, rejected = await self.redis.hmget(f"{self.prefix}:usage:{key}", "allowed", "rejected")
+        return int(allowed or 0), int(rejected or 0)
+
+
+class RateLimiter:
+    """Token-bucket limits per user and per client address for judge endpoints"""
+
+    def __init__(
+        self,
+        store: BucketStore,
+        load_contest: Callable[[str], Awaitable[Optional[Contest]]],
+        defaults: Dict[str, RateLimitConfig] = DEFAULT_LIMITS
+    ):
+        self.store = store
+        self.load_contest = load_contest
+        self.defaults = defaults
+        # contest id -> (expiry, contest or None if there is none), least recently used first
+        self._contest_cache: "OrderedDict[str, Tuple[float, Optional[Contest]]]" = OrderedDict()
+
+    async def _get_contest(self, contest_id: str) -> Optional[Contest]:
+        cached = self._contest_cache.get(contest_id)
+        if cached is None or cached[0] < time.monotonic():
+            cached = (time.monotonic() + CONTEST_LIMITS_TTL, await self.load_contest(contest_id))
+            self._contest_cache[contest_id] = cached
+            while len(self._contest_cache) > CONTEST_CACHE_SIZE:
+                self._contest_cache.popitem(last=False)
+        self._contest_cache.move_to_end(contest_id)
+        return cached[1]
+
+    async def active_contest(self, contest_id: Optional[str], problem_id: Optional[str] = None) -> Optional[Contest]:
+        """The contest whose limits apply: it must exist, be running and include the problem.
+
+        Any other id is ignored, so a made-up contest id can't buy a fresh bucket.
+        """
+        if not contest_id:
+            return None
+        contest = await self._get_contest(contest_id)
+        if contest is None:
+            return None
+        now = datetime.utcnow()
+        if not contest.start_time <= now < contest.start_time + timedelta(minutes=contest.duration_minutes):
+            return None
+        if problem_id is not None and problem_id not in contest.problem_ids:
+            return None
+        return contest
+
+    def limit_for(self, endpoint: str, contest: Optional[Contest] = None) -> RateLimitConfig:
+        if contest is not None and endpoint in contest.rate_limits:
+            return contest.rate_limits[endpoint]
+        return self.defaults[endpoint]
+
+    @staticmethod
+    def _scope(endpoint: str, contest: Optional[Contest]) -> str:
+        return f"{endpoint}:{contest.id}" if contest is not None else endpoint
+
+    async def check(
+        self,
+        endpoint: str,
+        user_id: str,
+        client_ip: Optional[str],
+        contest_id: Optional[str] = None,
+        problem_id: Optional[str] = None
+    ):
+        """Spend a token from the user's and the address's bucket, or raise RateLimited"""
+        contest = await self.active_contest(contest_id, problem_id)
+        limit = self.limit_for(endpoint, contest)
+        scope = self._scope(endpoint, contest)
+        user_key = f"{scope}:user:{user_id}"
+
+        allowed, tokens = await self.store.take(user_key, limit)
+        if allowed and client_ip:
+            ip_limit = RateLimitConfig(
+                rate_per_minute=limit.rate_per_minute * IP_LIMIT_FACTOR,
+                burst=math.ceil(limit.burst * IP_LIMIT_FACTOR)
+            )
+            allowed, ip_tokens = await self.store.take(f"{scope}:ip:{client_ip}", ip_limit)
+            if not allowed:
+                # The request isn't served, so it mustn't cost the user their own quota
+                await self.store.refund(user_key, limit)
+                await self.store.record(user_key, False)
+                raise RateLimited("client address", _retry_after(ip_tokens, ip_limit))
+        await self.store.record(user_key, allowed)
+        if not allowed:
+            raise RateLimited(endpoint, _retry_after(tokens, limit))
+
+    async def usage(self, user_id: str, contest_id: Optional[str] = None) -> List[RateLimitUsage]:
+        contest = await self.active_contest(contest_id)
+        usage = []
+        for endpoint in self.defaults:
+            limit = self.limit_for(endpoint, contest)
+            user_key = f"{self._scope(endpoint, contest)}:user:{user_id}"
+            allowed, rejected = await self.store.counts(user_key)
+            usage.append(RateLimitUsage(
+                endpoint=endpoint,
+                rate_per_minute=limit.rate_per_minute,
+                burst=limit.burst,
+                remaining=round(await self.store.peek(user_key, limit), 2),
+                allowed=allowed,
+                rejected=rejected
+            ))
+        return usage
+
+
+def _retry_after(tokens: float, limit: RateLimitConfig) -> float:
+    """Seconds until the bucket holds a whole token again"""
+    return max(0.0, (1 - tokens) * 60 / limit.rate_per_minute)
+
+
+def create_bucket_store() -> BucketStore:
+    if os.environ.get('RATE_LIMIT_BACKEND', 'memory') == 'redis':
+        return RedisBucketStore(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    return InMemoryBucketStore()
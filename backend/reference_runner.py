@@ -0,0 +1,274 @@
+"""Build a problem's generated test cases from its reference solution.
+
+The problem's generator produces the inputs, the reference solution's
+outputs become the expected values, and an optional second reference
+must agree with it on every case. Nothing is written if any case fails
+or the references disagree:
+
+    python reference_runner.py <problem id> --workers 8
+    python reference_runner.py <problem id> --count 200 --dry-run
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from pathlib import Path
+
+load_dotenv(Path(__file__).parent / '.env')
+
+from models import (  # noqa: E402
+    LanguageEnum, Problem, ProblemReference, ReferenceBuildJob, ReferenceBuildReport, ReferenceBuildStatusEnum,
+    ReferenceCaseIssue, ReferenceSolution, TestCase, TestResult
+)
+from code_executor import CodeExecutor, job_workspace  # noqa: E402
+from comparator import Comparator  # noqa: E402
+from database import (  # noqa: E402
+    _LazyCollection, get_problem_by_id, get_problem_reference, replace_generated_test_cases
+)
+
+logger = logging.getLogger(__name__)
+
+# Cases per executor call: the harness is written once per chunk and chunks run in parallel
+CHUNK_SIZE = int(os.environ.get('REFERENCE_CHUNK_SIZE', 50))
+GENERATOR_TIMEOUT = float(os.environ.get('REFERENCE_GENERATOR_TIMEOUT', 60))
+# Languages the executor actually runs; the others are still mocked
+RUNNABLE_LANGUAGES = {LanguageEnum.PYTHON, LanguageEnum.JAVASCRIPT}
+ISSUE_PREVIEW_CHARS = 200
+
+# Builds started through the API, with their reports
+reference_builds_collection = _LazyCollection("reference_builds")
+
+# Each index gets its own seeded RNG, so inputs don't depend on how generation is chunked
+_GENERATOR_HARNESS = """
+import json as _json
+import random as _random
+import sys as _sys
+
+{generator}
+
+_seed, _start, _stop = (int(arg) for arg in _sys.argv[1:4])
+_json.dump([str(generate(_random.Random(_seed * 1000003 + i), i)) for i in range(_start, _stop)], _sys.stdout)
+"""
+
+
+def _preview(text: str) -> str:
+    return text if len(text) <= ISSUE_PREVIEW_CHARS else text[:ISSUE_PREVIEW_CHARS] + "..."
+
+
+def _chunks(count: int, size: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+async def _generate_chunk(script: Path, seed: int, start: int, stop: int, niceness: int) -> List[str]:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, script.name, str(seed), str(start), str(stop),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=script.parent,
+        preexec_fn=(lambda: os.nice(niceness)) if niceness else None
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=GENERATOR_TIMEOUT)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(f"Generator failed for cases {start}-{stop}: {stderr.decode().strip()}")
+    return json.loads(stdout)
+
+
+async def generate_inputs(generator: str, count: int, seed: int, workers: int, niceness: int = 0) -> List[str]:
+    """Run the author's generator in subprocesses, `workers` chunks at a time"""
+    slots = asyncio.Semaphore(workers)
+    with job_workspace() as workspace:
+        script = workspace / "generator.py"
+        script.write_text(_GENERATOR_HARNESS.format(generator=generator))
+
+        async def run(start: int, stop: int) -> List[str]:
+            async with slots:
+                return await _generate_chunk(script, seed, start, stop, niceness)
+
+        chunks = await asyncio.gather(*(run(start, stop) for start, stop in _chunks(count, CHUNK_SIZE * 10)))
+    return [case for chunk in chunks for case in chunk]
+
+
+async def run_reference(executor: CodeExecutor, solution: ReferenceSolution, inputs: List[str]) -> List[TestResult]:
+    """Outputs of `solution` for every input, judged in parallel chunks on the executor's slots"""
+    if solution.language not in RUNNABLE_LANGUAGES:
+        raise ValueError(f"Reference solutions must be in one of: {', '.join(sorted(RUNNABLE_LANGUAGES))}")
+
+    async def run(start: int, stop: int) -> List[TestResult]:
+        response = await executor.execute_code(
+            solution.code, solution.language, [(test_input, "") for test_input in inputs[start:stop]]
+        )
+        if len(response.test_results) != stop - start:
+            raise RuntimeError(response.error or "Reference solution could not be run")
+        return response.test_results
+
+    chunks = await asyncio.gather(*(run(start, stop) for start, stop in _chunks(len(inputs), CHUNK_SIZE)))
+    return [result for chunk in chunks for result in chunk]
+
+
+def timing_summary(results: List[TestResult]) -> Dict[str, float]:
+    times = sorted(result.time_ms for result in results if result.time_ms is not None)
+    if not times:
+        return {}
+
+    def percentile(p: float) -> float:
+        return times[min(len(times) - 1, math.ceil(p * len(times)) - 1)]
+
+    return {
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": times[-1],
+        "mean": round(sum(times) / len(times), 2),
+    }
+
+
+def _failures(inputs: List[str], results: List[TestResult], label: str) -> List[ReferenceCaseIssue]:
+    return [
+        ReferenceCaseIssue(index=i, input=_preview(test_input), detail=f"{label} timed out or exited with an error")
+        for i, (test_input, result) in enumerate(zip(inputs, results))
+        if result.time_ms is None
+    ]
+
+
+async def build_test_cases(
+    problem: Problem,
+    reference: ProblemReference,
+    workers: int = os.cpu_count() or 1,
+    count: Optional[int] = None,
+    dry_run: bool = False,
+    executor: Optional[CodeExecutor] = None
+) -> ReferenceBuildReport:
+    """Generate, judge and store the cases; on `executor` if given, else on one of `workers` slots"""
+    started = time.perf_counter()
+    executor = executor or CodeExecutor(workers)
+    inputs = await generate_inputs(
+        reference.generator, count or reference.count, reference.seed, workers, executor.niceness
+    )
+
+    expected = await run_reference(executor, reference.solution, inputs)
+    timings = {"solution": timing_summary(expected)}
+    failures = _failures(inputs, expected, "Reference solution")
+
+    disagreements = []
+    if reference.cross_check is not None:
+        checked = await run_reference(executor, reference.cross_check, inputs)
+        timings["cross_check"] = timing_summary(checked)
+        failures += _failures(inputs, checked, "Cross-check solution")
+        comparator = Comparator.for_problem(problem)
+        for i, (test_input, first, second) in enumerate(zip(inputs, expected, checked)):
+            if first.time_ms is None or second.time_ms is None:
+                continue
+            if not comparator.compare(first.actual, second.actual):
+                disagreements.append(ReferenceCaseIssue(
+                    index=i,
+                    input=_preview(test_input),
+                    detail=f"solution: {_preview(first.actual)} / cross-check: {_preview(second.actual)}"
+                ))
+
+    written = not failures and not disagreements and not dry_run
+    if written:
+        await replace_generated_test_cases(problem.id, [
+            TestCase(input=test_input, expected=result.actual, generated=True)
+            for test_input, result in zip(inputs, expected)
+        ])
+
+    wall_seconds = time.perf_counter() - started
+    return ReferenceBuildReport(
+        problem_id=problem.id,
+        cases=len(inputs),
+        workers=workers,
+        wall_seconds=round(wall_seconds, 3),
+        cases_per_second=round(len(inputs) * len(timings) / wall_seconds, 1),
+        timings=timings,
+        failures=failures,
+        disagreements=disagreements,
+        written=written
+    )
+
+
+async def build_problem_test_cases(problem_id: str, **options) -> ReferenceBuildReport:
+    problem = await get_problem_by_id(problem_id)
+    if problem is None:
+        raise LookupError(f"Problem {problem_id} not found")
+    reference = await get_problem_reference(problem_id)
+    if reference is None:
+        raise LookupError(f"Problem {problem_id} has no reference solution")
+    return await build_test_cases(problem, reference, **options)
+
+
+async def create_build_job(problem_id: str, created_by: str, count: Optional[int] = None,
+                           dry_run: bool = False) -> ReferenceBuildJob:
+    # Checked here so a bad request fails right away rather than in the background
+    if await get_problem_by_id(problem_id) is None:
+        raise LookupError(f"Problem {problem_id} not found")
+    if await get_problem_reference(problem_id) is None:
+        raise LookupError(f"Problem {problem_id} has no reference solution")
+    job = ReferenceBuildJob(problem_id=problem_id, count=count, dry_run=dry_run, created_by=created_by)
+    await reference_builds_collection.insert_one(job.dict())
+    return job
+
+
+async def get_build_job(job_id: str) -> Optional[ReferenceBuildJob]:
+    doc = await reference_builds_collection.find_one({"id": job_id})
+    return ReferenceBuildJob(**doc) if doc else None
+
+
+async def run_build_job(job: ReferenceBuildJob, executor: CodeExecutor) -> ReferenceBuildJob:
+    """Build the job's cases on `executor` and record the report, or why it failed"""
+    try:
+        job.report = await build_problem_test_cases(
+            job.problem_id, workers=executor.max_concurrency, count=job.count, dry_run=job.dry_run,
+            executor=executor
+        )
+        job.status = ReferenceBuildStatusEnum.COMPLETED
+    except (LookupError, ValueError, RuntimeError) as e:
+        job.status, job.error = ReferenceBuildStatusEnum.FAILED, str(e)
+    except Exception as e:
+        logger.exception("Reference build %s failed", job.id)
+        job.status, job.error = ReferenceBuildStatusEnum.FAILED, str(e)
+    job.updated_at = datetime.utcnow()
+    await reference_builds_collection.update_one({"id": job.id}, {"$set": {
+        "status": job.status,
+        "report": job.report.dict() if job.report else None,
+        "error": job.error,
+        "updated_at": job.updated_at
+    }})
+    return job
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a problem's test cases from its reference solution")
+    parser.add_argument("problem_id")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="cases judged at once")
+    parser.add_argument("--count", type=int, help="override the number of generated cases")
+    parser.add_argument("--dry-run", action="store_true", help="report without storing the test cases")
+    return parser.parse_args()
+
+
+async def main(args):
+    try:
+        report = await build_problem_test_cases(
+            args.problem_id, workers=args.workers, count=args.count, dry_run=args.dry_run
+        )
+    except LookupError as e:
+        raise SystemExit(str(e))
+    print(json.dumps(report.dict(), indent=2))
+    if report.failures or report.disagreements:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,354 @@
+"""Bulk rejudge of earlier submissions after a problem's test cases change.
+
+Both tiers are rejudged: hot submissions and the archive months the
+selection covers, merged in one (submitted_at, id) order.
+
+Jobs are stored in the rejudge_jobs collection with a checkpoint after every
+batch, so an interrupted job resumes where it stopped:
+
+    python rejudge.py --problem-id <id>
+    python rejudge.py --contest-id <id> --after 2024-01-01T00:00:00
+    python rejudge.py --resume <job id>
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from pathlib import Path
+
+load_dotenv(Path(__file__).parent / '.env')
+
+from models import (  # noqa: E402
+    CodeRunResponse, LanguageEnum, RejudgeJob, RejudgeRequest, RejudgeStatusEnum, StatusEnum
+)
+from code_executor import CodeExecutor  # noqa: E402
+from comparator import Comparator, UnknownCheckerError  # noqa: E402
+from database import (  # noqa: E402
+    _LazyCollection, activity_collection, code_store, get_contest_by_id, get_problem_by_id, get_problem_test_cases,
+    problem_counters, recompute_user_stats, runtime_histograms_collection, submission_archive,
+    submission_summaries_collection, submissions_collection
+)
+from activity import activity_id  # noqa: E402
+from judge import determine_status, judge_error  # noqa: E402
+from runtime_histograms import histogram_id, histogram_increments  # noqa: E402
+from submission_archive import _summarize, archive_month  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+REJUDGE_BATCH_SIZE = int(os.environ.get('REJUDGE_BATCH_SIZE', 500))
+# Separate from live judging slots; defaults to a quarter of the host
+REJUDGE_CONCURRENCY = int(os.environ.get('REJUDGE_CONCURRENCY', max(1, (os.cpu_count() or 1) // 4)))
+REJUDGE_NICENESS = int(os.environ.get('REJUDGE_NICENESS', 10))
+
+rejudge_jobs_collection = _LazyCollection("rejudge_jobs")
+
+REJUDGE_PROJECTION = {
+    "_id": 0, "id": 1, "user_id": 1, "problem_id": 1, "language": 1,
+    "code": 1, "code_hash": 1, "status": 1, "runtime": 1, "memory": 1, "submitted_at": 1
+}
+
+
+async def selection_query(request: RejudgeRequest) -> Dict:
+    query: Dict = {"status": {"$ne": StatusEnum.PENDING}}
+    submitted_at: Dict = {}
+    if request.problem_id:
+        query["problem_id"] = request.problem_id
+    if request.contest_id:
+        contest = await get_contest_by_id(request.contest_id)
+        if contest is None:
+            raise ValueError(f"Contest {request.contest_id} not found")
+        # Contest submissions are those made to its problems while it ran
+        query.setdefault("problem_id", {"$in": contest.problem_ids})
+        if isinstance(query["problem_id"], str) and query["problem_id"] not in contest.problem_ids:
+            query["problem_id"] = {"$in": []}
+        submitted_at["$gte"] = contest.start_time
+        submitted_at["$lt"] = contest.start_time + timedelta(minutes=contest.duration_minutes)
+    if request.submitted_after:
+        submitted_at["$gte"] = max(request.submitted_after, submitted_at.get("$gte", request.submitted_after))
+    if request.submitted_before:
+        submitted_at["$lt"] = min(request.submitted_before, submitted_at.get("$lt", request.submitted_before))
+    if submitted_at:
+        query["submitted_at"] = submitted_at
+    return query
+
+
+def _archive_range(query: Dict, job: RejudgeJob) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """The submitted_at range left to read, which bounds the archive months"""
+    submitted_at = query.get("submitted_at", {})
+    start, end = submitted_at.get("$gte"), submitted_at.get("$lt")
+    if job.checkpoint_submitted_at is not None:
+        start = max(start, job.checkpoint_submitted_at) if start else job.checkpoint_submitted_at
+    return start, end
+
+
+def _after_checkpoint(query: Dict, job: RejudgeJob) -> Dict:
+    """Keyset pagination on (submitted_at, id), the order submissions are rejudged in"""
+    if job.checkpoint_id is None:
+        return query
+    return {"$and": [query, {"$or": [
+        {"submitted_at": {"$gt": job.checkpoint_submitted_at}},
+        {"submitted_at": job.checkpoint_submitted_at, "id": {"$gt": job.checkpoint_id}}
+    ]}]}
+
+
+class Rejudger:
+    """Runs rejudge jobs on an executor of its own, yielding to live judging.
+
+    Sandboxes run at a lower CPU priority, and no new rejudge case starts
+    while live submissions are waiting for a slot on `live_executor`.
+    """
+
+    def __init__(self, executor: Optional[CodeExecutor] = None, live_executor: Optional[CodeExecutor] = None,
+                 batch_size: int = REJUDGE_BATCH_SIZE):
+        self.executor = executor or CodeExecutor(REJUDGE_CONCURRENCY, niceness=REJUDGE_NICENESS)
+        self.live_executor = live_executor
+        self.batch_size = batch_size
+        # Cases take a slot here before checking for live backlog, so a whole batch can't slip past it at once
+        self._slots = asyncio.Semaphore(self.executor.max_concurrency)
+
+    async def create_job(self, request: RejudgeRequest, created_by: str) -> RejudgeJob:
+        job = RejudgeJob(request=request, created_by=created_by)
+        query = await selection_query(request)
+        job.total = await submissions_collection.count_documents(query)
+        job.total += await submission_archive.count(query, *_archive_range(query, job))
+        await rejudge_jobs_collection.insert_one(job.dict())
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[RejudgeJob]:
+        doc = await rejudge_jobs_collection.find_one({"id": job_id})
+        return RejudgeJob(**doc) if doc else None
+
+    async def _start(self, job: RejudgeJob):
+        # The one write that may replace CANCELLED, since a cancelled job can be resumed
+        job.status, job.error, job.updated_at = RejudgeStatusEnum.RUNNING, None, datetime.utcnow()
+        await rejudge_jobs_collection.update_one({"id": job.id}, {"$set": {
+            "status": job.status, "error": job.error, "updated_at": job.updated_at
+        }})
+
+    async def _save(self, job: RejudgeJob, **fields) -> bool:
+        """Write the job's progress, and its status when one is given.
+
+        A cancel may land at any time, so a status never replaces CANCELLED;
+        returns False when the job turned out to be cancelled.
+        """
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated_at = datetime.utcnow()
+        query = {"id": job.id}
+        update = {
+            "processed": job.processed,
+            "changed": job.changed,
+            "checkpoint_submitted_at": job.checkpoint_submitted_at,
+            "checkpoint_id": job.checkpoint_id,
+            "error": job.error,
+            "updated_at": job.updated_at
+        }
+        if "status" in fields:
+            query["status"] = {"$ne": RejudgeStatusEnum.CANCELLED}
+            update["status"] = job.status
+        updated = await rejudge_jobs_collection.update_one(query, {"$set": update})
+        if updated.matched_count == 0 and "status" in fields:
+            job.status = RejudgeStatusEnum.CANCELLED
+            return False
+        return True
+
+    async def cancel(self, job_id: str) -> bool:
+        updated = await rejudge_jobs_collection.update_one(
+            {"id": job_id, "status": {"$in": [RejudgeStatusEnum.PENDING, RejudgeStatusEnum.RUNNING]}},
+            {"$set": {"status": RejudgeStatusEnum.CANCELLED, "updated_at": datetime.utcnow()}}
+        )
+        return updated.modified_count == 1
+
+    @staticmethod
+    async def _problem(problems: Dict, problem_id: str) -> Optional[Tuple[List, Optional[Comparator], Optional[str]]]:
+        if problem_id not in problems:
+            problem = await get_problem_by_id(problem_id)
+            if problem is None:
+                problems[problem_id] = None
+            else:
+                try:
+                    comparator, error = Comparator.for_problem(problem), None
+                except UnknownCheckerError as e:
+                    comparator, error = None, f"Judge error: {e}"
+                problems[problem_id] = (await get_problem_test_cases(problem), comparator, error)
+        return problems[problem_id]
+
+    async def _yield_to_live(self):
+        while self.live_executor is not None and self.live_executor.queued > 0:
+            await asyncio.sleep(0.05)
+
+    async def _judge(self, problems: Dict, doc: Dict, code: Optional[str]) -> Optional[CodeRunResponse]:
+        problem = await self._problem(problems, doc["problem_id"])
+        if problem is None or code is None:
+            return None
+        test_cases, comparator, error = problem
+        if error is not None:
+            return judge_error(error)
+        async with self._slots:
+            await self._yield_to_live()
+            return await self.executor.execute_code(code, LanguageEnum(doc["language"]), test_cases, comparator)
+
+    async def _batch(self, query: Dict, job: RejudgeJob) -> List[Dict]:
+        """The next batch after the checkpoint, from the hot tier and the archive"""
+        order = [("submitted_at", 1), ("id", 1)]
+        start, end = _archive_range(query, job)
+        query = _after_checkpoint(query, job)
+        cursor = submissions_collection.find(query, REJUDGE_PROJECTION)
+        docs = await cursor.sort(order).limit(self.batch_size).to_list(None)
+        archived = await submission_archive.find(
+            query, REJUDGE_PROJECTION, start, end, sort=order, limit=self.batch_size
+        )
+        for doc in archived:
+            doc["archived"] = True
+        # A batch the archiver copied but hasn't deleted yet is in both tiers; the hot copy is about to go
+        by_id = {doc["id"]: doc for doc in docs}
+        by_id.update((doc["id"], doc) for doc in archived)
+        return sorted(by_id.values(), key=lambda doc: (doc["submitted_at"], doc["id"]))[:self.batch_size]
+
+    async def _apply(self, docs: List[Dict], results: List[Optional[CodeRunResponse]]) -> int:
+        """Write changed verdicts in one bulk write per tier; returns how many changed"""
+        from pymongo import UpdateOne
+        updates = []
+        # archive month -> (updates, docs)
+        archived: Dict[str, Tuple[List, List[Dict]]] = defaultdict(lambda: ([], []))
+        histograms: Dict[str, Counter] = defaultdict(Counter)
+        activity = []
+        affected_users: Set[str] = set()
+        now = datetime.utcnow()
+        for doc, result in zip(docs, results):
+            if result is None:
+                continue
+            status = determine_status(result)
+            passed = len([r for r in result.test_results if r.passed])
+            update = UpdateOne({"id": doc["id"]}, {"$set": {
+                "status": status,
+                "test_cases_passed": passed,
+                "total_test_cases": len(result.test_results),
+                "runtime": result.runtime,
+                "memory": None,
+                "error_message": result.error,
+                "rejudged_at": now
+            }})
+            if doc.get("archived"):
+                month_updates, month_docs = archived[archive_month(doc["submitted_at"])]
+                month_updates.append(update)
+                month_docs.append(doc)
+            else:
+                updates.append(update)
+            was_accepted = doc["status"] == StatusEnum.ACCEPTED
+            # Move the submission's runtime/memory out of, or into, the "beats X%" histograms
+            histogram = histograms[histogram_id(doc["problem_id"], doc["language"])]
+            if was_accepted:
+                histogram.update(histogram_increments(doc.get("runtime"), doc.get("memory"), -1))
+            if status == StatusEnum.ACCEPTED:
+                histogram.update(histogram_increments(result.runtime, None))
+            if was_accepted != (status == StatusEnum.ACCEPTED):
+                affected_users.add(doc["user_id"])
+                problem_counters.incr(doc["problem_id"], accepts=1 if not was_accepted else -1)
+                # A lost accept stays in the day's solved list; activity.py's backfill rebuilds it exactly
+                day_update = {"$inc": {"accepts": -1 if was_accepted else 1}}
+                if not was_accepted:
+                    day_update["$addToSet"] = {"solved": doc["problem_id"]}
+                activity.append(UpdateOne(
+                    {"_id": activity_id(doc["user_id"], doc["submitted_at"].date())}, day_update
+                ))
+            if status != doc["status"]:
+                doc["changed"] = True
+        if updates:
+            await submissions_collection.bulk_write(updates, ordered=False)
+        for month, (month_updates, month_docs) in archived.items():
+            collection = submission_archive.collection(month)
+            await collection.bulk_write(month_updates, ordered=False)
+            # Solved counts read the month's summaries, not the archive itself
+            await _summarize(collection, submission_summaries_collection, month, month_docs)
+        histogram_updates = [
+            UpdateOne({"_id": key}, {"$inc": {field: delta for field, delta in deltas.items() if delta}}, upsert=True)
+            for key, deltas in histograms.items() if any(deltas.values())
+        ]
+        if histogram_updates:
+            await runtime_histograms_collection.bulk_write(histogram_updates, ordered=False)
+        if activity:
+            await activity_collection.bulk_write(activity, ordered=False)
+        await recompute_user_stats(affected_users)
+        return sum(1 for doc in docs if doc.get("changed"))
+
+    async def run(self, job: RejudgeJob) -> RejudgeJob:
+        # problem id -> (test cases, comparator, or the error judging it fails with), resolved once per run;
+        # kept per run since one Rejudger may run several jobs at once
+        problems: Dict[str, Optional[Tuple[List, Optional[Comparator], Optional[str]]]] = {}
+        query = await selection_query(job.request)
+        await self._start(job)
+        try:
+            while True:
+                current = await self.get_job(job.id)
+                if current is None or current.status == RejudgeStatusEnum.CANCELLED:
+                    job.status = RejudgeStatusEnum.CANCELLED
+                    return job
+
+                docs = await self._batch(query, job)
+                if not docs:
+                    await self._save(job, status=RejudgeStatusEnum.COMPLETED)
+                    return job
+
+                codes = await code_store.get_many(doc["code_hash"] for doc in docs if doc.get("code_hash"))
+                results = await asyncio.gather(*(
+                    self._judge(problems, doc, doc.get("code") or codes.get(doc.get("code_hash"))) for doc in docs
+                ))
+                changed = await self._apply(docs, results)
+                last = docs[-1]
+                await self._save(
+                    job,
+                    processed=job.processed + len(docs),
+                    changed=job.changed + changed,
+                    checkpoint_submitted_at=last["submitted_at"],
+                    checkpoint_id=last["id"]
+                )
+                logger.info("Rejudge %s: %d/%d processed, %d changed", job.id, job.processed, job.total, job.changed)
+        except Exception as e:
+            logger.exception("Rejudge %s failed", job.id)
+            await self._save(job, status=RejudgeStatusEnum.FAILED, error=str(e))
+            return job
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rejudge earlier submissions against current test cases")
+    parser.add_argument("--problem-id")
+    parser.add_argument("--contest-id")
+    parser.add_argument("--after", type=datetime.fromisoformat, help="only submissions made at or after this time")
+    parser.add_argument("--before", type=datetime.fromisoformat, help="only submissions made before this time")
+    parser.add_argument("--resume", metavar="JOB_ID", help="continue an interrupted or failed job")
+    parser.add_argument("--concurrency", type=int, default=REJUDGE_CONCURRENCY)
+    return parser.parse_args()
+
+
+async def main(args):
+    rejudger = Rejudger(CodeExecutor(args.concurrency, niceness=REJUDGE_NICENESS))
+    if args.resume:
+        job = await rejudger.get_job(args.resume)
+        if job is None:
+            raise SystemExit(f"No rejudge job {args.resume}")
+    else:
+        request = RejudgeRequest(
+            problem_id=args.problem_id,
+            contest_id=args.contest_id,
+            submitted_after=args.after,
+            submitted_before=args.before
+        )
+        if not any(request.dict().values()):
+            raise SystemExit("Select submissions with --problem-id, --contest-id, --after or --before")
+        job = await rejudger.create_job(request, created_by="cli")
+        print(f"Rejudge job {job.id}: {job.total} submissions")
+    try:
+        job = await rejudger.run(job)
+    finally:
+        await problem_counters.stop()
+    print(f"Rejudge job {job.id} {job.status.value}: {job.processed} processed, {job.changed} verdicts changed")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,63 @@
+import re
+from typing import Dict, Optional
+
+# Fixed-width buckets; values past the last bucket share it. The executor
+# times out at 5 s and limits memory to 128 MB, so these cover every verdict.
+RUNTIME_BUCKET_MS = 10
+RUNTIME_BUCKETS = 500
+MEMORY_BUCKET_MB = 0.5
+MEMORY_BUCKETS = 256
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def parse_quantity(text: Optional[str]) -> Optional[float]:
+    """Number from a display value such as "120ms" or "42.1 MB" """
+    match = _NUMBER_RE.search(text or "")
+    return float(match.group()) if match else None
+
+
+def runtime_bucket(runtime: Optional[str]) -> Optional[int]:
+    value = parse_quantity(runtime)
+    return None if value is None else min(int(value // RUNTIME_BUCKET_MS), RUNTIME_BUCKETS - 1)
+
+
+def memory_bucket(memory: Optional[str]) -> Optional[int]:
+    value = parse_quantity(memory)
+    return None if value is None else min(int(value // MEMORY_BUCKET_MB), MEMORY_BUCKETS - 1)
+
+
+def histogram_id(problem_id: str, language) -> str:
+    # Accepts LanguageEnum members as well as the plain strings read back from Mongo
+    return f"{problem_id}:{getattr(language, 'value', language)}"
+
+
+def histogram_increments(runtime: Optional[str], memory: Optional[str], delta: int = 1) -> Dict[str, int]:
+    """$inc fields adding (or with delta=-1, removing) one accepted submission"""
+    increments = {}
+    bucket = runtime_bucket(runtime)
+    if bucket is not None:
+        increments[f"runtime.{bucket}"] = delta
+        increments["runtime_total"] = delta
+    bucket = memory_bucket(memory)
+    if bucket is not None:
+        increments[f"memory.{bucket}"] = delta
+        increments["memory_total"] = delta
+    return increments
+
+
+def beats(histogram: Dict, field: str, bucket: Optional[int]) -> Optional[float]:
+    """Percentage of the other accepted submissions a submission in `bucket` beats.
+
+    The submission itself must already be counted. Submissions in the same
+    bucket count as half beaten, since the buckets can't order them.
+    """
+    total = histogram.get(f"{field}_total", 0)
+    if bucket is None or total <= 0:
+        return None
+    if total == 1:
+        return 100.0
+    counts = histogram.get(field, {})
+    above = sum(count for key, count in counts.items() if int(key) > bucket)
+    same = max(counts.get(str(bucket), 0) - 1, 0)
+    return round(100 * (above + same / 2) / (total - 1), 1)
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+# Rebuild from the database this often, picking up problems added through other replicas
+SEARCH_INDEX_TTL = float(os.environ.get('SEARCH_INDEX_TTL', 300))
+
+# Matches in short, curated fields count for more than matches in the description
+FIELD_WEIGHTS = {"title": 5.0, "tags": 3.0, "companies": 3.0, "category": 2.0, "description": 1.0}
+
+# Stored row fields; everything else in a loaded document is only indexed
+ROW_FIELDS = ("id", "title", "difficulty", "category", "tags", "acceptance_rate", "likes")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class ProblemSearchIndex:
+    """In-process inverted index over the problem catalog with facet counts.
+
+    The catalog is small enough to hold in memory, and a dict of postings
+    answers text queries and facets in one pass without touching Mongo.
+    """
+
+    def __init__(self, load: Callable[[], Awaitable[Iterable[Dict]]], ttl: float = SEARCH_INDEX_TTL):
+        self._load = load
+        self.ttl = ttl
+        self._rows: Dict[str, Dict] = {}
+        self._companies: Dict[str, List[str]] = {}
+        # token -> problem id -> weight
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._tokens: List[str] = []
+        self._tokens_dirty = False
+        self._built_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def ensure_fresh(self):
+        if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+            return
+        async with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+                return
+            await self.rebuild()
+
+    async def rebuild(self):
+        docs = await self._load()
+        self._rows = {}
+        self._companies = {}
+        self._postings = defaultdict(dict)
+        for doc in docs:
+            self._index(doc)
+        self._tokens_dirty = True
+        self._built_at = time.monotonic()
+
+    def add(self, doc: Dict):
+        """Index a new or changed problem without waiting for the next rebuild"""
+        if self._built_at is None:
+            return
+        self.remove(doc["id"])
+        self._index(doc)
+        self._tokens_dirty = True
+
+    def remove(self, problem_id: str):
+        if self._rows.pop(problem_id, None) is None:
+            return
+        self._companies.pop(problem_id, None)
+        for postings in self._postings.values():
+            postings.pop(problem_id, None)
+
+    def update_row(self, problem_id: str, fields: Dict):
+        """Patch stored row values (likes, acceptance rate) that aren't indexed"""
+        row = self._rows.get(problem_id)
+        if row is not None:
+            row.update({k: v for k, v in fields.items() if k in ROW_FIELDS})
+
+    def _index(self, doc: Dict):
+        problem_id = doc["id"]
+        self._rows[problem_id] = {field: doc.get(field) for field in ROW_FIELDS}
+        self._companies[problem_id] = list(doc.get("companies", []))
+        for field, weight in FIELD_WEIGHTS.items():
+            value = doc.get(field) or ""
+            text = " ".join(value) if isinstance(value, list) else str(value)
+            for token in tokenize(text):
+                postings = self._postings[token]
+                postings[problem_id] = postings.get(problem_id, 0.0) + weight
+
+    def _expand(self, term: str, prefix: bool) -> Dict[str, float]:
+        if not prefix:
+            return self._postings.get(term, {})
+        if self._tokens_dirty:
+            self._tokens = sorted(token for token, postings in self._postings.items() if postings)
+            self._tokens_dirty = False
+        scores: Dict[str, float] = {}
+        i = bisect_left(self._tokens, term)
+        while i < len(self._tokens) and self._tokens[i].startswith(term):
+            for problem_id, weight in self._postings[self._tokens[i]].items():
+                scores[problem_id] = max(scores.get(problem_id, 0.0), weight)
+            i += 1
+        return scores
+
+    def _match(self, query: str) -> Optional[Dict[str, float]]:
+        """Ids matching every query term with their scores; None for an empty query"""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        scores: Optional[Dict[str, float]] = None
+        for i, term in enumerate(terms):
+            # The last term is treated as a prefix so results follow the user's typing
+            matches = self._expand(term, prefix=i == len(terms) - 1)
+            if scores is None:
+                scores = dict(matches)
+            else:
+                scores = {pid: score + matches[pid] for pid, score in scores.items() if pid in matches}
+            if not scores:
+                break
+        return scores
+
+    def search(
+        self,
+        query: str = "",
+        difficulty: Optional[Set[str]] = None,
+        category: Optional[Set[str]] = None,
+        tags: Optional[Set[str]] = None,
+        companies: Optional[Set[str]] = None,
+        status: Optional[str] = None,
+        solved: Set[str] = frozenset(),
+        attempted: Set[str] = frozenset(),
+        skip: int = 0,
+        limit: int = 50
+    ) -> Dict:
+        """Ranked, paginated rows plus facet counts for the same query.
+
+        Each facet is counted with every filter applied except its own, so the
+        UI can show how many problems picking another value would give.
+        """
+        scores = self._match(query)
+        candidates = self._rows.keys() if scores is None else scores.keys()
+
+        filters = {
+            "difficulty": (difficulty, lambda pid: {self._rows[pid]["difficulty"]}),
+            "category": (category, lambda pid: {self._rows[pid]["category"]}),
+            "tags": (tags, lambda pid: set(self._rows[pid]["tags"])),
+            "companies": (companies, lambda pid: set(self._companies[pid])),
+        }
+        active = {name: (wanted, values) for name, (wanted, values) in filters.items() if wanted}
+
+        facets: Dict[str, Dict[str, int]] = {name: defaultdict(int) for name in filters}
+        results = []
+        for pid in candidates:
+            if status and _status_of(pid, solved, attempted) != status:
+                continue
+            failed = [name for name, (wanted, values) in active.items() if not values(pid) & wanted]
+            if len(failed) > 1:
+                continue
+            for name, (_, values) in filters.items():
+                if not failed or failed == [name]:
+                    for value in values(pid):
+                        facets[name][value] += 1
+            if not failed:
+                results.append(pid)
+
+        if scores is not None:
+            results.sort(key=lambda pid: (-scores[pid], self._rows[pid]["title"]))
+
+        rows = []
+        for pid in results[skip:skip + limit]:
+            row = dict(self._rows[pid])
+            row["solved"] = pid in solved
+            row["attempted"] = pid in attempted
+            rows.append(row)
+        return {
+            "total": len(results),
+            "results": rows,
+            "facets": {name: dict(counts) for name, counts in facets.items()}
+        }
+
+
+def _status_of(problem_id: str, solved: Set[str], attempted: Set[str]) -> str:
+    if problem_id in solved:
+        return "solved"
+    if problem_id in attempted:
+        return "attempted"
+    return "todo"
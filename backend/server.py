@@ -1,23 +1,114 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
-from fastapi.security import HTTPAuthorizationCredentials
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from pydantic import BaseModel
 from starlette.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from pathlib import Path
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
+import importlib
 import logging
+import math
+import os
 
-# Import our modules
-from models import *
-from auth import *
-from database import *
-from code_executor import code_executor
-
+# Load .env before our modules read their settings at import
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Import our modules
+from models import (
+    CodeRunRequest, CodeRunResponse, CompareModeEnum, Contest, ContestCreate, ContestDetail, ContestResponse,
+    JudgeJob, JudgeJobKind, JudgeResult, JudgeStatus, LeaderboardEntry, Problem, ProblemCreate,
+    ProblemDetail, ProblemReaction, ProblemReactionRequest, ProblemReference, ProblemSearchResponse, ProblemSummary,
+    RateLimitUsage, ReferenceBuildJob, RejudgeJob, RejudgeRequest, RejudgeStatusEnum, StatusEnum,
+    SubmissionCode, SubmissionCreate, SubmissionResponse, Token, UserCreate, UserLogin, UserProgress,
+    UserRank, UserResponse
+)
+from auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, get_current_admin_id, get_current_user_id,
+    get_current_user_id_optional, get_password_hash, get_pwd_context, verify_password
+)
+from database import (
+    catalog_problems_collection, close_client, create_contest, create_problem, create_submission,
+    create_user, get_contest_by_id, get_contest_view, get_contests, get_current_streak, get_db, get_leaderboard,
+    get_problem_by_id, get_problems_by_ids, get_problems_summary, get_submission_code,
+    get_submission_percentiles, get_user_by_id, get_user_by_username, get_user_progress, get_user_rank,
+    get_user_submissions, is_submission_owner, problem_counters, register_contest_participant,
+    search_problems, set_problem_reaction, set_problem_reference
+)
+from comparator import CHECKERS
+from code_executor import get_code_executor, sweep_orphaned_workspaces
+from judge import finalize_submission, process_job
+from judge_queue import InMemoryBroker, MongoBroker, create_broker
+from metrics import get_trace, render_metrics, stage, trace
+from rate_limit import RateLimited, RateLimiter, create_bucket_store
+from reference_runner import create_build_job, get_build_job, run_build_job
+from rejudge import Rejudger
+from profiling import PROFILING_ENABLED, SlowRequestProfilingMiddleware, slow_request_profiler
+
+# JUDGE_BROKER=local judges inside this process; mongo/redis hand jobs to judge_worker.py
+judge_broker = create_broker()
+JUDGE_RESULT_TIMEOUT = float(os.environ.get('JUDGE_RESULT_TIMEOUT', 120))
+
+# Ids accepted per GET /problems/batch
+MAX_BATCH_PROBLEMS = 50
+
+# Only trust X-Forwarded-For when the API sits behind a proxy that sets it
+TRUST_FORWARDED_FOR = os.environ.get('TRUST_FORWARDED_FOR', '').lower() in ('1', 'true', 'yes')
+
+rate_limiter = RateLimiter(create_bucket_store(), get_contest_by_id)
+
+# Created on first use so the API doesn't hold a second executor it never rejudges with
+_rejudger: Optional[Rejudger] = None
+rejudge_tasks = {}
+build_tasks = {}
+
+def get_rejudger() -> Rejudger:
+    global _rejudger
+    if _rejudger is None:
+        _rejudger = Rejudger(live_executor=get_code_executor())
+    return _rejudger
+
+async def warm_up():
+    """Load the Mongo driver and bcrypt off the event loop once the server is already answering"""
+    await asyncio.to_thread(importlib.import_module, "motor.motor_asyncio")
+    get_db()
+    await asyncio.to_thread(get_pwd_context)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy resources are created here or on first use, never at import
+    warm_up_task = asyncio.create_task(warm_up())
+    code_executor = get_code_executor()
+    removed = sweep_orphaned_workspaces()
+    if removed:
+        logger.info("Removed %d orphaned judge workspaces", removed)
+    problem_counters.start()
+    workers = []
+    if isinstance(judge_broker, MongoBroker):
+        await judge_broker.ensure_indexes()
+    elif isinstance(judge_broker, InMemoryBroker):
+        from judge_worker import JudgeWorker
+        worker = JudgeWorker(judge_broker, code_executor)
+        workers.append(asyncio.create_task(worker.run(code_executor.max_concurrency)))
+    yield
+    warm_up_task.cancel()
+    for task in [*workers, *rejudge_tasks.values(), *build_tasks.values()]:
+        task.cancel()
+    if judge_broker is not None:
+        await judge_broker.close()
+    await problem_counters.stop()
+    close_client()
+
 # Create the main app
-app = FastAPI(title="LeetCode Clone API", version="1.0.0")
+app = FastAPI(
+    title="LeetCode Clone API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -26,6 +117,35 @@ api_router = APIRouter(prefix="/api")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def model_response(model: BaseModel) -> ORJSONResponse:
+    """Serialize an already-validated model without FastAPI re-validating it against response_model"""
+    return ORJSONResponse(model.dict())
+
+def client_ip(request: Request) -> Optional[str]:
+    forwarded = request.headers.get("x-forwarded-for") if TRUST_FORWARDED_FOR else None
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+async def enforce_rate_limit(
+    endpoint: str, user_id: str, request: Request, contest_id: Optional[str], problem_id: str
+):
+    try:
+        await rate_limiter.check(endpoint, user_id, client_ip(request), contest_id, problem_id)
+    except RateLimited as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"{e}; retry in {e.retry_after:.1f}s",
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+
+async def dispatch_job(job: JudgeJob, problem: Problem) -> Optional[JudgeResult]:
+    """Judge in-process, or through the broker; None if no worker finished in time"""
+    if judge_broker is None:
+        return await process_job(job, get_code_executor(), problem)
+    await judge_broker.enqueue(job)
+    return await judge_broker.wait_result(job.id, JUDGE_RESULT_TIMEOUT)
+
 # Authentication endpoints
 @api_router.post("/auth/register", response_model=UserResponse)
 async def register(user_data: UserCreate):
@@ -76,10 +196,28 @@ async def get_current_user_info(current_user_id: str = Depends(get_current_user_
         id=user.id,
         username=user.username,
         email=user.email,
-        profile=user.profile,
+        profile=user.profile.copy(update={"streak": await get_current_streak(user.id)}),
         created_at=user.created_at
     )
 
+@api_router.get("/user/progress", response_model=UserProgress)
+async def get_progress(
+    days: int = Query(365, ge=1, le=730),
+    current_user_id: str = Depends(get_current_user_id)
+):
+    return ORJSONResponse(await get_user_progress(current_user_id, days))
+
+@api_router.get("/user/rank", response_model=UserRank)
+async def get_rank(current_user_id: str = Depends(get_current_user_id)):
+    rank = await get_user_rank(current_user_id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return ORJSONResponse(rank)
+
+@api_router.get("/leaderboard", response_model=List[LeaderboardEntry])
+async def get_global_leaderboard(skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=200)):
+    return ORJSONResponse(await get_leaderboard(skip, limit))
+
 # Problem endpoints
 @api_router.get("/problems", response_model=List[ProblemSummary])
 async def get_problems_list(
@@ -89,87 +227,153 @@ async def get_problems_list(
     category: Optional[str] = None,
     current_user_id: Optional[str] = Depends(get_current_user_id_optional)
 ):
-    return await get_problems_summary(current_user_id)
+    # Rows come straight from a projected query; skip per-row model validation
+    return ORJSONResponse(await get_problems_summary(current_user_id))
+
+# Registered before /problems/{problem_id} so "search" and "batch" aren't taken for ids
+@api_router.get("/problems/search", response_model=ProblemSearchResponse)
+async def search_problem_catalog(
+    q: str = "",
+    difficulty: Optional[List[str]] = Query(None),
+    category: Optional[List[str]] = Query(None),
+    tags: Optional[List[str]] = Query(None),
+    companies: Optional[List[str]] = Query(None),
+    status: Optional[str] = Query(None, pattern="^(solved|attempted|todo)$"),
+    skip: int = 0,
+    limit: int = Query(50, le=200),
+    current_user_id: Optional[str] = Depends(get_current_user_id_optional)
+):
+    return ORJSONResponse(await search_problems(
+        current_user_id,
+        status,
+        query=q,
+        difficulty=set(difficulty or ()),
+        category=set(category or ()),
+        tags=set(tags or ()),
+        companies=set(companies or ()),
+        skip=skip,
+        limit=limit
+    ))
+
+@api_router.get("/problems/batch", response_model=List[ProblemDetail])
+async def get_problems_batch(ids: str = Query(..., description="comma-separated problem ids")):
+    """Page details for several problems in one request and one query; unknown ids are left out"""
+    problem_ids = list(dict.fromkeys(problem_id for problem_id in ids.split(",") if problem_id))
+    if len(problem_ids) > MAX_BATCH_PROBLEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PROBLEMS} problems per request")
+    return ORJSONResponse([problem.dict() for problem in await get_problems_by_ids(problem_ids)])
 
 @api_router.get("/problems/{problem_id}", response_model=Problem)
 async def get_problem_detail(problem_id: str):
     problem = await get_problem_by_id(problem_id)
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
-    return problem
+    return model_response(problem)
 
 @api_router.post("/problems", response_model=Problem)
 async def create_new_problem(
     problem_data: ProblemCreate,
     current_user_id: str = Depends(get_current_user_id)
 ):
-    return await create_problem(problem_data)
+    if problem_data.compare_mode == CompareModeEnum.CUSTOM and problem_data.checker not in CHECKERS:
+        raise HTTPException(status_code=400, detail=f"Unknown checker: {problem_data.checker}")
+    return model_response(await create_problem(problem_data))
+
+@api_router.post("/problems/{problem_id}/reaction", response_model=ProblemReaction)
+async def react_to_problem(
+    problem_id: str,
+    reaction_request: ProblemReactionRequest,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    if not await catalog_problems_collection.find_one({"id": problem_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Problem not found")
+    return model_response(await set_problem_reaction(current_user_id, problem_id, reaction_request.reaction))
 
 # Code execution endpoints
 @api_router.post("/problems/{problem_id}/run", response_model=CodeRunResponse)
 async def run_code(
     problem_id: str,
     run_request: CodeRunRequest,
+    request: Request,
     current_user_id: str = Depends(get_current_user_id)
 ):
-    problem = await get_problem_by_id(problem_id)
+    await enforce_rate_limit("run", current_user_id, request, run_request.contest_id, problem_id)
+    with stage("problem_fetch"):
+        problem = await get_problem_by_id(problem_id)
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
     
-    # Use first few test cases for running
-    test_cases = [(tc.input, tc.expected) for tc in problem.test_cases[:3]]
-    result = await code_executor.execute_code(
-        run_request.code,
-        run_request.language,
-        test_cases
+    job = JudgeJob(
+        kind=JudgeJobKind.RUN,
+        problem_id=problem_id,
+        user_id=current_user_id,
+        code=run_request.code,
+        language=run_request.language
     )
-    return result
+    judged = await dispatch_job(job, problem)
+    if judged is None:
+        raise HTTPException(status_code=504, detail="Judge timed out")
+    return model_response(judged.result)
 
 @api_router.post("/problems/{problem_id}/submit", response_model=SubmissionResponse)
 async def submit_solution(
     problem_id: str,
     submission_data: SubmissionCreate,
+    request: Request,
     current_user_id: str = Depends(get_current_user_id)
 ):
-    problem = await get_problem_by_id(problem_id)
-    if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
-    
-    # Create submission record
-    submission = await create_submission(submission_data, current_user_id)
-    
-    # Execute code against all test cases
-    test_cases = [(tc.input, tc.expected) for tc in problem.test_cases]
-    result = await code_executor.execute_code(
-        submission_data.code,
-        submission_data.language,
-        test_cases
-    )
+    await enforce_rate_limit("submit", current_user_id, request, submission_data.contest_id, problem_id)
+    with trace(problem_id) as submission_trace:
+        with stage("problem_fetch"):
+            problem = await get_problem_by_id(problem_id)
+        if not problem:
+            raise HTTPException(status_code=404, detail="Problem not found")
+        
+        # Create submission record
+        with stage("db_write"):
+            submission = await create_submission(submission_data, current_user_id)
+        if submission_trace:
+            submission_trace.trace_id = submission.id
+        
+        # Execute code against all test cases
+        job = JudgeJob(
+            kind=JudgeJobKind.SUBMIT,
+            problem_id=problem_id,
+            user_id=current_user_id,
+            code=submission_data.code,
+            language=submission_data.language,
+            submission_id=submission.id
+        )
+        judged = await dispatch_job(job, problem)
     
-    # Determine submission status
-    if result.success:
-        submission_status = StatusEnum.ACCEPTED
-    elif result.error:
-        submission_status = StatusEnum.RUNTIME_ERROR
-    else:
-        submission_status = StatusEnum.WRONG_ANSWER
+    if judged is None:
+        # Still queued or judging; the verdict is written when a worker finishes
+        return model_response(SubmissionResponse(
+            id=submission.id,
+            problem_id=submission.problem_id,
+            problem_title=problem.title,
+            code=submission.code,
+            language=submission.language,
+            status=StatusEnum.PENDING,
+            test_cases_passed=0,
+            total_test_cases=0,
+            submitted_at=submission.submitted_at
+        ))
     
-    # Update submission with results
-    await update_submission_status(
-        submission.id,
-        submission_status,
-        len([r for r in result.test_results if r.passed]),
-        len(result.test_results),
-        result.runtime,
-        "42.1 MB",  # Mock memory usage
-        result.error
-    )
+    result = judged.result
+    submission_status = judged.status
+    if submission_status is None:
+        # The broker gave up on the job before any worker recorded a verdict
+        submission_status = await finalize_submission(job, result)
     
-    # Update user statistics if accepted
+    runtime_percentile = None
     if submission_status == StatusEnum.ACCEPTED:
-        await update_user_stats(current_user_id)
+        # Memory isn't measured yet, so it gets no percentile
+        runtime_percentile, _ = await get_submission_percentiles(
+            submission.problem_id, submission.language, result.runtime, None
+        )
     
-    return SubmissionResponse(
+    return model_response(SubmissionResponse(
         id=submission.id,
         problem_id=submission.problem_id,
         problem_title=problem.title,
@@ -177,49 +381,48 @@ async def submit_solution(
         language=submission.language,
         status=submission_status,
         runtime=result.runtime,
-        memory="42.1 MB",
+        memory=None,
+        runtime_percentile=runtime_percentile,
         test_cases_passed=len([r for r in result.test_results if r.passed]),
         total_test_cases=len(result.test_results),
         error_message=result.error,
         submitted_at=submission.submitted_at
-    )
+    ))
 
 @api_router.get("/submissions", response_model=List[SubmissionResponse])
-async def get_user_submissions(
+async def get_user_submissions_list(
     current_user_id: str = Depends(get_current_user_id),
-    limit: int = 50
+    limit: int = 50,
+    include_code: bool = False
+):
+    return ORJSONResponse(await get_user_submissions(current_user_id, limit, include_code))
+
+@api_router.get("/submissions/{submission_id}/code", response_model=SubmissionCode)
+async def get_submission_source(
+    submission_id: str,
+    current_user_id: str = Depends(get_current_user_id)
 ):
-    return await get_user_submissions(current_user_id, limit)
+    submission_code = await get_submission_code(submission_id, current_user_id)
+    if not submission_code:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    return submission_code
 
 # Contest endpoints
+def contest_status(contest: dict) -> str:
+    now = datetime.utcnow()
+    if now < contest["start_time"]:
+        return "upcoming"
+    if now < contest["start_time"] + timedelta(minutes=contest["duration_minutes"]):
+        return "ongoing"
+    return "completed"
+
 @api_router.get("/contests", response_model=List[ContestResponse])
-async def get_contests_list():
-    contests = await get_contests()
-    contest_responses = []
-    
+async def get_contests_list(current_user_id: Optional[str] = Depends(get_current_user_id_optional)):
+    contests = await get_contests(current_user_id)
     for contest in contests:
-        # Determine contest status
-        now = datetime.utcnow()
-        if now < contest.start_time:
-            contest_status = "upcoming"
-        elif now < contest.start_time + timedelta(minutes=contest.duration_minutes):
-            contest_status = "ongoing"
-        else:
-            contest_status = "completed"
-        
-        contest_responses.append(ContestResponse(
-            id=contest.id,
-            title=contest.title,
-            description=contest.description,
-            start_time=contest.start_time,
-            duration_minutes=contest.duration_minutes,
-            participants_count=len(contest.participants),
-            prizes=contest.prizes,
-            difficulty=contest.difficulty,
-            status=contest_status
-        ))
-    
-    return contest_responses
+        contest["status"] = contest_status(contest)
+        del contest["problem_ids"]
+    return ORJSONResponse(contests)
 
 @api_router.post("/contests", response_model=Contest)
 async def create_new_contest(
@@ -228,18 +431,155 @@ async def create_new_contest(
 ):
     return await create_contest(contest_data)
 
+@api_router.get("/contests/{contest_id}", response_model=ContestDetail)
+async def get_contest_detail(
+    contest_id: str,
+    current_user_id: Optional[str] = Depends(get_current_user_id_optional)
+):
+    contest = await get_contest_view(contest_id, current_user_id)
+    if contest is None:
+        raise HTTPException(status_code=404, detail="Contest not found")
+    contest["status"] = contest_status(contest)
+    return ORJSONResponse(contest)
+
 @api_router.post("/contests/{contest_id}/register")
 async def register_for_contest(
     contest_id: str,
     current_user_id: str = Depends(get_current_user_id)
 ):
-    contest = await get_contest_by_id(contest_id)
-    if not contest:
+    added = await register_contest_participant(contest_id, current_user_id)
+    if added is None:
         raise HTTPException(status_code=404, detail="Contest not found")
-    
-    # Add user to participants (simplified)
+    if not added:
+        return {"message": "Already registered for contest"}
     return {"message": "Successfully registered for contest"}
 
+@api_router.get("/rate-limits/usage", response_model=List[RateLimitUsage])
+async def get_rate_limit_usage(
+    contest_id: Optional[str] = None,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    return await rate_limiter.usage(current_user_id, contest_id)
+
+# Judge load, polled by the load generator and dashboards
+@api_router.get("/judge/status", response_model=JudgeStatus)
+async def get_judge_status():
+    if judge_broker is not None and not isinstance(judge_broker, InMemoryBroker):
+        # Capacity lives on the worker hosts and isn't known here
+        queued, running = await judge_broker.stats()
+        return JudgeStatus(queued=queued, running=running, capacity=0)
+    code_executor = get_code_executor()
+    return JudgeStatus(
+        queued=code_executor.queued,
+        running=code_executor.running,
+        capacity=code_executor.max_concurrency
+    )
+
+@api_router.get("/traces/{submission_id}")
+async def get_submission_trace(
+    submission_id: str,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    submission_trace = get_trace(submission_id)
+    # Other users' traces are reported as missing rather than forbidden
+    if not submission_trace or not await is_submission_owner(submission_id, current_user_id):
+        raise HTTPException(status_code=404, detail="No trace recorded for this submission")
+    return submission_trace.to_dict()
+
+# Slow request profiles (see profiling.py)
+@api_router.get("/admin/profiles")
+async def list_slow_request_profiles(current_user_id: str = Depends(get_current_admin_id)):
+    return slow_request_profiler.list_profiles()
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_slow_request_profile(
+    profile_id: str,
+    current_user_id: str = Depends(get_current_admin_id)
+):
+    profile = slow_request_profiler.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+# Rejudges (see rejudge.py)
+def start_rejudge(job: RejudgeJob):
+    task = asyncio.create_task(get_rejudger().run(job))
+    rejudge_tasks[job.id] = task
+    task.add_done_callback(lambda _: rejudge_tasks.pop(job.id, None))
+
+@api_router.post("/admin/rejudge", response_model=RejudgeJob)
+async def create_rejudge(
+    rejudge_request: RejudgeRequest,
+    current_user_id: str = Depends(get_current_admin_id)
+):
+    if not any(rejudge_request.dict().values()):
+        raise HTTPException(status_code=400, detail="Select submissions by problem, contest or time range")
+    try:
+        job = await get_rejudger().create_job(rejudge_request, created_by=current_user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    start_rejudge(job)
+    return job
+
+@api_router.get("/admin/rejudge/{job_id}", response_model=RejudgeJob)
+async def get_rejudge(job_id: str, current_user_id: str = Depends(get_current_admin_id)):
+    job = await get_rejudger().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Rejudge job not found")
+    return job
+
+@api_router.post("/admin/rejudge/{job_id}/resume", response_model=RejudgeJob)
+async def resume_rejudge(job_id: str, current_user_id: str = Depends(get_current_admin_id)):
+    job = await get_rejudger().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Rejudge job not found")
+    if job_id in rejudge_tasks or job.status == RejudgeStatusEnum.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Rejudge job is {job.status.value}")
+    start_rejudge(job)
+    return job
+
+@api_router.post("/admin/rejudge/{job_id}/cancel")
+async def cancel_rejudge(job_id: str, current_user_id: str = Depends(get_current_admin_id)):
+    if not await get_rejudger().cancel(job_id):
+        raise HTTPException(status_code=409, detail="Rejudge job is not running")
+    return {"message": "Rejudge job cancelled; it stops after the current batch"}
+
+# Reference solutions (see reference_runner.py)
+@api_router.put("/admin/problems/{problem_id}/reference")
+async def put_problem_reference(
+    problem_id: str,
+    reference: ProblemReference,
+    current_user_id: str = Depends(get_current_admin_id)
+):
+    if not await get_problem_by_id(problem_id):
+        raise HTTPException(status_code=404, detail="Problem not found")
+    await set_problem_reference(problem_id, reference)
+    return {"message": "Reference saved; build the test cases to apply it"}
+
+@api_router.post("/admin/problems/{problem_id}/build-tests", response_model=ReferenceBuildJob)
+async def build_tests(
+    problem_id: str,
+    count: Optional[int] = Query(None, ge=1, le=100000),
+    dry_run: bool = False,
+    current_user_id: str = Depends(get_current_admin_id)
+):
+    try:
+        job = await create_build_job(problem_id, current_user_id, count, dry_run)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # Runs in the background on the rejudger's lower-priority sandboxes, within their concurrency cap
+    task = asyncio.create_task(run_build_job(job, get_rejudger().executor))
+    build_tasks[job.id] = task
+    task.add_done_callback(lambda _: build_tasks.pop(job.id, None))
+    return model_response(job)
+
+@api_router.get("/admin/problems/{problem_id}/build-tests/{job_id}", response_model=ReferenceBuildJob)
+async def get_build_tests(problem_id: str, job_id: str, current_user_id: str = Depends(get_current_admin_id)):
+    job = await get_build_job(job_id)
+    if not job or job.problem_id != problem_id:
+        raise HTTPException(status_code=404, detail="Build not found")
+    return model_response(job)
+
 # Health check
 @api_router.get("/")
 async def root():
@@ -248,6 +588,11 @@ async def root():
 # Include the router in the main app
 app.include_router(api_router)
 
+# Prometheus scrape target
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return render_metrics()
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -255,3 +600,6 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+if PROFILING_ENABLED:
+    app.add_middleware(SlowRequestProfilingMiddleware, profiler=slow_request_profiler)
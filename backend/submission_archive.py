@@ -0,0 +1,212 @@
+"""Hot/cold tiering for submissions.
+
+Submissions older than SUBMISSION_HOT_DAYS move out of `submissions` into
+one archive collection per month of submission, so the hot collection and
+its indexes stay small enough to live in RAM. Code already lives
+compressed in the code store; legacy inline code is moved there on the
+way out.
+
+Per-(user, problem, month) counts stay hot in submission_summaries, so
+solved/attempted status and profile stats don't read the archive. History
+and code lookups fall through to it when the hot tier runs out, and the
+plagiarism scan and rejudge read the months they select from:
+
+    python submission_archive.py --older-than-days 180
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from models import StatusEnum
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = "submissions_archive_"
+SUBMISSION_HOT_DAYS = int(os.environ.get('SUBMISSION_HOT_DAYS', 180))
+ARCHIVE_BATCH_SIZE = 1000
+# Seconds the list of archive collections is cached
+ARCHIVE_NAMES_TTL = 300
+
+
+def archive_month(submitted_at: datetime) -> str:
+    return submitted_at.strftime("%Y%m")
+
+
+def summary_id(user_id: str, problem_id: str, month: str) -> str:
+    return f"{user_id}:{problem_id}:{month}"
+
+
+class SubmissionArchive:
+    """Month-bucketed archive collections, newest first"""
+
+    def __init__(self, collection_factory: Callable, list_names: Callable):
+        self._collection = collection_factory
+        self._list_names = list_names
+        self._collections: Dict[str, object] = {}
+        self._names: Tuple[float, List[str]] = (0.0, [])
+
+    def collection(self, month: str):
+        if month not in self._collections:
+            self._collections[month] = self._collection(ARCHIVE_PREFIX + month)
+        return self._collections[month]
+
+    async def months(self, refresh: bool = False) -> List[str]:
+        expires, months = self._names
+        if refresh or time.monotonic() >= expires:
+            names = await self._list_names()
+            months = sorted((name[len(ARCHIVE_PREFIX):] for name in names if name.startswith(ARCHIVE_PREFIX)),
+                            reverse=True)
+            self._names = (time.monotonic() + ARCHIVE_NAMES_TTL, months)
+        return months
+
+    async def user_history(self, user_id: str, projection: Dict, limit: int) -> List[Dict]:
+        """A user's newest archived submissions, reading only as many months as needed"""
+        docs: List[Dict] = []
+        for month in await self.months():
+            if len(docs) >= limit:
+                break
+            cursor = self.collection(month).find({"user_id": user_id}, projection)
+            docs.extend(await cursor.sort("submitted_at", -1).limit(limit - len(docs)).to_list(None))
+        return docs
+
+    async def months_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        first = archive_month(start) if start else ""
+        last = archive_month(end) if end else "999999"
+        return [month for month in await self.months() if first <= month <= last]
+
+    async def find(self, query: Dict, projection: Optional[Dict] = None,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   sort: Optional[List] = None, limit: int = 0) -> List[Dict]:
+        """Archived submissions matching query, reading only the months from start through end.
+
+        sort and limit apply within each month; callers merging months sort the result again.
+        """
+        docs: List[Dict] = []
+        for month in await self.months_between(start, end):
+            cursor = self.collection(month).find(query, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            docs.extend(await cursor.limit(limit).to_list(None))
+        return docs
+
+    async def count(self, query: Dict, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        return sum([
+            await self.collection(month).count_documents(query) for month in await self.months_between(start, end)
+        ])
+
+    async def find_one(self, query: Dict, projection: Optional[Dict] = None) -> Optional[Dict]:
+        for month in await self.months():
+            doc = await self.collection(month).find_one(query, projection)
+            if doc:
+                return doc
+        return None
+
+
+async def _summarize(month_collection, summaries_collection, month: str, docs: List[Dict]):
+    """Recompute the month's counts for the (user, problem) pairs in docs; safe to repeat"""
+    from pymongo import ReplaceOne
+    pairs = {(doc["user_id"], doc["problem_id"]) for doc in docs}
+    counts = defaultdict(lambda: [0, 0])
+    cursor = month_collection.find(
+        {"user_id": {"$in": list({user for user, _ in pairs})},
+         "problem_id": {"$in": list({problem for _, problem in pairs})}},
+        {"_id": 0, "user_id": 1, "problem_id": 1, "status": 1}
+    )
+    async for doc in cursor:
+        pair = (doc["user_id"], doc["problem_id"])
+        if pair in pairs:
+            counts[pair][0] += 1
+            counts[pair][1] += doc["status"] == StatusEnum.ACCEPTED
+    await summaries_collection.bulk_write([
+        ReplaceOne({"_id": summary_id(user, problem, month)}, {
+            "user_id": user, "problem_id": problem, "month": month,
+            "submissions": submissions, "accepts": accepts
+        }, upsert=True)
+        for (user, problem), (submissions, accepts) in counts.items()
+    ], ordered=False)
+
+
+async def archive_submissions(
+    submissions_collection,
+    summaries_collection,
+    archive: SubmissionArchive,
+    code_store,
+    cutoff: datetime,
+    batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """Move judged submissions older than cutoff into the archive; returns how many moved.
+
+    Each batch is copied, summarized and only then deleted from the hot
+    tier, and every step can be repeated, so an interrupted run is
+    finished by running it again.
+    """
+    from pymongo.errors import BulkWriteError
+
+    await submissions_collection.create_index("submitted_at")
+    await summaries_collection.create_index("user_id")
+    indexed = set()
+    moved = 0
+    while True:
+        cursor = submissions_collection.find({
+            "submitted_at": {"$lt": cutoff},
+            "status": {"$ne": StatusEnum.PENDING}
+        })
+        docs = await cursor.sort("submitted_at", 1).limit(batch_size).to_list(None)
+        if not docs:
+            break
+        by_month = defaultdict(list)
+        for doc in docs:
+            if doc.get("code") is not None:
+                doc["code_hash"] = await code_store.put(doc.pop("code"))
+            by_month[archive_month(doc["submitted_at"])].append(doc)
+
+        for month, month_docs in by_month.items():
+            collection = archive.collection(month)
+            if month not in indexed:
+                await collection.create_index("id", unique=True)
+                await collection.create_index([("user_id", 1), ("submitted_at", -1)])
+                indexed.add(month)
+            try:
+                await collection.insert_many(month_docs, ordered=False)
+            except BulkWriteError as e:
+                # Copied by an earlier, interrupted run
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+            await _summarize(collection, summaries_collection, month, month_docs)
+
+        await submissions_collection.delete_many({"id": {"$in": [doc["id"] for doc in docs]}})
+        moved += len(docs)
+        logger.info("Archived %d submissions", moved)
+    await archive.months(refresh=True)
+    return moved
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Move old submissions into monthly archive collections")
+    parser.add_argument("--older-than-days", type=int, default=SUBMISSION_HOT_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    return parser.parse_args()
+
+
+async def main(args):
+    from database import code_store, submission_archive, submission_summaries_collection, submissions_collection
+
+    cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+    moved = await archive_submissions(
+        submissions_collection, submission_summaries_collection, submission_archive, code_store,
+        cutoff, args.batch_size
+    )
+    print(f"Archived {moved} submissions made before {cutoff:%Y-%m-%d}")
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / '.env')
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_args()))
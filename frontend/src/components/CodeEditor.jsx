@@ -45,8 +45,8 @@ public:
     if (submissionResult) {
       if (submissionResult.status === 'Accepted') {
         return `✅ Accepted!
-Runtime: ${submissionResult.runtime}
-Memory: ${submissionResult.memory}
+Runtime: ${submissionResult.runtime || 'N/A'}
+Memory: ${submissionResult.memory || 'N/A'}
 Test Cases Passed: ${submissionResult.test_cases_passed}/${submissionResult.total_test_cases}`;
       } else {
         return `❌ ${submissionResult.status}
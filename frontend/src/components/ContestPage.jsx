@@ -57,6 +57,8 @@ const ContestPage = () => {
 
     try {
       await contestsAPI.registerForContest(contestId);
+      const response = await contestsAPI.getContest(contestId);
+      setContests(prev => prev.map(c => (c.id === contestId ? { ...c, ...response.data } : c)));
       toast({
         title: "Registration Successful",
         description: "You have been registered for the contest!",
@@ -237,10 +239,10 @@ const ContestPage = () => {
                     <Button 
                       className="bg-blue-600 hover:bg-blue-700"
                       onClick={() => handleRegister(contest.id)}
-                      disabled={!isAuthenticated}
+                      disabled={!isAuthenticated || contest.registered}
                     >
                       <Play className="h-4 w-4 mr-2" />
-                      {isAuthenticated ? 'Register' : 'Sign in to Register'}
+                      {!isAuthenticated ? 'Sign in to Register' : contest.registered ? 'Registered' : 'Register'}
                     </Button>
                   </div>
                 </CardContent>
@@ -185,7 +185,7 @@ public:
       if (response.data.status === 'Accepted') {
         toast({
           title: "Accepted! 🎉",
-          description: `Solution accepted! Runtime: ${response.data.runtime}`,
+          description: `Solution accepted! Runtime: ${response.data.runtime || 'N/A'}`,
         });
       } else {
         toast({
@@ -446,8 +446,13 @@ public:
                     </div>
                     {submissionResult.status === 'Accepted' && (
                       <div className="text-sm text-gray-600">
-                        <p>Runtime: {submissionResult.runtime}</p>
-                        <p>Memory: {submissionResult.memory}</p>
+                        <p>
+                          Runtime: {submissionResult.runtime || 'N/A'}
+                          {submissionResult.runtime_percentile != null && ` (beats ${submissionResult.runtime_percentile}%)`}
+                        </p>
+                        <p>
+                          Memory: {submissionResult.memory || 'N/A'}
+                        </p>
                         <p>Test Cases Passed: {submissionResult.test_cases_passed}/{submissionResult.total_test_cases}</p>
                       </div>
                     )}
@@ -45,6 +45,7 @@ export const authAPI = {
 export const problemsAPI = {
   getProblems: (params = {}) => api.get('/problems', { params }),
   getProblemById: (id) => api.get(`/problems/${id}`),
+  getProblemsByIds: (ids) => api.get('/problems/batch', { params: { ids: ids.join(',') } }),
   runCode: (problemId, data) => api.post(`/problems/${problemId}/run`, data),
   submitCode: (problemId, data) => api.post(`/problems/${problemId}/submit`, data),
 };
@@ -57,6 +58,7 @@ export const submissionsAPI = {
 // Contests API
 export const contestsAPI = {
   getContests: () => api.get('/contests'),
+  getContest: (contestId) => api.get(`/contests/${contestId}`),
   registerForContest: (contestId) => api.post(`/contests/${contestId}/register`),
 };
 
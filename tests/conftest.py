@@ -0,0 +1,42 @@
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# The backend is a flat set of top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+def pytest_configure(config):
+    # The backend uses pydantic's v1-style .dict()/.copy() throughout
+    config.addinivalue_line("filterwarnings", "ignore::pydantic.PydanticDeprecatedSince20")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    """A fresh in-process database bound to the database module's collections"""
+    from mongomock_motor import AsyncMongoMockClient
+    import database
+
+    database.use_client(AsyncMongoMockClient(), f"tests_{uuid.uuid4().hex[:8]}", read_preferences=False)
+    database.rank_index._loaded_at = None
+    database.problem_counters._pending.clear()
+    database.submission_archive._names = (0.0, [])
+    yield database
+    database.close_client()
+
+
+@pytest.fixture
+async def client(db):
+    """HTTP client for the API, without running the app lifespan"""
+    import httpx
+    from server import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
@@ -0,0 +1,30 @@
+"""Shared test data"""
+
+TWO_SUM = (
+    "def twoSum(nums, target):\n"
+    "    seen = {}\n"
+    "    for i, n in enumerate(nums):\n"
+    "        if target - n in seen:\n"
+    "            return [seen[target - n], i]\n"
+    "        seen[n] = i\n"
+)
+
+
+def auth_headers(user_id: str, username: str = "tester"):
+    from auth import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': username, 'user_id': user_id})}"}
+
+
+def problem_payload(title: str = "Two Sum", **fields):
+    """A ProblemCreate body with two small Two Sum cases"""
+    payload = {
+        "title": title, "difficulty": "Easy", "category": "Array", "tags": [], "companies": [],
+        "description": "Find two numbers adding up to target", "examples": [], "constraints": [],
+        "test_cases": [
+            {"input": "[2,7,11,15]\n9", "expected": "[0,1]"},
+            {"input": "[3,2,4]\n6", "expected": "[1,2]"},
+        ],
+    }
+    payload.update(fields)
+    return payload
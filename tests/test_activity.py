@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from activity import backfill_activity, current_streak
+from models import StatusEnum
+from submission_archive import archive_month, archive_submissions
+
+from tests.helpers import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+TODAY = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+async def submit(db, day_offset: int, problem_id: str = "p1", status: StatusEnum = StatusEnum.WRONG_ANSWER):
+    submitted_at = TODAY + timedelta(days=day_offset)
+    await db.submissions_collection.insert_one({
+        "id": f"s{day_offset}{problem_id}{status.name}", "user_id": "u1", "problem_id": problem_id,
+        "status": status, "submitted_at": submitted_at
+    })
+    await db.record_submission_activity("u1", problem_id, submitted_at)
+
+
+def test_current_streak_needs_activity_today_or_yesterday():
+    today = date(2024, 5, 10)
+    assert current_streak([], today) == 0
+    assert current_streak([{"day": "2024-05-09", "streak": 3}], today) == 3
+    assert current_streak([{"day": "2024-05-08", "streak": 3}], today) == 0
+
+
+async def test_streak_follows_consecutive_days(db):
+    await db.users_collection.insert_one({"id": "u1", "profile": {}})
+    for offset in (-4, -2, -1, -1, 0):
+        await submit(db, offset)
+
+    rollups = await db.activity_collection.find({"user_id": "u1"}).sort("_id", 1).to_list(None)
+    assert [(doc["submissions"], doc["streak"]) for doc in rollups] == [(1, 1), (1, 1), (2, 2), (1, 3)]
+    assert await db.get_current_streak("u1") == 3
+
+
+async def test_me_reports_a_lapsed_streak_as_zero(client, db):
+    await db.users_collection.insert_one({
+        "id": "u1", "username": "u1", "email": "u1@example.com", "password_hash": "x",
+        "created_at": datetime.utcnow(), "profile": {"streak": 30}
+    })
+    await submit(db, -3)
+    assert (await client.get("/api/auth/me", headers=auth_headers("u1"))).json()["profile"]["streak"] == 0
+    await submit(db, 0)
+    assert (await client.get("/api/auth/me", headers=auth_headers("u1"))).json()["profile"]["streak"] == 1
+
+
+async def test_backfill_rebuilds_the_incremental_rollups(db):
+    await db.users_collection.insert_one({"id": "u1", "profile": {}})
+    await submit(db, -1, "p1")
+    await submit(db, 0, "p2")
+    await submit(db, 0, "p3")
+    incremental = await db.activity_collection.find({}).sort("_id", 1).to_list(None)
+
+    await db.activity_collection.delete_many({})
+    assert await backfill_activity(db.submissions_collection, db.activity_collection, db.submission_archive) == 2
+    assert await db.activity_collection.find({}).sort("_id", 1).to_list(None) == incremental
+    assert await db.get_current_streak("u1") == 2
+
+
+async def test_backfill_reads_archived_days(db):
+    for offset in (-3, -2, -1, 0):
+        await submit(db, offset)
+    incremental = await db.activity_collection.find({}).sort("_id", 1).to_list(None)
+    assert await archive_submissions(
+        db.submissions_collection, db.submission_summaries_collection, db.submission_archive, db.code_store,
+        TODAY - timedelta(days=1, hours=12)
+    ) == 2
+    # An archived submission the archiver hasn't deleted from the hot tier yet
+    two_days_ago = TODAY - timedelta(days=2)
+    copied = await db.submission_archive.collection(archive_month(two_days_ago)).find_one(
+        {"submitted_at": two_days_ago}, {"_id": 0}
+    )
+    await db.submissions_collection.insert_one(copied)
+
+    await db.activity_collection.delete_many({})
+    assert await backfill_activity(db.submissions_collection, db.activity_collection, db.submission_archive) == 4
+    assert await db.activity_collection.find({}).sort("_id", 1).to_list(None) == incremental
+    assert await db.get_current_streak("u1") == 4
+
+
+async def test_progress_endpoint(client, db):
+    await db.users_collection.insert_one({"id": "u1", "profile": {}})
+    await submit(db, -1)
+    await submit(db, 0, "p2")
+
+    progress = (await client.get("/api/user/progress", headers=auth_headers("u1"))).json()
+    assert (progress["current_streak"], progress["longest_streak"], progress["active_days"]) == (2, 2, 2)
+    assert progress["submissions"] == 2
+    assert [day["day"] for day in progress["heatmap"]] == [
+        (TODAY - timedelta(days=1)).date().isoformat(), TODAY.date().isoformat()
+    ]
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from benchmarks.harness import compare_to_baseline, measure_latency, measure_throughput, summarize
+
+
+def test_summarize_reports_milliseconds():
+    stats = summarize([0.001 * i for i in range(1, 101)])
+    assert stats["samples"] == 100
+    assert stats["mean_ms"] == pytest.approx(50.5)
+    assert stats["p50_ms"] == pytest.approx(51)
+    assert stats["p95_ms"] == pytest.approx(96)
+
+
+def test_baseline_comparison_flags_only_regressions(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": {
+        "submit": {"samples": 10, "p50_ms": 100.0, "ops_per_sec": 50.0},
+        "list": {"p50_ms": 10.0},
+    }}))
+    results = {
+        "submit": {"samples": 99, "p50_ms": 130.0, "ops_per_sec": 30.0},
+        "list": {"p50_ms": 8.0},
+        "new": {"p50_ms": 1.0},
+    }
+    regressions = compare_to_baseline(results, str(baseline), threshold=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("submit p50_ms")
+    assert regressions[1].startswith("submit ops_per_sec")
+
+
+@pytest.mark.anyio
+async def test_measurements_call_the_function_the_expected_number_of_times():
+    calls = []
+
+    async def op():
+        calls.append(1)
+
+    stats = await measure_latency(op, repeat=5, warmup=2)
+    assert stats["samples"] == 5 and len(calls) == 7
+    throughput = await measure_throughput(op, total=20, concurrency=4)
+    assert throughput["concurrency"] == 4 and len(calls) == 27
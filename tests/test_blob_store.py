@@ -0,0 +1,64 @@
+import pytest
+
+from blob_store import (
+    BlobCache, LocalBlobStore, blob_digest, externalize_test_cases, migrate_problems, resolve_test_cases
+)
+from models import TestCase as Case
+
+pytestmark = pytest.mark.anyio
+
+LARGE = "1 " * 5000
+
+
+async def test_local_store_is_content_addressed(tmp_path):
+    store = LocalBlobStore(tmp_path)
+    digest = await store.put(b"payload")
+    assert digest == blob_digest(b"payload")
+    assert await store.put(b"payload") == digest
+    assert await store.get(digest) == b"payload"
+
+
+async def test_only_oversized_payloads_are_externalized(tmp_path):
+    store = LocalBlobStore(tmp_path)
+    cases = await externalize_test_cases(
+        [Case(input=LARGE, expected="5000"), Case(input="1", expected="1")], store
+    )
+    assert cases[0].input == "" and cases[0].input_ref == blob_digest(LARGE.encode())
+    assert cases[0].expected == "5000" and cases[0].expected_ref is None
+    assert cases[1] == Case(input="1", expected="1")
+
+
+async def test_cache_downloads_once_and_resolves_to_paths(tmp_path):
+    store = LocalBlobStore(tmp_path / "store")
+    cache = BlobCache(tmp_path / "cache", store)
+    cases = await externalize_test_cases([Case(input=LARGE, expected="5000")], store)
+
+    (test_input, expected), = await resolve_test_cases(cases, cache)
+    assert test_input.read_text() == LARGE
+    assert expected == "5000"
+    # Served from the cache even once the store has lost it
+    store.path_for(cases[0].input_ref).unlink()
+    assert (await cache.path(cases[0].input_ref)).read_text() == LARGE
+
+
+async def test_cache_rejects_corrupted_blobs(tmp_path):
+    store = LocalBlobStore(tmp_path / "store")
+    digest = await store.put(b"payload")
+    store.path_for(digest).write_bytes(b"tampered")
+    cache = BlobCache(tmp_path / "cache", store)
+    with pytest.raises(ValueError):
+        await cache.path(digest)
+    # No partial download is left behind
+    assert not [path for path in (tmp_path / "cache").rglob("*") if path.is_file()]
+
+
+async def test_migration_externalizes_stored_problems(db, tmp_path):
+    store = LocalBlobStore(tmp_path)
+    await db.problems_collection.insert_many([
+        {"id": "big", "test_cases": [{"input": LARGE, "expected": "5000"}]},
+        {"id": "small", "test_cases": [{"input": "1", "expected": "1"}]},
+    ])
+    assert await migrate_problems(db.problems_collection, store) == 1
+    assert await migrate_problems(db.problems_collection, store) == 0
+    doc = await db.problems_collection.find_one({"id": "big"})
+    assert doc["test_cases"][0]["input_ref"] == blob_digest(LARGE.encode())
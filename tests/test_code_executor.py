@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+import code_executor
+from code_executor import CodeExecutor, job_workspace, sweep_orphaned_workspaces
+from models import LanguageEnum
+
+
+@pytest.fixture
+def workspace_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(code_executor, "WORKSPACE_ROOT", tmp_path)
+    return tmp_path
+
+
+def test_sweep_keeps_only_workspaces_of_live_processes(workspace_root):
+    dead = workspace_root / "999999999.1-dead"
+    # A live pid with another start time is a reused pid, not the judge that made the workspace
+    reused = workspace_root / f"{os.getpid()}.1-reused"
+    legacy = workspace_root / f"{os.getpid()}-legacy"
+    for path in (dead, reused, legacy):
+        path.mkdir()
+
+    with job_workspace() as live:
+        assert sweep_orphaned_workspaces() == 3
+        assert list(workspace_root.iterdir()) == [live]
+    assert not live.exists()
+
+
+@pytest.mark.anyio
+async def test_each_case_runs_in_a_clean_directory(workspace_root):
+    code = (
+        "import os\n"
+        "def twoSum(nums, target):\n"
+        "    stale = os.listdir('.')\n"
+        "    open('scratch', 'w').close()\n"
+        "    return stale\n"
+    )
+    response = await CodeExecutor(1).execute_code(code, LanguageEnum.PYTHON, [("[1]\n1", "[]"), ("[2]\n2", "[]")])
+    assert [result.actual for result in response.test_results] == ["[]", "[]"]
+    assert response.success
+    assert list(workspace_root.iterdir()) == []
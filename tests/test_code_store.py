@@ -0,0 +1,42 @@
+import pytest
+
+import code_store
+from code_store import code_digest, compress_code, decompress_code, migrate_inline_code
+
+pytestmark = pytest.mark.anyio
+
+CODE = "def twoSum(nums, target):\n    return [0, 1]\n" * 20
+
+
+def test_compression_round_trips():
+    doc = compress_code(CODE)
+    assert len(doc["data"]) < len(CODE)
+    assert decompress_code(doc) == CODE
+
+
+async def test_identical_code_is_stored_once(db):
+    digest = await db.code_store.put(CODE)
+    assert await db.code_store.put(CODE) == digest == code_digest(CODE)
+    other = await db.code_store.put("print(1)")
+    assert await db.code_store.collection.count_documents({}) == 2
+    assert await db.code_store.get(digest) == CODE
+    assert await db.code_store.get_many([digest, other, digest]) == {digest: CODE, other: "print(1)"}
+    assert await db.code_store.get("missing") is None
+
+
+async def test_known_code_is_not_compressed_again(db, monkeypatch):
+    compressed = []
+    monkeypatch.setattr(code_store, "compress_code", lambda code: compressed.append(code) or compress_code(code))
+    for _ in range(3):
+        await db.code_store.put(CODE, "python")
+    assert compressed == [CODE]
+    doc = await db.code_store.collection.find_one({})
+    assert doc["minhash"]
+
+
+async def test_migration_moves_inline_code(db):
+    await db.submissions_collection.insert_many([{"id": "a", "code": CODE}, {"id": "b", "code": CODE}])
+    assert await migrate_inline_code(db.submissions_collection, db.code_store) == 2
+    docs = [doc async for doc in db.submissions_collection.find({}, {"_id": 0})]
+    assert all("code" not in doc and doc["code_hash"] == code_digest(CODE) for doc in docs)
+    assert await db.code_store.collection.count_documents({}) == 1
@@ -0,0 +1,94 @@
+import pytest
+
+from comparator import CHECKERS, Comparator, UnknownCheckerError, iter_tokens, register_checker
+from models import CompareModeEnum, JudgeJob, JudgeJobKind, LanguageEnum, Problem, StatusEnum
+
+from tests.helpers import auth_headers, problem_payload
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_whitespace_mode_ignores_layout_and_language_literals():
+    comparator = Comparator()
+    assert comparator.compare("[0, 1]", "[0,1]\n")
+    assert comparator.compare("(1, 2)", "[1,2]")
+    assert comparator.compare("true", "True")
+    assert comparator.compare("null", "None")
+    assert comparator.compare('["a"]', "['a']")
+    assert not comparator.compare("[0,1]", "[1,0]")
+    assert not comparator.compare("[0,1]", "[0,1,2]")
+
+
+def test_exact_mode_only_trims_the_ends():
+    comparator = Comparator(CompareModeEnum.EXACT)
+    assert comparator.compare("a b\n", "  a b")
+    assert not comparator.compare("a b", "a  b")
+
+
+def test_float_mode_uses_epsilon():
+    comparator = Comparator(CompareModeEnum.FLOAT, epsilon=1e-3)
+    assert comparator.compare("[0.5, 1.0]", "[0.5004, 1]")
+    assert not comparator.compare("0.5", "0.51")
+    assert not Comparator().compare("0.5", "0.5004")
+
+
+def test_unordered_mode_compares_multisets():
+    comparator = Comparator(CompareModeEnum.UNORDERED)
+    assert comparator.compare("[[1,2],[3]]", "[[3], [1,2]]")
+    assert not comparator.compare("[1,1,2]", "[1,2,2]")
+    assert not comparator.compare("[1,2]", "[1,2]extra")
+    assert not comparator.compare("[1,2]", "[1,2")
+    # Output cut off inside an object is a wrong answer, not a crash
+    for truncated in ('{"a":', '[{"a":', '[{"a"', '{'):
+        assert not comparator.compare("[1]", truncated)
+
+
+def test_streamed_output_matches_whole_output():
+    expected = "[" + ",".join(str(i * 1.5) for i in range(200)) + "]"
+    tokens = list(iter_tokens(expected))
+    for size in (1, 3, 7, 64):
+        assert list(iter_tokens(chunked(expected, size))) == tokens
+        assert Comparator().compare(expected, chunked(expected, size))
+        assert Comparator(CompareModeEnum.EXACT).compare(expected, chunked(expected, size))
+
+
+def test_custom_checker():
+    @register_checker("test-sum")
+    def same_sum(expected, actual):
+        return sum(map(int, expected.split())) == sum(map(int, actual.split()))
+
+    try:
+        comparator = Comparator(CompareModeEnum.CUSTOM, checker="test-sum")
+        assert comparator.compare("1 2 3", "6")
+        assert not comparator.compare("1 2 3", "5")
+    finally:
+        del CHECKERS["test-sum"]
+
+
+def test_unknown_checker_is_rejected():
+    with pytest.raises(UnknownCheckerError):
+        Comparator(CompareModeEnum.CUSTOM, checker="missing")
+
+
+@pytest.mark.anyio
+async def test_problem_with_unknown_checker_cannot_be_created(client):
+    response = await client.post(
+        "/api/problems", json=problem_payload(compare_mode="custom", checker="missing"), headers=auth_headers("u1")
+    )
+    assert response.status_code == 400
+    assert "missing" in response.json()["detail"]
+
+
+@pytest.mark.anyio
+async def test_unknown_checker_fails_the_run_instead_of_raising(db):
+    from judge import process_job
+
+    problem = Problem(**problem_payload(compare_mode="custom", checker="missing"))
+    await db.problems_collection.insert_one(problem.dict())
+    job = JudgeJob(kind=JudgeJobKind.SUBMIT, problem_id=problem.id, user_id="u1", code="", language=LanguageEnum.PYTHON)
+
+    judged = await process_job(job, executor=None)
+    assert judged.status == StatusEnum.RUNTIME_ERROR
+    assert "Unknown checker" in judged.result.error
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.helpers import TWO_SUM, auth_headers, problem_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_problems(client, headers, *titles):
+    return [
+        (await client.post("/api/problems", json=problem_payload(title), headers=headers)).json()["id"]
+        for title in titles
+    ]
+
+
+async def test_batch_keeps_the_requested_order_and_skips_unknown_ids(client):
+    headers = auth_headers("u1")
+    first, second = await create_problems(client, headers, "Two Sum", "Two Sum II")
+
+    response = await client.get(f"/api/problems/batch?ids={second},missing,{first},{second}")
+    assert [problem["id"] for problem in response.json()] == [second, first]
+    # Only what the problem page renders; test cases never leave the server
+    assert {"description", "examples", "constraints"} <= response.json()[0].keys()
+    assert "test_cases" not in response.json()[0]
+
+    too_many = ",".join(f"p{i}" for i in range(51))
+    assert (await client.get(f"/api/problems/batch?ids={too_many}")).status_code == 400
+
+
+def contest_body(problem_ids, starts_in: timedelta):
+    start = datetime.utcnow() + starts_in
+    return {"title": "Weekly", "start_time": start.isoformat(), "duration_minutes": 90, "problem_ids": problem_ids}
+
+
+async def test_contest_page_with_registration_and_problem_status(client):
+    headers = auth_headers("u1")
+    solved, unsolved = await create_problems(client, headers, "Two Sum", "Two Sum II")
+    body = contest_body([solved, unsolved], -timedelta(minutes=10))
+    contest_id = (await client.post("/api/contests", json=body, headers=headers)).json()["id"]
+    await client.post(
+        f"/api/problems/{solved}/submit",
+        json={"problem_id": solved, "code": TWO_SUM, "language": "python", "contest_id": contest_id},
+        headers=headers
+    )
+
+    registered = await client.post(f"/api/contests/{contest_id}/register", headers=headers)
+    assert registered.json()["message"] == "Successfully registered for contest"
+    again = await client.post(f"/api/contests/{contest_id}/register", headers=headers)
+    assert again.json()["message"] == "Already registered for contest"
+
+    page = (await client.get(f"/api/contests/{contest_id}", headers=headers)).json()
+    assert (page["status"], page["registered"], page["participants_count"]) == ("ongoing", True, 1)
+    assert [(row["id"], row["solved"]) for row in page["problems"]] == [(solved, True), (unsolved, False)]
+    anonymous = (await client.get(f"/api/contests/{contest_id}")).json()
+    assert anonymous["registered"] is False
+
+    listed = (await client.get("/api/contests", headers=headers)).json()
+    assert [(row["id"], row["participants_count"]) for row in listed] == [(contest_id, 1)]
+    assert "participants" not in listed[0]
+
+
+async def test_upcoming_contest_hides_its_problems(client):
+    headers = auth_headers("u1")
+    problem_ids = await create_problems(client, headers, "Two Sum")
+    body = contest_body(problem_ids, timedelta(hours=1))
+    contest_id = (await client.post("/api/contests", json=body, headers=headers)).json()["id"]
+
+    page = (await client.get(f"/api/contests/{contest_id}", headers=headers)).json()
+    assert (page["status"], page["problems"]) == ("upcoming", [])
+    assert (await client.get("/api/contests/missing")).status_code == 404
+    assert (await client.post("/api/contests/missing/register", headers=headers)).status_code == 404
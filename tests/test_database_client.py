@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import database
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+
+
+@pytest.fixture
+def real_client():
+    """A driver client that is never connected; resolving collections doesn't touch the network"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient("mongodb://localhost:1", serverSelectionTimeoutMS=1)
+    database.use_client(client, "tests")
+    yield client
+    database.close_client()
+
+
+def test_catalog_reads_use_the_configured_read_preference(real_client):
+    assert database.catalog_problems_collection.read_preference.mongos_mode == database.CATALOG_READ_PREFERENCE
+    assert database.problems_collection.read_preference.mongos_mode == "primary"
+
+
+def test_collections_follow_a_client_swap(real_client):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    assert database.problems_collection.database.client is real_client
+    other = AsyncIOMotorClient("mongodb://localhost:2", serverSelectionTimeoutMS=1)
+    database.use_client(other, "tests")
+    assert database.problems_collection.database.client is other
+
+
+def test_an_unknown_read_preference_fails_at_import():
+    env = {**os.environ, "MONGO_CATALOG_READ_PREFERENCE": "secondaryPrefered"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import database"], cwd=BACKEND, env=env, capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert "MONGO_CATALOG_READ_PREFERENCE" in result.stderr
+
+
+def test_client_options_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "7")
+    monkeypatch.setenv("MONGO_COMPRESSORS", "zlib")
+    options = database._client_options()
+    assert options["maxPoolSize"] == 7
+    assert options["compressors"] == "zlib"
+    assert len(options["event_listeners"]) == 2
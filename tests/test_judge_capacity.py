@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+
+import pytest
+
+from benchmarks.loadgen import EndpointStats, parse_mix
+from code_executor import CodeExecutor
+from models import LanguageEnum
+
+SLOW_CODE = "import time\ndef twoSum(nums, target):\n    time.sleep(0.3)\n    return [0, 1]\n"
+
+
+@pytest.mark.anyio
+async def test_executor_queues_jobs_beyond_its_capacity():
+    executor = CodeExecutor(max_concurrency=1)
+    jobs = [
+        asyncio.create_task(executor.execute_code(SLOW_CODE, LanguageEnum.PYTHON, [("[2,7]\n9", "[0,1]")]))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0.1)
+    assert (executor.running, executor.queued) == (1, 1)
+    results = await asyncio.gather(*jobs)
+    assert all(result.success for result in results)
+    assert (executor.running, executor.queued) == (0, 0)
+
+
+@pytest.mark.anyio
+async def test_judge_status_reports_local_capacity(client):
+    response = await client.get("/api/judge/status")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["queued"] == body["running"] == 0
+    assert body["capacity"] >= 1
+
+
+def test_endpoint_stats_report():
+    stats = EndpointStats()
+    for ms in range(1, 101):
+        stats.record(float(ms), "HTTP 500" if ms % 10 == 0 else None)
+    report = stats.report()
+    assert report["requests"] == 100
+    assert report["error_rate"] == pytest.approx(0.1)
+    assert report["errors"] == {"HTTP 500": 10}
+    assert report["p50_ms"] == 51.0
+    assert sum(report["histogram"].values()) == 100
+
+
+def test_parse_mix():
+    assert parse_mix("run=2,submit_ok=1") == {"run": 2.0, "submit_ok": 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("delete_everything=1")
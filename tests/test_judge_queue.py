@@ -0,0 +1,107 @@
+import pytest
+
+import judge_queue
+from judge import finalize_submission
+from judge_queue import InMemoryBroker, MongoBroker
+from metrics import JUDGE_VERDICTS
+from models import (
+    CodeRunResponse, JudgeJob, JudgeJobKind, JudgeResult, LanguageEnum, StatusEnum, SubmissionCreate,
+    TestResult as CaseResult
+)
+
+pytestmark = pytest.mark.anyio
+
+
+def make_job(**fields) -> JudgeJob:
+    defaults = {"kind": JudgeJobKind.RUN, "problem_id": "p1", "user_id": "u1", "code": "", "language": "python"}
+    return JudgeJob(**{**defaults, **fields})
+
+
+def run_result(passed: bool) -> CodeRunResponse:
+    case = CaseResult(input="1", expected="1", actual="1" if passed else "2", passed=passed, time_ms=3)
+    return CodeRunResponse(success=passed, test_results=[case], console_output="", runtime="45ms")
+
+
+async def test_expired_lease_moves_the_job_to_another_worker():
+    broker = InMemoryBroker()
+    job = make_job()
+    await broker.enqueue(job)
+    assert (await broker.claim("w1", lease_seconds=0)).id == job.id
+
+    assert (await broker.claim("w2")).id == job.id
+    # The first worker lost the lease: it can neither extend it nor publish a result
+    assert not await broker.extend(job.id, "w1")
+    await broker.ack(job.id, "w1", JudgeResult(result=run_result(False)))
+    assert await broker.stats() == (0, 1)
+
+    await broker.ack(job.id, "w2", JudgeResult(result=run_result(True)))
+    assert (await broker.wait_result(job.id, timeout=1)).result.success
+    assert await broker.stats() == (0, 0)
+
+
+async def test_job_is_abandoned_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(judge_queue, "MAX_ATTEMPTS", 2)
+    broker = InMemoryBroker()
+    job = make_job()
+    await broker.enqueue(job)
+    for worker in ("w1", "w2"):
+        assert await broker.claim(worker, lease_seconds=0) is not None
+
+    assert await broker.claim("w3") is None
+    result = await broker.wait_result(job.id, timeout=1)
+    assert "abandoned after 2 attempts" in result.result.error
+
+
+async def test_mongo_broker_leases(db):
+    broker = MongoBroker(db._LazyCollection("judge_jobs"))
+    job = make_job()
+    await broker.enqueue(job)
+    assert (await broker.claim("w1", lease_seconds=0)).id == job.id
+    assert (await broker.claim("w2")).id == job.id
+    assert not await broker.extend(job.id, "w1")
+    assert await broker.extend(job.id, "w2")
+
+    await broker.ack(job.id, "w1", JudgeResult(result=run_result(False)))
+    assert await broker.wait_result(job.id, timeout=0) is None
+    await broker.ack(job.id, "w2", JudgeResult(result=run_result(True)))
+    assert (await broker.wait_result(job.id, timeout=0)).result.success
+
+
+async def test_a_verdict_recorded_twice_is_counted_once(db):
+    await db.problems_collection.insert_one({"id": "p1", "difficulty": "Easy", "title": "Two Sum"})
+    submission = await db.create_submission(
+        SubmissionCreate(problem_id="p1", code="pass", language=LanguageEnum.PYTHON), "u1"
+    )
+    job = make_job(kind=JudgeJobKind.SUBMIT, submission_id=submission.id)
+    verdicts = JUDGE_VERDICTS._values.get(("Accepted", "python"), 0)
+
+    # A worker whose lease expired mid-judge finalizes the same submission again
+    for _ in range(2):
+        assert await finalize_submission(job, run_result(True)) == StatusEnum.ACCEPTED
+
+    assert JUDGE_VERDICTS._values[("Accepted", "python")] == verdicts + 1
+    assert db.problem_counters._pending["p1"] == {"attempts": 1, "accepts": 1}
+    histogram = await db.runtime_histograms_collection.find_one({"_id": "p1:python"})
+    assert histogram["runtime_total"] == 1
+    # Memory isn't measured, so nothing placeholder is stored or bucketed
+    assert "memory_total" not in histogram
+    assert (await db.submissions_collection.find_one({"id": submission.id})).get("memory") is None
+    activity = await db.activity_collection.find_one({"user_id": "u1"})
+    assert activity["accepts"] == 1
+
+
+async def test_a_changed_verdict_moves_the_counts(db):
+    await db.problems_collection.insert_one({"id": "p1", "difficulty": "Easy", "title": "Two Sum"})
+    submission = await db.create_submission(
+        SubmissionCreate(problem_id="p1", code="pass", language=LanguageEnum.PYTHON), "u1"
+    )
+    job = make_job(kind=JudgeJobKind.SUBMIT, submission_id=submission.id)
+
+    await finalize_submission(job, run_result(True))
+    assert await finalize_submission(job, run_result(False)) == StatusEnum.WRONG_ANSWER
+
+    assert db.problem_counters._pending["p1"] == {"attempts": 1, "accepts": 0}
+    histogram = await db.runtime_histograms_collection.find_one({"_id": "p1:python"})
+    assert histogram["runtime_total"] == 0
+    activity = await db.activity_collection.find_one({"user_id": "u1"})
+    assert activity["accepts"] == 0
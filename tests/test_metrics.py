@@ -0,0 +1,59 @@
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, Histogram, REGISTRY, render_metrics
+
+from tests.helpers import TWO_SUM, auth_headers, problem_payload
+
+
+@pytest.fixture
+def registry():
+    """Metrics created by a test are unregistered afterwards"""
+    before = list(REGISTRY)
+    yield
+    REGISTRY[:] = before
+
+
+def test_prometheus_exposition(registry):
+    verdicts = Counter("test_verdicts_total", "Verdicts", ["verdict"])
+    verdicts.inc("Accepted")
+    verdicts.inc("Accepted", amount=2)
+    Gauge("test_queue", "Queue", callback=lambda: 7)
+    latency = Histogram("test_seconds", "Latency", ["stage"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        latency.observe(value, "execute")
+
+    text = render_metrics()
+    assert '# TYPE test_verdicts_total counter' in text
+    assert 'test_verdicts_total{verdict="Accepted"} 3' in text
+    assert 'test_queue 7' in text
+    assert 'test_seconds_bucket{stage="execute",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="execute",le="1"} 2' in text
+    assert 'test_seconds_bucket{stage="execute",le="+Inf"} 3' in text
+    assert 'test_seconds_count{stage="execute"} 3' in text
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(client):
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert "judge_stage_seconds" in response.text
+
+
+@pytest.mark.anyio
+async def test_traces_are_only_visible_to_the_submitter(client, monkeypatch):
+    monkeypatch.setattr(metrics, "TRACING_ENABLED", True)
+    owner = auth_headers("owner")
+    problem_id = (await client.post("/api/problems", json=problem_payload(), headers=owner)).json()["id"]
+    submitted = await client.post(
+        f"/api/problems/{problem_id}/submit",
+        json={"problem_id": problem_id, "code": TWO_SUM, "language": "python"},
+        headers=owner
+    )
+    submission_id = submitted.json()["id"]
+
+    response = await client.get(f"/api/traces/{submission_id}", headers=owner)
+    assert response.status_code == 200
+    assert {span["name"] for span in response.json()["spans"]} >= {"problem_fetch", "db_write", "sandbox_spawn"}
+    response = await client.get(f"/api/traces/{submission_id}", headers=auth_headers("someone-else"))
+    assert response.status_code == 404
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from code_similarity import (
+    candidate_pairs, estimated_similarity, minhash_signature, normalize_tokens, token_similarity
+)
+from models import ContestCreate, LanguageEnum, StatusEnum, SubmissionCreate
+from plagiarism import find_similar
+
+ORIGINAL = """
+def twoSum(nums, target):
+    # index of each value seen so far
+    seen = {}
+    for i, n in enumerate(nums):
+        if target - n in seen:
+            return [seen[target - n], i]
+        seen[n] = i
+    return []
+"""
+# The same solution with names, comments and literals changed
+RENAMED = """
+def twoSum(values, goal):
+    lookup = {}  # value -> position
+    for idx, v in enumerate(values):
+        if goal - v in lookup:
+            return [lookup[goal - v], idx]
+        lookup[v] = idx
+    return []
+"""
+DIFFERENT = """
+def twoSum(nums, target):
+    order = sorted(range(len(nums)), key=lambda k: nums[k])
+    lo, hi = 0, len(nums) - 1
+    while lo < hi:
+        total = nums[order[lo]] + nums[order[hi]]
+        if total == target:
+            return sorted([order[lo], order[hi]])
+        if total < target:
+            lo += 1
+        else:
+            hi -= 1
+"""
+
+
+def test_renaming_and_comments_do_not_change_the_tokens():
+    assert normalize_tokens(ORIGINAL, "python") == normalize_tokens(RENAMED, "python")
+    assert normalize_tokens('x = "a" + 1  # note', "python") == ["V", "=", "S", "+", "N"]
+    assert token_similarity(ORIGINAL, DIFFERENT, "python") < 0.8
+
+
+def test_lsh_pairs_only_similar_code():
+    assert minhash_signature("def f(): pass", "python") is None
+    signatures = {
+        "a": minhash_signature(ORIGINAL, "python"),
+        "b": minhash_signature(RENAMED, "python"),
+        "c": minhash_signature(DIFFERENT, "python"),
+    }
+    assert estimated_similarity(signatures["a"], signatures["b"]) == 1.0
+    assert estimated_similarity(signatures["a"], signatures["c"]) < 0.3
+    assert candidate_pairs(signatures) == [("a", "b")]
+
+
+@pytest.mark.anyio
+async def test_contest_report_pairs_different_users(db):
+    contest = await db.create_contest(ContestCreate(
+        title="Weekly", start_time=datetime.utcnow() - timedelta(minutes=30), duration_minutes=60,
+        problem_ids=["p1"]
+    ))
+    for user_id, code in (("alice", ORIGINAL), ("bob", RENAMED), ("carol", DIFFERENT), ("alice", RENAMED)):
+        submission = await db.create_submission(
+            SubmissionCreate(problem_id="p1", code=code, language=LanguageEnum.PYTHON), user_id
+        )
+        await db.update_submission_status(submission.id, StatusEnum.ACCEPTED, 2, 2)
+
+    matches = await find_similar(contest.id)
+    assert [sorted(s["user_id"] for s in match["submissions"]) for match in matches] == [["alice", "bob"]]
+    assert matches[0]["similarity"] == 1.0
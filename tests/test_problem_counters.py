@@ -0,0 +1,77 @@
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from problem_counters import ProblemCounterBuffer
+
+pytestmark = pytest.mark.anyio
+
+
+class FailingCollection:
+    """Applies nothing and reports the updates at `failed` as write errors"""
+
+    def __init__(self, failed):
+        self.failed = failed
+
+    async def bulk_write(self, updates, ordered):
+        raise BulkWriteError({"writeErrors": [{"index": i, "code": 11000, "errmsg": "failed"} for i in self.failed]})
+
+
+async def test_flush_folds_deltas_into_one_update_per_problem(db):
+    await db.problems_collection.insert_many([{"id": "p1", "attempts": 3, "accepts": 1}, {"id": "p2"}])
+    refreshed = []
+    buffer = ProblemCounterBuffer(db.problems_collection, on_flush=refreshed.append)
+    for accepted in (True, False, True):
+        buffer.incr("p1", attempts=1, accepts=int(accepted))
+    buffer.incr("p2", likes=1)
+    buffer.incr("p3", attempts=0)
+
+    assert await buffer.flush() == 2
+    assert await buffer.flush() == 0
+    doc = await db.problems_collection.find_one({"id": "p1"})
+    assert (doc["attempts"], doc["accepts"], doc["acceptance_rate"]) == (6, 3, 50)
+    assert sorted(row["id"] for row in refreshed) == ["p1", "p2"]
+
+
+async def test_only_failed_updates_are_retried():
+    buffer = ProblemCounterBuffer(FailingCollection(failed=[1]))
+    buffer.incr("p1", attempts=1)
+    buffer.incr("p2", attempts=2)
+    buffer.incr("p3", attempts=3)
+    with pytest.raises(BulkWriteError):
+        await buffer.flush()
+    assert buffer._pending == {"p2": {"attempts": 2}}
+
+
+async def test_a_write_that_may_have_been_applied_is_retried_once(db):
+    class TimesOutAfterWriting:
+        """Applies the first bulk write, then loses the reply"""
+
+        def __init__(self, collection):
+            self.collection = collection
+            self.calls = 0
+
+        async def bulk_write(self, updates, ordered):
+            self.calls += 1
+            result = await self.collection.bulk_write(updates, ordered=ordered)
+            if self.calls == 1:
+                raise AutoReconnect("connection closed")
+            return result
+
+        def find(self, *args):
+            return self.collection.find(*args)
+
+    await db.problems_collection.insert_many([{"id": "p1", "attempts": 1}, {"id": "p2"}])
+    buffer = ProblemCounterBuffer(TimesOutAfterWriting(db.problems_collection))
+    buffer.incr("p1", attempts=1)
+    buffer.incr("p2", likes=1)
+    with pytest.raises(AutoReconnect):
+        await buffer.flush()
+    # New deltas don't join the unconfirmed batch, which goes out again as it was
+    buffer.incr("p1", attempts=1)
+    assert buffer._pending == {"p1": {"attempts": 1}}
+
+    assert await buffer.flush() == 3
+    assert buffer._unconfirmed is None and not buffer._pending
+    doc = await db.problems_collection.find_one({"id": "p1"})
+    assert doc["attempts"] == 3
+    assert (await db.problems_collection.find_one({"id": "p2"}))["likes"] == 1
@@ -0,0 +1,50 @@
+import json
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from profiling import SlowRequestProfiler, SlowRequestProfilingMiddleware
+
+
+async def blocking_handler(request):
+    # Blocks the event loop thread, which is exactly what the watchdog samples
+    time.sleep(0.3)
+    return PlainTextResponse("slow")
+
+
+async def fast_handler(request):
+    return PlainTextResponse("fast")
+
+
+@pytest.mark.anyio
+async def test_only_slow_requests_are_profiled(tmp_path):
+    profiler = SlowRequestProfiler(threshold_ms=50, interval_ms=5, directory=tmp_path)
+    app = SlowRequestProfilingMiddleware(
+        Starlette(routes=[Route("/slow", blocking_handler), Route("/fast", fast_handler)]), profiler
+    )
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/fast")).status_code == 200
+        assert (await client.get("/slow")).status_code == 200
+
+    profiles = profiler.list_profiles()
+    assert [(p["method"], p["path"], p["status_code"]) for p in profiles] == [("GET", "/slow", 200)]
+    assert "samples" not in profiles[0]
+    profile = profiler.get_profile(profiles[0]["id"])
+    assert profile["duration_ms"] >= 300
+    assert any("blocking_handler" in stack for stack in profile["samples"])
+
+
+def test_old_profiles_are_trimmed_and_ids_cannot_escape(tmp_path):
+    profiler = SlowRequestProfiler(directory=tmp_path / "profiles", max_profiles=2)
+    profiler.directory.mkdir()
+    for i in range(3):
+        (profiler.directory / f"2024010{i}T000000-x.json").write_text(json.dumps({"id": i}))
+    profiler._trim()
+    assert [p["id"] for p in profiler.list_profiles()] == [2, 1]
+
+    (tmp_path / "secret.json").write_text("{}")
+    assert profiler.get_profile("../secret") is None
@@ -0,0 +1,66 @@
+import pytest
+
+from models import StatusEnum
+from ranking import FenwickTree, RankIndex, recompute_rankings
+
+pytestmark = pytest.mark.anyio
+
+
+def test_fenwick_tree_counts_and_grows():
+    tree = FenwickTree(size=4)
+    for score in (0, 2, 2, 3):
+        tree.add(score, 1)
+    tree.add(100, 1)
+    assert tree.total == 5
+    assert [tree.count_at(score) for score in range(4)] == [1, 0, 2, 1]
+    assert tree.count_upto(2) == 3
+    assert tree.count_upto(1000) == 5
+
+
+async def test_ties_share_a_rank(db):
+    index = RankIndex(db._LazyCollection("rank_buckets"))
+    await index.move([(None, 5), (None, 5), (None, 3), (None, 9)])
+    assert [await index.rank_of(score) for score in (9, 5, 3)] == [1, 2, 4]
+    await index.move([(3, 10)])
+    assert await index.rank_of(10) == 1 and await index.total() == 4
+
+    # Another replica loads the same counts from the collection
+    other = RankIndex(db._LazyCollection("rank_buckets"))
+    assert await other.rank_of(5) == 3
+
+
+async def accept(db, user_id: str, problem_id: str, submission_id: str):
+    await db.submissions_collection.insert_one({
+        "id": submission_id, "user_id": user_id, "problem_id": problem_id, "status": StatusEnum.ACCEPTED
+    })
+
+
+async def test_solving_a_problem_again_scores_nothing(db):
+    await db.problems_collection.insert_many([
+        {"id": "easy", "difficulty": "Easy"}, {"id": "hard", "difficulty": "Hard"}
+    ])
+    for user_id in ("grinder", "solver"):
+        await db.users_collection.insert_one({"id": user_id, "username": user_id, "profile": {}})
+    for i in range(5):
+        await accept(db, "grinder", "easy", f"g{i}")
+    await accept(db, "solver", "easy", "s1")
+    await accept(db, "solver", "hard", "s2")
+    # An archived month with the same problem solved again
+    await db.submission_summaries_collection.insert_one(
+        {"_id": "solver:hard:2023-01", "user_id": "solver", "problem_id": "hard", "accepts": 2}
+    )
+
+    await db.update_user_stats("grinder")
+    await db.update_user_stats("solver")
+    grinder = (await db.users_collection.find_one({"id": "grinder"}))["profile"]
+    solver = (await db.users_collection.find_one({"id": "solver"}))["profile"]
+    assert grinder["solved"] == {"easy": 1, "medium": 0, "hard": 0, "total": 1}
+    assert (grinder["score"], solver["score"]) == (1, 4)
+
+    await db.users_collection.update_many({}, {"$unset": {"profile": ""}})
+    await db.recompute_user_stats(["grinder", "solver"])
+    assert (await db.users_collection.find_one({"id": "solver"}))["profile"]["solved"]["total"] == 2
+
+    await recompute_rankings(db.users_collection, db.rank_index)
+    assert (await db.get_user_rank("solver"))["rank"] == 1
+    assert (await db.get_user_rank("grinder"))["ranking"] == 2
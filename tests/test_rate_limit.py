@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+import rate_limit
+from database import get_contest_by_id
+from models import Contest, RateLimitConfig
+from rate_limit import InMemoryBucketStore, RateLimited, RateLimiter
+
+from tests.helpers import auth_headers, problem_payload
+
+pytestmark = pytest.mark.anyio
+
+LIMITS = {"run": RateLimitConfig(rate_per_minute=60, burst=2), "submit": RateLimitConfig(rate_per_minute=6, burst=1)}
+
+
+def make_contest(**fields) -> Contest:
+    defaults = {
+        "id": "c1", "title": "Weekly", "start_time": datetime.utcnow() - timedelta(minutes=5),
+        "duration_minutes": 60, "problem_ids": ["p1"], "rate_limits": {"run": {"rate_per_minute": 60, "burst": 4}}
+    }
+    return Contest(**{**defaults, **fields})
+
+
+def make_limiter(*contests: Contest):
+    lookups = []
+
+    async def load_contest(contest_id):
+        lookups.append(contest_id)
+        return next((contest for contest in contests if contest.id == contest_id), None)
+
+    return RateLimiter(InMemoryBucketStore(), load_contest, LIMITS), lookups
+
+
+async def test_user_bucket_refuses_past_the_burst():
+    limiter, _ = make_limiter()
+    for _ in range(2):
+        await limiter.check("run", "u1", None)
+    with pytest.raises(RateLimited) as refused:
+        await limiter.check("run", "u1", None)
+    assert 0 < refused.value.retry_after <= 1
+    await limiter.check("run", "u2", None)
+
+    usage = {row.endpoint: row for row in await limiter.usage("u1")}
+    assert (usage["run"].allowed, usage["run"].rejected) == (2, 1)
+
+
+async def test_idle_buckets_and_counts_are_dropped(monkeypatch):
+    clock = SimpleNamespace(monotonic=lambda: now)
+    monkeypatch.setattr(rate_limit, "time", clock)
+    now = 0.0
+    store = InMemoryBucketStore()
+    limit = LIMITS["run"]
+    for key in ("u1", "u2"):
+        await store.take(key, limit)
+        await store.record(key, True)
+
+    # By the next sweep both buckets have refilled; only u2 is used again
+    now = store.SWEEP_INTERVAL
+    await store.take("u2", limit)
+    assert list(store._buckets) == ["u2"]
+    assert await store.peek("u1", limit) == limit.burst
+    assert await store.counts("u1") == (1, 0)
+
+    now += store.COUNTS_TTL
+    await store.take("u3", limit)
+    assert list(store._counts) == [] and list(store._buckets) == ["u3"]
+
+
+async def test_shared_address_gets_a_multiple_of_the_user_limit(monkeypatch):
+    monkeypatch.setattr(rate_limit, "IP_LIMIT_FACTOR", 2)
+    limiter, _ = make_limiter()
+    for user in ("u1", "u1", "u2", "u2"):
+        await limiter.check("run", user, "10.0.0.1")
+    with pytest.raises(RateLimited, match="client address"):
+        await limiter.check("run", "u3", "10.0.0.1")
+
+
+async def test_refusal_by_the_address_costs_the_user_nothing(monkeypatch):
+    monkeypatch.setattr(rate_limit, "IP_LIMIT_FACTOR", 1)
+    limiter, _ = make_limiter()
+    for _ in range(2):
+        await limiter.check("run", "u2", "10.0.0.1")
+    with pytest.raises(RateLimited, match="client address"):
+        await limiter.check("run", "u1", "10.0.0.1")
+
+    # u1's own bucket is still full from another address
+    for _ in range(2):
+        await limiter.check("run", "u1", "10.0.0.2")
+    usage = {row.endpoint: row for row in await limiter.usage("u1")}
+    assert (usage["run"].allowed, usage["run"].rejected) == (2, 1)
+
+
+async def test_only_an_ongoing_contest_with_the_problem_applies_its_limits():
+    ongoing = make_contest()
+    upcoming = make_contest(id="c2", start_time=datetime.utcnow() + timedelta(hours=1))
+    limiter, _ = make_limiter(ongoing, upcoming)
+    assert (await limiter.active_contest("c1", "p1")) is not None
+    for contest_id, problem_id in (("c1", "other"), ("c2", "p1"), ("made-up", "p1"), (None, "p1")):
+        assert await limiter.active_contest(contest_id, problem_id) is None
+
+    for _ in range(4):
+        await limiter.check("run", "u1", None, "c1", "p1")
+    with pytest.raises(RateLimited):
+        await limiter.check("run", "u1", None, "c1", "p1")
+
+
+async def test_made_up_contest_ids_share_the_default_bucket(monkeypatch):
+    monkeypatch.setattr(rate_limit, "CONTEST_CACHE_SIZE", 2)
+    limiter, lookups = make_limiter()
+    await limiter.check("submit", "u1", "10.0.0.1", "random-1", "p1")
+    with pytest.raises(RateLimited):
+        await limiter.check("submit", "u1", "10.0.0.1", "random-2", "p1")
+
+    await limiter.active_contest("random-3")
+    await limiter.active_contest("random-3")
+    assert list(limiter._contest_cache) == ["random-2", "random-3"]
+    assert lookups == ["random-1", "random-2", "random-3"]
+
+
+def test_limits_must_be_positive():
+    for fields in ({"rate_per_minute": 0, "burst": 1}, {"rate_per_minute": 1, "burst": 0}):
+        with pytest.raises(ValidationError):
+            RateLimitConfig(**fields)
+
+
+async def test_submit_endpoint_answers_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr("server.rate_limiter", RateLimiter(InMemoryBucketStore(), get_contest_by_id, LIMITS))
+    headers = auth_headers("u1")
+    problem_id = (await client.post("/api/problems", json=problem_payload(), headers=headers)).json()["id"]
+    body = {"problem_id": problem_id, "code": "", "language": "python", "contest_id": "made-up"}
+
+    assert (await client.post(f"/api/problems/{problem_id}/submit", json=body, headers=headers)).status_code == 200
+    refused = await client.post(f"/api/problems/{problem_id}/submit", json=body, headers=headers)
+    assert refused.status_code == 429
+    assert refused.headers["Retry-After"] == "10"
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+import auth
+import reference_runner
+import server
+from code_executor import CodeExecutor
+from models import ProblemCreate, ProblemReference
+from reference_runner import build_test_cases
+
+from tests.helpers import TWO_SUM, auth_headers, problem_payload
+
+pytestmark = pytest.mark.anyio
+
+GENERATOR = """
+def generate(rng, index):
+    a, b = rng.randint(0, 9), rng.randint(10, 19)
+    return f"[{a},{b}]\\n{a + b}"
+"""
+BRUTE_FORCE = """
+def twoSum(nums, target):
+    for i in range(len(nums)):
+        for j in range(i + 1, len(nums)):
+            if nums[i] + nums[j] == target:
+                return [i, j]
+"""
+WRONG = "def twoSum(nums, target):\n    return [1, 0]\n"
+
+
+def reference(cross_check: str = BRUTE_FORCE) -> ProblemReference:
+    return ProblemReference(
+        solution={"language": "python", "code": TWO_SUM},
+        cross_check={"language": "python", "code": cross_check},
+        generator=GENERATOR,
+        count=6
+    )
+
+
+@pytest.fixture
+async def problem(db):
+    return await db.create_problem(ProblemCreate(**problem_payload()))
+
+
+async def test_build_runs_on_the_given_executor(db, problem, monkeypatch):
+    def no_private_executor(*args, **kwargs):
+        raise AssertionError("builds must use the executor they are given")
+
+    monkeypatch.setattr(reference_runner, "CodeExecutor", no_private_executor)
+    report = await build_test_cases(problem, reference(), workers=2, executor=CodeExecutor(2, niceness=5))
+    assert report.written and report.cases == 6
+    assert not report.failures and not report.disagreements
+
+    stored = await db.get_problem_by_id(problem.id)
+    generated = [case for case in stored.test_cases if case.generated]
+    assert len(stored.test_cases) == 8 and len(generated) == 6
+    assert all(case.expected == "[0, 1]" for case in generated)
+
+
+async def test_disagreeing_references_write_nothing(db, problem):
+    report = await build_test_cases(problem, reference(cross_check=WRONG), workers=2)
+    assert len(report.disagreements) == 6 and not report.written
+    assert len((await db.get_problem_by_id(problem.id)).test_cases) == 2
+
+
+async def test_build_endpoint_runs_in_the_background(client, db, problem, monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", {"admin"})
+    monkeypatch.setattr(server, "_rejudger", None)
+    headers = auth_headers("a1", username="admin")
+    missing = await client.post(f"/api/admin/problems/{problem.id}/build-tests", headers=headers)
+    assert missing.status_code == 404
+
+    await db.set_problem_reference(problem.id, reference())
+    started = (await client.post(f"/api/admin/problems/{problem.id}/build-tests?count=3", headers=headers)).json()
+    assert started["status"] == "running"
+    await asyncio.gather(*server.build_tasks.values())
+
+    job = (await client.get(f"/api/admin/problems/{problem.id}/build-tests/{started['id']}", headers=headers)).json()
+    assert job["status"] == "completed"
+    assert (job["report"]["cases"], job["report"]["written"]) == (3, True)
+    # Judged on the rejudger's lower-priority sandboxes
+    assert job["report"]["workers"] == server.get_rejudger().executor.max_concurrency
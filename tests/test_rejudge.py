@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from code_executor import CodeExecutor
+from models import LanguageEnum, ProblemCreate, RejudgeRequest, RejudgeStatusEnum, StatusEnum, SubmissionCreate
+from rejudge import Rejudger, rejudge_jobs_collection
+from submission_archive import archive_submissions
+
+from tests.helpers import TWO_SUM, problem_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def judged_submission(db, problem_id: str, status: StatusEnum, code: str = TWO_SUM) -> str:
+    submission = await db.create_submission(
+        SubmissionCreate(problem_id=problem_id, code=code, language=LanguageEnum.PYTHON), "u1"
+    )
+    await db.update_submission_status(submission.id, status, 0, 2)
+    return submission.id
+
+
+@pytest.fixture
+async def problem(db):
+    return await db.create_problem(ProblemCreate(**problem_payload()))
+
+
+async def test_rejudge_rewrites_changed_verdicts(db, problem):
+    fixed = await judged_submission(db, problem.id, StatusEnum.WRONG_ANSWER)
+    await judged_submission(db, problem.id, StatusEnum.WRONG_ANSWER, code="def twoSum(nums, target):\n    return []\n")
+    rejudger = Rejudger(CodeExecutor(1), batch_size=1)
+    job = await rejudger.create_job(RejudgeRequest(problem_id=problem.id), created_by="admin")
+    assert job.total == 2
+
+    job = await rejudger.run(job)
+    assert (job.status, job.processed, job.changed) == (RejudgeStatusEnum.COMPLETED, 2, 1)
+    assert (await db.submissions_collection.find_one({"id": fixed}))["status"] == StatusEnum.ACCEPTED
+    assert db.problem_counters._pending[problem.id]["accepts"] == 1
+    stored = await rejudger.get_job(job.id)
+    assert (stored.status, stored.processed) == (RejudgeStatusEnum.COMPLETED, 2)
+
+
+async def test_cancel_during_a_batch_stops_the_job(db, problem):
+    for _ in range(2):
+        await judged_submission(db, problem.id, StatusEnum.WRONG_ANSWER)
+    rejudger = Rejudger(CodeExecutor(1), batch_size=1)
+    job = await rejudger.create_job(RejudgeRequest(problem_id=problem.id), created_by="admin")
+
+    apply = rejudger._apply
+
+    async def cancel_then_apply(docs, results):
+        await rejudger.cancel(job.id)
+        return await apply(docs, results)
+
+    rejudger._apply = cancel_then_apply
+    job = await rejudger.run(job)
+    assert job.status == RejudgeStatusEnum.CANCELLED
+    # The batch under way is still checkpointed, but the cancel isn't overwritten
+    stored = await rejudger.get_job(job.id)
+    assert (stored.status, stored.processed) == (RejudgeStatusEnum.CANCELLED, 1)
+
+
+async def test_a_cancelled_job_can_be_resumed(db, problem):
+    await judged_submission(db, problem.id, StatusEnum.WRONG_ANSWER)
+    rejudger = Rejudger(CodeExecutor(1))
+    job = await rejudger.create_job(RejudgeRequest(problem_id=problem.id), created_by="admin")
+    assert await rejudger.cancel(job.id)
+
+    job = await rejudger.run(await rejudger.get_job(job.id))
+    assert job.status == RejudgeStatusEnum.COMPLETED
+    doc = await rejudge_jobs_collection.find_one({"id": job.id})
+    assert doc["status"] == RejudgeStatusEnum.COMPLETED
+
+
+async def test_archived_submissions_are_rejudged(db, problem):
+    await db.users_collection.insert_one({"id": "u1", "username": "u1", "profile": {}})
+    archived = await judged_submission(db, problem.id, StatusEnum.WRONG_ANSWER)
+    await db.submissions_collection.update_one({"id": archived}, {"$set": {"submitted_at": datetime(2023, 3, 10)}})
+    await archive_submissions(
+        db.submissions_collection, db.submission_summaries_collection, db.submission_archive, db.code_store,
+        datetime.utcnow() - timedelta(days=1)
+    )
+    await judged_submission(db, problem.id, StatusEnum.WRONG_ANSWER, code="def twoSum(nums, target):\n    return []\n")
+
+    rejudger = Rejudger(CodeExecutor(1), batch_size=1)
+    job = await rejudger.create_job(RejudgeRequest(problem_id=problem.id), created_by="admin")
+    assert job.total == 2
+    job = await rejudger.run(job)
+    assert (job.processed, job.changed) == (2, 1)
+
+    doc = await db.submission_archive.collection("202303").find_one({"id": archived})
+    assert doc["status"] == StatusEnum.ACCEPTED
+    summary = await db.submission_summaries_collection.find_one({"_id": f"u1:{problem.id}:202303"})
+    assert summary["accepts"] == 1
+    profile = (await db.users_collection.find_one({"id": "u1"}))["profile"]
+    assert profile["solved"]["total"] == 1
@@ -0,0 +1,31 @@
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from models import Problem, ProblemSummary
+from server import model_response
+
+from tests.helpers import auth_headers, problem_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_model_response_matches_fastapi_encoding():
+    problem = Problem(**problem_payload())
+    response = model_response(problem)
+    assert response.media_type == "application/json"
+    assert orjson.loads(response.body) == jsonable_encoder(problem)
+
+
+async def test_problem_list_rows_match_the_summary_model(client):
+    headers = auth_headers("u1")
+    created = (await client.post("/api/problems", json=problem_payload(), headers=headers)).json()
+
+    rows = (await client.get("/api/problems", headers=headers)).json()
+    assert rows == [jsonable_encoder(ProblemSummary(**created))]
+
+    detail = (await client.get(f"/api/problems/{created['id']}")).json()
+    # Stored datetimes are truncated to milliseconds
+    assert detail.pop("created_at")[:23] == created.pop("created_at")[:23]
+    assert detail == created
+    assert (await client.get("/api/problems/missing")).status_code == 404
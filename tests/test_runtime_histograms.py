@@ -0,0 +1,55 @@
+import pytest
+
+from code_executor import CodeExecutor
+from models import LanguageEnum
+from runtime_histograms import beats, histogram_increments, parse_quantity, runtime_bucket
+
+from tests.helpers import TWO_SUM, auth_headers, problem_payload
+
+CASES = [("[2,7,11,15]\n9", "[0, 1]"), ("[3,2,4]\n6", "[1, 2]")]
+
+
+def test_increments_add_and_remove_one_submission():
+    assert parse_quantity("42.1 MB") == 42.1
+    assert histogram_increments("123ms", "42.1 MB") == {
+        "runtime.12": 1, "runtime_total": 1, "memory.84": 1, "memory_total": 1
+    }
+    assert histogram_increments(None, "1 MB", -1) == {"memory.2": -1, "memory_total": -1}
+    assert runtime_bucket("999999ms") == 499
+
+
+def test_beats_counts_ties_as_half():
+    histogram = {"runtime": {"1": 1, "3": 2, "5": 1}, "runtime_total": 4}
+    # Of the 3 others: one slower, one tied
+    assert beats(histogram, "runtime", 3) == 50.0
+    assert beats(histogram, "runtime", 1) == 100.0
+    assert beats({"runtime": {"1": 1}, "runtime_total": 1}, "runtime", 1) == 100.0
+    assert beats(histogram, "runtime", None) is None
+
+
+@pytest.mark.anyio
+async def test_runtime_is_the_measured_wall_time():
+    executor = CodeExecutor(1)
+    response = await executor.execute_code(TWO_SUM, LanguageEnum.PYTHON, CASES)
+    assert response.success
+    assert response.runtime == f"{round(sum(r.time_ms for r in response.test_results))}ms"
+
+    executor.timeout = 0.5
+    hangs = "def twoSum(nums, target):\n    while True:\n        pass\n"
+    response = await executor.execute_code(hangs, LanguageEnum.PYTHON, CASES[:1])
+    assert response.runtime is None
+    # The mocked languages measure nothing
+    assert (await executor.execute_code("", LanguageEnum.JAVA, CASES)).runtime is None
+
+
+@pytest.mark.anyio
+async def test_accepted_submission_reports_its_runtime_percentile(client):
+    headers = auth_headers("u1")
+    problem_id = (await client.post("/api/problems", json=problem_payload(), headers=headers)).json()["id"]
+    body = {"problem_id": problem_id, "code": TWO_SUM, "language": "python"}
+
+    submitted = (await client.post(f"/api/problems/{problem_id}/submit", json=body, headers=headers)).json()
+    assert submitted["status"] == "Accepted"
+    assert submitted["runtime"].endswith("ms")
+    assert submitted["runtime_percentile"] == 100.0
+    assert submitted["memory_percentile"] is None
@@ -0,0 +1,65 @@
+import pytest
+
+from search_index import ProblemSearchIndex
+
+DOCS = [
+    {"id": "1", "title": "Two Sum", "difficulty": "Easy", "category": "Array", "tags": ["hash-table"],
+     "companies": ["Google"], "description": "Find two numbers that add up to target"},
+    {"id": "2", "title": "Three Sum", "difficulty": "Medium", "category": "Array", "tags": ["two-pointers"],
+     "companies": ["Meta"], "description": "Find triplets that sum to zero"},
+    {"id": "3", "title": "Valid Parentheses", "difficulty": "Easy", "category": "Stack", "tags": ["stack"],
+     "companies": ["Google"], "description": "Check brackets sum up"},
+]
+
+
+@pytest.fixture
+async def index():
+    async def load():
+        return DOCS
+
+    index = ProblemSearchIndex(load)
+    await index.ensure_fresh()
+    return index
+
+
+@pytest.mark.anyio
+async def test_title_matches_outrank_description_matches(index):
+    results = index.search("sum")["results"]
+    assert [row["id"] for row in results] == ["2", "1", "3"]
+    # The last term is a prefix, the ones before it must match whole
+    assert [row["id"] for row in index.search("valid p")["results"]] == ["3"]
+    assert index.search("tw sum")["total"] == 0
+
+
+@pytest.mark.anyio
+async def test_facets_ignore_their_own_filter(index):
+    found = index.search(difficulty={"Easy"}, companies={"Google"})
+    assert found["total"] == 2
+    assert found["facets"]["difficulty"] == {"Easy": 2}
+    assert found["facets"]["companies"] == {"Google": 2}
+    assert found["facets"]["category"] == {"Array": 1, "Stack": 1}
+
+    found = index.search(difficulty={"Medium"})
+    assert found["facets"]["difficulty"] == {"Easy": 2, "Medium": 1}
+    assert found["facets"]["companies"] == {"Meta": 1}
+
+
+@pytest.mark.anyio
+async def test_status_filter_and_pagination(index):
+    found = index.search(status="todo", solved={"1"}, attempted={"2"})
+    assert [row["id"] for row in found["results"]] == ["3"]
+    page = index.search("sum", skip=1, limit=1, solved={"1"})
+    assert page["total"] == 3
+    assert [(row["id"], row["solved"]) for row in page["results"]] == [("1", True)]
+
+
+@pytest.mark.anyio
+async def test_incremental_updates(index):
+    index.add({**DOCS[0], "title": "Pair Target"})
+    assert [row["id"] for row in index.search("pair")["results"]] == ["1"]
+    assert "1" not in {row["id"] for row in index.search("two s")["results"]}
+
+    index.update_row("2", {"likes": 7, "description": "ignored"})
+    assert index.search("three")["results"][0]["likes"] == 7
+    index.remove("2")
+    assert index.search("three")["total"] == 0
@@ -0,0 +1,34 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import code_executor
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+IMPORT_CHECK = """
+import json, sys
+import server, code_executor
+print(json.dumps({
+    "modules": sorted(name for name in ("pymongo", "motor", "passlib") if name in sys.modules),
+    "executor": code_executor._code_executor is not None,
+}))
+"""
+
+
+def test_importing_server_defers_the_driver_and_executor():
+    # A fresh interpreter, since this one has already imported everything
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_CHECK], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    assert json.loads(output.splitlines()[-1]) == {"modules": [], "executor": False}
+
+
+def test_code_executor_is_created_once(monkeypatch):
+    monkeypatch.setattr(code_executor, "_code_executor", None)
+    registered = []
+    monkeypatch.setattr(code_executor, "register_executor_gauges", registered.append)
+    executor = code_executor.get_code_executor()
+    assert code_executor.get_code_executor() is executor
+    assert registered == [executor]
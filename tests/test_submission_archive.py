@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import ContestCreate, LanguageEnum, StatusEnum, SubmissionCreate
+from plagiarism import find_similar, load_contest_submissions
+from submission_archive import archive_submissions
+
+from tests.test_plagiarism import ORIGINAL, RENAMED
+
+pytestmark = pytest.mark.anyio
+
+LONG_AGO = datetime(2023, 3, 10, 12)
+
+
+async def add_submission(db, user_id: str, submitted_at: datetime, code: str = ORIGINAL,
+                         status: StatusEnum = StatusEnum.ACCEPTED) -> str:
+    submission = await db.create_submission(
+        SubmissionCreate(problem_id="p1", code=code, language=LanguageEnum.PYTHON), user_id
+    )
+    await db.submissions_collection.update_one(
+        {"id": submission.id}, {"$set": {"status": status, "submitted_at": submitted_at}}
+    )
+    return submission.id
+
+
+async def archive(db, cutoff: datetime) -> int:
+    return await archive_submissions(
+        db.submissions_collection, db.submission_summaries_collection, db.submission_archive, db.code_store, cutoff
+    )
+
+
+async def test_old_submissions_move_to_monthly_collections(db):
+    old = await add_submission(db, "u1", LONG_AGO)
+    await add_submission(db, "u1", LONG_AGO + timedelta(days=1), status=StatusEnum.WRONG_ANSWER)
+    recent = await add_submission(db, "u1", datetime.utcnow())
+
+    assert await archive(db, datetime.utcnow() - timedelta(days=1)) == 2
+    assert await archive(db, datetime.utcnow() - timedelta(days=1)) == 0
+    assert await db.submission_archive.months() == ["202303"]
+    assert [doc["id"] async for doc in db.submissions_collection.find({})] == [recent]
+
+    summary = await db.submission_summaries_collection.find_one({"_id": "u1:p1:202303"})
+    assert (summary["submissions"], summary["accepts"]) == (2, 1)
+    # History and code lookups fall through to the archive
+    history = await db.get_user_submissions("u1", include_code=True)
+    assert len(history) == 3 and history[0]["id"] == recent
+    assert (history[-1]["id"], history[-1]["code"]) == (old, ORIGINAL)
+
+
+async def test_plagiarism_scan_reads_archived_contests(db):
+    contest = await db.create_contest(ContestCreate(
+        title="Spring", start_time=LONG_AGO - timedelta(hours=1), duration_minutes=120, problem_ids=["p1"]
+    ))
+    await add_submission(db, "alice", LONG_AGO)
+    await add_submission(db, "bob", LONG_AGO + timedelta(minutes=5), code=RENAMED)
+    await archive(db, datetime.utcnow() - timedelta(days=1))
+    # One copy is still hot, e.g. archived by a run with a different cutoff
+    await add_submission(db, "carol", LONG_AGO + timedelta(minutes=10), code=RENAMED)
+
+    assert sorted(doc["user_id"] for doc in await load_contest_submissions(contest.id)) == ["alice", "bob", "carol"]
+    matches = await find_similar(contest.id)
+    assert len(matches) == 3